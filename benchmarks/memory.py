@@ -0,0 +1,81 @@
+"""Compares the memory held by each in-memory dictionary representation"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tracemalloc
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY)
+
+import namealizer  # noqa: E402
+
+REPRESENTATIONS = ["dict", "store", "compiled"]
+
+
+def resident_bytes():
+    """Current resident set size, None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def load(representation, dictionary):
+    if representation == "dict":
+        return namealizer.import_dictionary(dictionary)
+    if representation == "store":
+        with open(dictionary) as dictionary_file:
+            return namealizer.load_dictionary(dictionary_file)
+    return namealizer.load_dictionary(dictionary)
+
+
+def measure(representation, dictionary):
+    """Print the memory `representation` keeps alive, run in a subprocess"""
+    # parse once so one-off import costs are excluded from the measurement
+    load(representation, dictionary)
+    gc.collect()
+
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    loaded = load(representation, dictionary)
+    gc.collect()
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resident_bytes()
+
+    words = sum(len(words) for words in loaded.values())
+    rss = None if rss_before is None else rss_after - rss_before
+    print("{} {} {} {} {}".format(representation, words, traced, peak, rss))
+
+
+def main(dictionary):
+    print("{:<10} {:>8} {:>12} {:>12} {:>12}".format(
+        "store", "words", "held (KiB)", "peak (KiB)", "rss (KiB)"))
+    for representation in REPRESENTATIONS:
+        output = subprocess.check_output(
+            [sys.executable, __file__, "--measure", representation,
+             dictionary]).decode("utf-8").split()
+        kib = [str(int(value) // 1024) if value != "None" else "n/a"
+               for value in output[2:]]
+        print("{:<10} {:>8} {:>12} {:>12} {:>12}".format(
+            output[0], output[1], *kib))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("dictionary",
+                        nargs="?",
+                        default=namealizer.resolve_dictionary(
+                            namealizer.DEFAULT_DICTIONARY),
+                        help="Dictionary to load")
+    parser.add_argument("--measure",
+                        choices=REPRESENTATIONS,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure, args.dictionary)
+    else:
+        main(args.dictionary)
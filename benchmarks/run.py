@@ -0,0 +1,320 @@
+"""Runs the namealizer benchmark suite
+
+Every benchmark runs in a fresh process, and reports its throughput,
+latency percentiles and the peak resident memory of that process:
+
+- load_cold: load_dictionary compiling the dictionary from scratch
+- load_warm: load_dictionary mapping an up-to-date compiled copy
+- single_name: one `wg[3]` call per operation
+- bulk_<wordstyle>: generate_many batches of 3 word names, per wordstyle
+- cli_start: a complete `namealizer -c2` run, start up included
+
+The bundled dictionary is used unless `--words` asks for a synthetic one
+of that many words (10k to 10M), which is generated once and kept in
+`--data-dir`. Results can be saved as a JSON baseline and later runs
+compared against it:
+
+    python benchmarks/run.py --words 1000000 --save baseline.json
+    python benchmarks/run.py --words 1000000 --compare baseline.json
+
+Comparing exits with status 1 if any benchmark's throughput dropped by
+more than `--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY)
+
+import namealizer  # noqa: E402
+
+_clock = getattr(time, "perf_counter", time.time)
+
+WORDSTYLES = ["lowercase", "uppercase", "capitalize", "mixedcase", "snake",
+              "kebab", "constant", "dot"]
+BENCHMARKS = (["load_cold", "load_warm", "single_name"] +
+              ["bulk_" + wordstyle for wordstyle in WORDSTYLES] +
+              ["cli_start"])
+
+
+def synthetic_dictionary(words, directory, seed=0):
+    """
+    Path of a dictionary of `words` pronounceable random words, written
+    to `directory` the first time it is asked for
+    """
+    path = os.path.join(directory, "synthetic-{}.dict".format(words))
+    if os.path.exists(path):
+        return path
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    rng = random.Random(seed)
+    syllables = [consonant + vowel for consonant in string.ascii_lowercase
+                 for vowel in "aeiouy"]
+    temporary = path + ".tmp"
+    with open(temporary, "w") as dictionary_file:
+        for start in range(0, words, 100000):
+            chunk = ["".join(rng.choice(syllables)
+                             for _ in range(rng.randint(2, 5)))
+                     for _ in range(min(100000, words - start))]
+            dictionary_file.write("\n".join(chunk) + "\n")
+    os.rename(temporary, path)
+    return path
+
+
+def peak_kib():
+    """Peak resident memory of this process in KiB, None if unknown"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def time_calls(function, runs):
+    """Call `function` `runs` times, returning the duration of each call"""
+    timings = list()
+    for _ in range(runs):
+        start = _clock()
+        function()
+        timings.append(_clock() - start)
+    return timings
+
+
+def run_benchmark(name, dictionary, options):
+    """
+    Run one benchmark in this process, returning its timings along with
+    the operations each timing covers
+    """
+    if name in ("load_cold", "load_warm"):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            if name == "load_warm":
+                namealizer.load_dictionary(dictionary, cache_dir)
+                timings = time_calls(
+                    lambda: namealizer.load_dictionary(dictionary, cache_dir),
+                    options.load_runs * 10)
+            else:
+                def load_cold():
+                    shutil.rmtree(cache_dir)
+                    namealizer.load_dictionary(dictionary, cache_dir)
+                timings = time_calls(load_cold, options.load_runs)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        return "load", 1, timings
+
+    if name == "cli_start":
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [REPOSITORY] + [path for path in [env.get("PYTHONPATH")] if path])
+        command = [sys.executable, "-m", "namealizer", "-d", dictionary,
+                   "-c2"]
+        with open(os.devnull, "w") as devnull:
+            def run():
+                subprocess.check_call(command, stdout=devnull, env=env)
+            # the first run compiles the dictionary cache and the bytecode
+            run()
+            return "run", 1, time_calls(run, options.cli_runs)
+
+    if name == "single_name":
+        wg = namealizer.WordGenerator(dictionary, seed=1)
+        wg[3]
+        return "name", 1, time_calls(lambda: wg[3], options.names)
+
+    wordstyle = name[len("bulk_"):]
+    wg = namealizer.WordGenerator(dictionary, wordstyle=wordstyle, seed=1)
+    wg.generate_many(options.bulk, count=3)
+    return "name", options.bulk, time_calls(
+        lambda: wg.generate_many(options.bulk, count=3), options.bulk_runs)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of the sorted list `values`"""
+    return values[min(len(values) - 1, int(round(fraction * len(values))))]
+
+
+def summarize(unit, operations, timings, peak):
+    """Throughput, latency percentiles and peak memory of one benchmark"""
+    timings = sorted(timings)
+    return {"unit": unit,
+            "throughput": operations * len(timings) / sum(timings),
+            "operations": operations,
+            "p50": percentile(timings, 0.50),
+            "p90": percentile(timings, 0.90),
+            "p99": percentile(timings, 0.99),
+            "peak_kib": peak}
+
+
+def measure(name, dictionary, options):
+    """Run `name` in a fresh process and return its summary"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", name,
+               "--dictionary", dictionary,
+               "--load-runs", str(options.load_runs),
+               "--names", str(options.names),
+               "--bulk", str(options.bulk),
+               "--bulk-runs", str(options.bulk_runs),
+               "--cli-runs", str(options.cli_runs)]
+    return json.loads(subprocess.check_output(command).decode("utf-8"))
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return "{:.1f} us".format(seconds * 1e6)
+    if seconds < 1:
+        return "{:.2f} ms".format(seconds * 1e3)
+    return "{:.2f} s".format(seconds)
+
+
+def print_results(results):
+    print("{:<18} {:>16} {:>11} {:>11} {:>11} {:>10}".format(
+        "benchmark", "throughput", "p50", "p90", "p99", "peak MiB"))
+    for name, result in results.items():
+        peak = result["peak_kib"]
+        print("{:<18} {:>16} {:>11} {:>11} {:>11} {:>10}".format(
+            name, "{:.0f} {}/s".format(result["throughput"], result["unit"]),
+            format_seconds(result["p50"]), format_seconds(result["p90"]),
+            format_seconds(result["p99"]),
+            "n/a" if peak is None else "{:.1f}".format(peak / 1024.0)))
+
+
+def compare(results, baseline, threshold):
+    """
+    Print how `results` moved against `baseline`, returning the names of
+    the benchmarks whose throughput dropped by more than `threshold`
+    """
+    regressions = list()
+    print("")
+    print("{:<18} {:>12} {:>12} {:>10}".format(
+        "benchmark", "throughput", "p50", "peak"))
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print("{:<18} {:>12}".format(name, "new"))
+            continue
+
+        def change(key):
+            if not before.get(key) or result.get(key) is None:
+                return "n/a"
+            return "{:+.1f}%".format(
+                (result[key] - before[key]) * 100.0 / before[key])
+
+        status = ""
+        if result["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(name)
+            status = "  REGRESSED"
+        print("{:<18} {:>12} {:>12} {:>10}{}".format(
+            name, change("throughput"), change("p50"), change("peak_kib"),
+            status))
+    return regressions
+
+
+def main(options):
+    if options.words is not None:
+        dictionary = synthetic_dictionary(options.words, options.data_dir)
+    else:
+        dictionary = namealizer.resolve_dictionary(options.dictionary)
+
+    names = [name for name in BENCHMARKS
+             if not options.only or
+             any(name.startswith(prefix) for prefix in options.only)]
+    print("dictionary: {}".format(dictionary))
+    results = OrderedDict()
+    for name in names:
+        results[name] = measure(name, dictionary, options)
+    print_results(results)
+
+    document = {"meta": {"dictionary": os.path.basename(dictionary),
+                         "words": options.words,
+                         "python": platform.python_version(),
+                         "platform": platform.platform(),
+                         "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                "results": results}
+    if options.save:
+        with open(options.save, "w") as baseline_file:
+            json.dump(document, baseline_file, indent=2, sort_keys=True)
+        print("saved baseline to {}".format(options.save))
+
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["meta"].get("dictionary") != \
+                document["meta"]["dictionary"]:
+            print("warning: the baseline used {}".format(
+                baseline["meta"].get("dictionary")))
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print("FAILED: {} regressed by more than {:.0f}%".format(
+                ", ".join(regressions), options.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-d", "--dictionary",
+                        default=namealizer.DEFAULT_DICTIONARY,
+                        help="Dictionary to benchmark with")
+    parser.add_argument("-w", "--words",
+                        type=int,
+                        help="Benchmark a synthetic dictionary of this many "
+                        "words instead")
+    parser.add_argument("--data-dir",
+                        default=os.path.join(tempfile.gettempdir(),
+                                             "namealizer-benchmarks"),
+                        help="Where synthetic dictionaries are kept")
+    parser.add_argument("--only",
+                        action="append",
+                        help="Only run benchmarks starting with this name, "
+                        "may be repeated")
+    parser.add_argument("--save",
+                        help="Save the results as a JSON baseline")
+    parser.add_argument("--compare",
+                        help="Compare the results with a JSON baseline")
+    parser.add_argument("--threshold",
+                        type=float,
+                        default=0.10,
+                        help="Throughput drop counted as a regression")
+    parser.add_argument("--load-runs",
+                        type=int,
+                        default=5,
+                        help="Cold loads to time, warm loads are 10 times "
+                        "as many")
+    parser.add_argument("--names",
+                        type=int,
+                        default=20000,
+                        help="Single names to time")
+    parser.add_argument("--bulk",
+                        type=int,
+                        default=100000,
+                        help="Names per bulk batch")
+    parser.add_argument("--bulk-runs",
+                        type=int,
+                        default=5,
+                        help="Bulk batches to time")
+    parser.add_argument("--cli-runs",
+                        type=int,
+                        default=10,
+                        help="Command line runs to time")
+    parser.add_argument("--child",
+                        choices=BENCHMARKS,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        unit, operations, timings = run_benchmark(args.child,
+                                                  args.dictionary, args)
+        print(json.dumps(summarize(unit, operations, timings, peak_kib())))
+    else:
+        sys.exit(main(args))
@@ -0,0 +1,62 @@
+"""Measures cold start wall time of the namealizer command line tool"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(command, runs, env):
+    """Run `command` `runs` times and return the sorted wall times"""
+    timings = list()
+    with open(os.devnull, "w") as devnull:
+        for _ in range(runs):
+            start = time.time()
+            subprocess.check_call(command, stdout=devnull, env=env)
+            timings.append(time.time() - start)
+    return sorted(timings)
+
+
+def main(runs, target, arguments):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [REPOSITORY] + [path for path in [env.get("PYTHONPATH")] if path])
+    command = [sys.executable, "-m", "namealizer"] + arguments
+
+    # the first run compiles the dictionary cache and the bytecode
+    subprocess.check_call(command, stdout=subprocess.PIPE, env=env)
+    python = time_command([sys.executable, "-c", "pass"], runs, env)
+    timings = time_command(command, runs, env)
+
+    median = timings[len(timings) // 2]
+    print("command:     {}".format(" ".join(["namealizer"] + arguments)))
+    print("interpreter: {:.1f} ms median".format(
+        python[len(python) // 2] * 1000))
+    print("namealizer:  {:.1f} ms median, {:.1f} ms min, {:.1f} ms max".format(
+        median * 1000, timings[0] * 1000, timings[-1] * 1000))
+    print("target:      {:.1f} ms".format(target * 1000))
+
+    if median > target:
+        print("FAILED: median start up time is above the target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-r", "--runs",
+                        type=int,
+                        default=20,
+                        help="How many times to run the tool")
+    parser.add_argument("-t", "--target",
+                        type=float,
+                        default=0.15,
+                        help="Maximum median wall time in seconds")
+    parser.add_argument("arguments",
+                        nargs="*",
+                        default=["-c2"],
+                        help="Arguments passed to namealizer")
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.target, args.arguments))
@@ -2,5 +2,34 @@ import sys
 
 if sys.version_info[0] == 2:
     from namealizer import *
+    from namealizer import _import_submodule
 else:
     from namealizer.namealizer import *
+    from namealizer.namealizer import _import_submodule
+
+# public names of the submodules that are available from here as well
+_SUBMODULE_NAMES = {
+    "Blocklist": "blocklist",
+    "DictionaryWatcher": "watch",
+    "Histogram": "metrics",
+    "Metrics": "metrics",
+    "NameTemplate": "templates",
+    "ReloadReport": "watch",
+    "disable_metrics": "metrics",
+    "enable_metrics": "metrics",
+    "get_metrics": "metrics",
+    "watch_dictionary": "watch",
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # submodules are imported on first use, keeping them off the
+        # startup path of the command line tool
+        submodule = _SUBMODULE_NAMES.get(name)
+        if submodule is None:
+            raise AttributeError(
+                "module 'namealizer' has no attribute {!r}".format(name))
+        return getattr(_import_submodule(submodule), name)
+else:
+    for _name, _submodule in _SUBMODULE_NAMES.items():
+        globals()[_name] = getattr(_import_submodule(_submodule), _name)
@@ -0,0 +1,5 @@
+"""Allows running namealizer with `python -m namealizer`"""
+import sys
+from namealizer import cli
+
+sys.exit(cli())
@@ -0,0 +1,92 @@
+"""Asyncio interface to namealizer, generating names off the event loop"""
+import asyncio
+import functools
+import itertools
+
+from namealizer import DEFAULT_DICTIONARY, WordGenerator
+
+
+def _take(names, number):
+    """Next `number` names from the iterator `names`"""
+    return list(itertools.islice(names, number))
+
+
+class AsyncWordGenerator(object):
+    """
+    WordGenerator for asyncio services
+
+    Loading dictionaries and generating batches of names happen in an
+    executor (the loop's default one unless `executor` is given), so the
+    event loop never waits on them. The wrapped WordGenerator is available
+    as `generator` for changing formatting options or the seed.
+
+    Like WordGenerator, the PRNG is shared by everything drawing from this
+    object; give concurrent consumers their own `spawn(n)` for
+    reproducible output.
+    """
+    def __init__(self, generator, executor=None):
+        self.generator = generator
+        self.executor = executor
+
+    @classmethod
+    async def open(cls, dictionary=DEFAULT_DICTIONARY, *args,
+                   executor=None, **kwargs):
+        """
+        Create a generator, loading its dictionary in the executor
+
+        Takes the same parameters as WordGenerator, which it passes them
+        to, plus the keyword-only `executor` to run blocking work in.
+        """
+        loop = asyncio.get_event_loop()
+        generator = await loop.run_in_executor(executor, functools.partial(
+            WordGenerator, dictionary, *args, **kwargs))
+        return cls(generator, executor)
+
+    def spawn(self, stream, streams=None):
+        """Generator on the stream `stream`, see WordGenerator.spawn"""
+        return AsyncWordGenerator(self.generator.spawn(stream, streams),
+                                  self.executor)
+
+    def __getitem__(self, key):
+        # a single name takes microseconds, cheaper than an executor trip
+        return self.generator[key]
+
+    async def generate_many(self, number, count=None, initials=None,
+                            unique=None):
+        """List of `number` names, generated in the executor"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(
+            self.generator.generate_many, number, count=count,
+            initials=initials, unique=unique))
+
+    async def stream(self, number, count=None, initials=None, unique=None,
+                     chunk_size=1000):
+        """
+        Asynchronously iterate over `number` names
+
+        Names are generated in the executor `chunk_size` at a time, with at
+        most one chunk prepared ahead of the consumer, so a slow consumer
+        holds back generation instead of piling up names. The event loop
+        gets control back between chunks. Closing the iterator or
+        cancelling the task consuming it stops generation.
+        """
+        loop = asyncio.get_event_loop()
+        names = self.generator.iter_many(number, count=count,
+                                         initials=initials, unique=unique,
+                                         chunk_size=chunk_size)
+        take = functools.partial(_take, names, chunk_size)
+
+        pending = loop.run_in_executor(self.executor, take)
+        try:
+            while True:
+                chunk = await pending
+                if not chunk:
+                    return
+                pending = loop.run_in_executor(self.executor, take)
+                for name in chunk:
+                    yield name
+                await asyncio.sleep(0)
+        finally:
+            if not pending.cancel() and not pending.cancelled():
+                # the prefetched chunk finished, don't leave errors unseen
+                pending.exception()
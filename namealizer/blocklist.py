@@ -0,0 +1,111 @@
+"""Substrings no generated name may contain
+
+A Blocklist is passed to WordGenerator or NameTemplate, as one, as the
+path of a file of patterns or as an iterable of patterns:
+
+    wg = WordGenerator(blocklist=["foo", "bar"])
+    wg.blocklist.blocks("Foobar")       # True, matched ignoring case
+"""
+from __future__ import absolute_import
+
+from namealizer.namealizer import _string_types, open_dictionary
+
+
+class Blocklist(object):
+    """
+    Substrings no generated name may contain, matched ignoring case
+
+    The patterns are compiled once into an Aho-Corasick automaton: a trie
+    of the patterns whose states also know the longest pattern prefix
+    they end with, so a name is checked against every pattern in a
+    single pass over its characters, however many patterns there are.
+    Names are checked as formatted, so a pattern spanning two words, or
+    the separator between them, is caught as well.
+
+    Blocklists pickle as their patterns and are compiled again when
+    unpickled.
+
+    :param patterns Iterable of the blocked substrings
+    """
+    def __init__(self, patterns):
+        self.patterns = sorted(set(pattern.lower() for pattern in patterns
+                                   if pattern))
+        # goto[state] maps a character to the next state of the trie
+        goto, blocked = [dict()], [False]
+        for pattern in self.patterns:
+            state = 0
+            for character in pattern:
+                following = goto[state].get(character)
+                if following is None:
+                    following = goto[state][character] = len(goto)
+                    goto.append(dict())
+                    blocked.append(False)
+                state = following
+            blocked[state] = True
+
+        # fail[state] is the state of the longest proper suffix of the
+        # state's text that is in the trie; a state is blocked when its
+        # text ends with a pattern. States are visited by depth, so the
+        # shallower fail states are done first
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for character, following in goto[state].items():
+                suffix = fail[state]
+                while suffix and character not in goto[suffix]:
+                    suffix = fail[suffix]
+                fail[following] = goto[suffix].get(character, 0)
+                blocked[following] = blocked[following] or \
+                    blocked[fail[following]]
+                queue.append(following)
+
+        self._goto = goto
+        self._fail = fail
+        self._blocked = blocked
+
+    @classmethod
+    def load(cls, path):
+        """
+        Blocklist of the file at `path`, one pattern per line, which may
+        be compressed like dictionaries are
+        """
+        with open_dictionary(path) as patterns:
+            return cls(line.strip() for line in patterns)
+
+    def __reduce__(self):
+        return Blocklist, (self.patterns,)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def blocks(self, name):
+        """Whether `name` contains any of the patterns"""
+        goto, fail, blocked = self._goto, self._fail, self._blocked
+        state = 0
+        for character in name.lower():
+            following = goto[state].get(character)
+            while following is None and state:
+                state = fail[state]
+                following = goto[state].get(character)
+            if following is not None:
+                state = following
+                if blocked[state]:
+                    return True
+        return False
+
+    def allowed(self, names):
+        """List of the names of `names` that contain none of the patterns"""
+        blocks = self.blocks
+        return [name for name in names if not blocks(name)]
+
+
+def _as_blocklist(blocklist):
+    """
+    Blocklist given as one, as the path of a file of patterns or as an
+    iterable of patterns; None stays None
+    """
+    if blocklist is None or isinstance(blocklist, Blocklist):
+        return blocklist
+    if isinstance(blocklist, _string_types):
+        return Blocklist.load(blocklist)
+    return Blocklist(blocklist)
@@ -0,0 +1,231 @@
+"""Streaming ingestion of large, sharded and compressed dictionaries
+
+Dictionaries spread over several files, plain or compressed with gzip,
+bzip2 or xz, are merged into one WordStore:
+
+    store, stats = ingest(["words-0.dict.gz", "words-1.dict.xz"], jobs=4)
+    wg = WordGenerator(store)
+
+Every source is decompressed and parsed as a stream, by a pool of worker
+processes when there are several, so raw files are never held in memory;
+only their packed words are. The parsed sources are then merged letter by
+letter, dropping duplicate words. Blank lines are skipped, everything else
+follows the `.dict` format, including the optional weight column.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+
+from namealizer import DictionaryNotFoundError, WordStore, open_dictionary
+from namealizer.namealizer import _clock, _replacing, _string_types
+
+
+class IngestStats(object):
+    """
+    Progress and timings of one ingest call
+
+    `words`, `duplicates` and `merge_seconds` are None until the sources
+    have been merged, at which point `seconds` holds the total wall time.
+    `source_timings` lists (source, lines, bytes, seconds) for every source
+    parsed so far, in order; the time is spent in a worker when parsing in
+    parallel.
+    """
+    def __init__(self, sources):
+        self.sources = sources
+        self.lines = 0
+        self.bytes_read = 0
+        self.source_timings = list()
+        self.parse_seconds = None
+        self.words = None
+        self.duplicates = None
+        self.merge_seconds = None
+        self.seconds = None
+        self._start = _clock()
+
+    @property
+    def parsed(self):
+        """Number of sources parsed so far"""
+        return len(self.source_timings)
+
+    @property
+    def elapsed(self):
+        """Wall time since ingestion started, in seconds"""
+        if self.seconds is not None:
+            return self.seconds
+        return _clock() - self._start
+
+    def __str__(self):
+        if self.words is None:
+            return "parsed {}/{} sources, {} lines, {:.1f} MB in " \
+                   "{:.2f} s".format(self.parsed, self.sources, self.lines,
+                                     self.bytes_read / 1e6, self.elapsed)
+        return "loaded {} words ({} duplicates) from {} sources in " \
+               "{:.2f} s (parse {:.2f} s, merge {:.2f} s)".format(
+                   self.words, self.duplicates, self.sources, self.seconds,
+                   self.parse_seconds, self.merge_seconds)
+
+
+def _source_name(source):
+    """How to refer to a source in progress reports"""
+    if isinstance(source, _string_types):
+        return source
+    return getattr(source, "name", "<lines>")
+
+
+def _parse_source(source):
+    """
+    Parse one source into a WordStore, returning it along with the size
+    of the source on disk and the time it took
+    """
+    start = _clock()
+    if not isinstance(source, _string_types):
+        store = WordStore.from_lines(line for line in source if line.strip())
+        return store, 0, _clock() - start
+
+    try:
+        size = os.path.getsize(source)
+        with open_dictionary(source) as lines:
+            store = WordStore.from_lines(line for line in lines
+                                         if line.strip())
+    except (IOError, OSError):
+        message = "Could not find the dictionary at {}".format(source)
+        raise DictionaryNotFoundError(message)
+    return store, size, _clock() - start
+
+
+def ingest(sources, jobs=1, dedup=True, progress=None):
+    """
+    Load and merge dictionaries into one WordStore
+
+    :param sources Paths of .dict files, optionally compressed (.gz, .bz2
+           or .xz), or already opened files, merged in the order given
+    :param jobs How many sources to parse at once in worker processes,
+           None for one per CPU. Only used when every source is a path
+    :param dedup Keep only the first occurrence of every word
+    :param progress Called with the IngestStats after every source is
+           parsed, and once more when they have been merged
+    :return a (WordStore, IngestStats) tuple
+
+    :raises DictionaryNotFoundError if a source can't be read
+    :raises ValueError if a line has an invalid weight
+    """
+    sources = list(sources)
+    stats = IngestStats(len(sources))
+
+    pool = None
+    if jobs != 1 and len(sources) > 1 and \
+            all(isinstance(source, _string_types) for source in sources):
+        import multiprocessing
+
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(min(jobs, len(sources)))
+        results = pool.imap(_parse_source, sources)
+    else:
+        results = (_parse_source(source) for source in sources)
+
+    stores = list()
+    try:
+        for index, (store, size, seconds) in enumerate(results):
+            stores.append(store)
+            stats.lines += store.word_count
+            stats.bytes_read += size
+            stats.source_timings.append((_source_name(sources[index]),
+                                         store.word_count, size, seconds))
+            if progress is not None:
+                progress(stats)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    stats.parse_seconds = stats.elapsed
+
+    start = _clock()
+    if len(stores) == 1 and not dedup:
+        store = stores[0]
+    else:
+        store = WordStore.merge(stores, dedup=dedup)
+    del stores
+
+    stats.merge_seconds = _clock() - start
+    stats.words = store.word_count
+    stats.duplicates = stats.lines - store.word_count
+    stats.seconds = stats.elapsed
+    if progress is not None:
+        progress(stats)
+    return store, stats
+
+
+def write_dictionary(dictionary, path):
+    """
+    Write a loaded dictionary to `path` in the .dict format, compressed
+    when `path` ends in .gz, .bz2 or .xz
+
+    Words are written with their weight when the dictionary has weights.
+    The file is written under a temporary name and then moved into place,
+    so readers never see a partial dictionary.
+    """
+    weights = getattr(dictionary, "weights", None)
+    with _replacing(path) as temporary:
+        with open_dictionary(temporary, "w") as dictionary_file:
+            for words in dictionary.values():
+                if weights is None:
+                    for word in words:
+                        dictionary_file.write(word + "\n")
+                    continue
+                for index in range(words.start, words.stop):
+                    dictionary_file.write("{}\t{}\n".format(
+                        dictionary.word(index), weights[index]))
+
+
+def cli(args=None):
+    """Entry point of `namealizer ingest`"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="namealizer ingest",
+        description="Merge plain or compressed dictionaries into one, "
+        "reporting progress and load timings.")
+    parser.add_argument('sources',
+                        nargs='+',
+                        help='Dictionaries to read, in order. Files ending '
+                        'in .gz, .bz2 or .xz are decompressed.')
+    parser.add_argument('-o', '--output',
+                        help='Write the merged dictionary here, compressed '
+                        'if it ends in .gz, .bz2 or .xz.')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        help='Parse this many sources at once. Default is '
+                        'one per CPU.')
+    parser.add_argument('--keep-duplicates',
+                        action='store_true',
+                        help='Keep every occurrence of repeated words.')
+    parser.add_argument('-q', '--quiet',
+                        action='store_true',
+                        help='Only report errors.')
+    args = parser.parse_args(args)
+
+    def report(stats):
+        if stats.words is None:
+            source, lines, size, seconds = stats.source_timings[-1]
+            sys.stderr.write("[{}/{}] {}: {} lines, {:.1f} MB in {:.2f} "
+                             "s\n".format(stats.parsed, stats.sources,
+                                          source, lines, size / 1e6,
+                                          seconds))
+        else:
+            sys.stderr.write("{}\n".format(stats))
+
+    try:
+        store, stats = ingest(args.sources, jobs=args.jobs,
+                              dedup=not args.keep_duplicates,
+                              progress=None if args.quiet else report)
+        if args.output is not None:
+            start = _clock()
+            write_dictionary(store, args.output)
+            if not args.quiet:
+                sys.stderr.write("wrote {} words to {} in {:.2f} s\n".format(
+                    store.word_count, args.output, _clock() - start))
+    except (DictionaryNotFoundError, ValueError) as error:
+        sys.stderr.write("namealizer ingest: {}\n".format(error))
+        return 1
+    return 0
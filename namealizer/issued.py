@@ -0,0 +1,342 @@
+"""Persistent registry of issued names, shared by processes on one host
+
+Names handed out as identifiers must never be handed out twice, across
+processes and restarts. An IssuedNameRegistry records every name it
+issues in an SQLite database, whose unique index makes claiming a name
+atomic: of any number of processes claiming the same name, exactly one
+succeeds. Passed to a WordGenerator, it makes generation skip names that
+were already issued:
+
+    registry = IssuedNameRegistry("names.db")
+    wg = WordGenerator(issued=registry)
+    wg[3]                       # claimed, never returned again
+    "some name" in registry     # True once issued
+
+Membership checks go through a Bloom filter kept next to the database
+(`names.db.bloom`) and memory-mapped by every process using it, so
+checking a name that was never issued rarely touches the database, even
+with tens of millions of names. Filter bits are set while holding the
+database's write lock, before the claim commits, so the filter never
+misses an issued name; its false positives are settled by the database.
+A filter holding more names than it was sized for answers more slowly but
+never wrongly, and `compact` rebuilds it at a suitable size.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import math
+import mmap
+import sqlite3
+import struct
+import sys
+import threading
+
+from namealizer.namealizer import _replacing
+
+_BLOOM_MAGIC = b"NMZB"
+_BLOOM_VERSION = 1
+
+# magic, version, hashes per name, retired flag, bits
+_BLOOM_HEADER = struct.Struct("<4sHHI4xQ")
+_BLOOM_RETIRED = 8
+
+
+class _MapBytes(object):
+    """
+    Integer byte access to a memory map, as memoryview gives on Python 3;
+    Python 2 maps have no buffer interface and index as characters
+    """
+    def __init__(self, buffer):
+        self._map = buffer
+
+    def __getitem__(self, index):
+        return ord(self._map[index])
+
+    def __setitem__(self, index, value):
+        self._map[index] = chr(value)
+
+    def release(self):
+        pass
+
+
+class BloomFilter(object):
+    """
+    Memory-mapped Bloom filter stored in a file, shared by every process
+    mapping it
+
+    Open an existing filter with BloomFilter(path), create one with
+    BloomFilter.create. A filter replaced by a newer file is marked
+    `retired` so that processes still mapping it know to reopen it.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "r+b") as bloom_file:
+            self._map = mmap.mmap(bloom_file.fileno(), 0)
+        header = _BLOOM_HEADER.unpack_from(self._map)
+        if header[0] != _BLOOM_MAGIC or header[1] != _BLOOM_VERSION or \
+                len(self._map) < _BLOOM_HEADER.size + (header[4] + 7) // 8:
+            self._map.close()
+            raise ValueError("{} is not a valid Bloom filter".format(path))
+        self.hashes = header[2]
+        self.bits = header[4]
+        if sys.version_info[0] == 2:
+            self._bytes = _MapBytes(self._map)
+        else:
+            self._bytes = memoryview(self._map)
+
+    @staticmethod
+    def dimensions(capacity, error_rate):
+        """
+        Number of bits and hashes per name giving a false positive rate
+        of `error_rate` once `capacity` names were added
+        """
+        capacity = max(1, capacity)
+        bits = int(math.ceil(-capacity * math.log(error_rate) /
+                             math.log(2) ** 2))
+        hashes = max(1, int(round(bits / float(capacity) * math.log(2))))
+        return bits, hashes
+
+    @classmethod
+    def create(cls, path, capacity, error_rate, names=()):
+        """
+        Write a filter sized for `capacity` names holding `names` to
+        `path`, replacing any filter there, and open it
+
+        The filter is built under a temporary name and then moved into
+        place, so other processes never map a partial filter.
+        """
+        bits, hashes = cls.dimensions(capacity, error_rate)
+        with _replacing(path) as temporary:
+            with open(temporary, "wb") as bloom_file:
+                bloom_file.write(_BLOOM_HEADER.pack(
+                    _BLOOM_MAGIC, _BLOOM_VERSION, hashes, 0, bits))
+                bloom_file.truncate(_BLOOM_HEADER.size + (bits + 7) // 8)
+            bloom = cls(temporary)
+            for name in names:
+                bloom.add(name)
+            bloom._map.flush()
+        bloom.path = path
+        return bloom
+
+    def _positions(self, name):
+        digest = hashlib.sha1(name.encode("utf-8")).digest()
+        first, second = struct.unpack_from("<QQ", digest)
+        second |= 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.bits
+
+    def add(self, name):
+        """Add `name` to the filter"""
+        data, offset = self._bytes, _BLOOM_HEADER.size
+        for position in self._positions(name):
+            byte = offset + (position >> 3)
+            data[byte] = data[byte] | (1 << (position & 7))
+
+    def __contains__(self, name):
+        """False if `name` was never added, True if it probably was"""
+        data, offset = self._bytes, _BLOOM_HEADER.size
+        for position in self._positions(name):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def retired(self):
+        """Whether a newer filter has replaced this one"""
+        return bool(self._bytes[_BLOOM_RETIRED])
+
+    def retire(self):
+        """Tell every process mapping this filter to reopen it"""
+        self._bytes[_BLOOM_RETIRED] = 1
+
+    def close(self):
+        self._bytes.release()
+        self._map.close()
+
+
+class IssuedNameRegistry(object):
+    """
+    Names issued so far, persisted in the SQLite database at `path`
+
+    Any number of threads and processes on the host may use the same
+    registry at once. Registries pickle as their path and settings, so
+    worker processes open their own connection to the same database.
+
+    :param path Database file, created when missing. The Bloom filter is
+           kept at `path` + ".bloom"
+    :param capacity Number of names the Bloom filter is sized for when it
+           is created
+    :param error_rate False positive rate of the Bloom filter at capacity
+    :param timeout Seconds to wait for another process's write lock
+    """
+    def __init__(self, path, capacity=1000000, error_rate=0.001,
+                 timeout=30.0):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        # depth of the nested _WriteTransaction blocks
+        self._transactions = 0
+        self._connection = sqlite3.connect(path, timeout=timeout,
+                                           isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS issued "
+                                 "(name TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.filter = None
+        self._open_filter()
+
+    def __reduce__(self):
+        return (IssuedNameRegistry,
+                (self.path, self.capacity, self.error_rate, self.timeout))
+
+    @property
+    def filter_path(self):
+        return self.path + ".bloom"
+
+    def _open_filter(self):
+        """Map the current Bloom filter, building it when missing"""
+        if self.filter is not None:
+            self.filter.close()
+            self.filter = None
+        try:
+            self.filter = BloomFilter(self.filter_path)
+            return
+        except (IOError, OSError, ValueError):
+            pass
+        with self._transaction():
+            # another process may have built it while we waited
+            try:
+                self.filter = BloomFilter(self.filter_path)
+            except (IOError, OSError, ValueError):
+                self._rebuild_filter(self.capacity)
+
+    def _rebuild_filter(self, capacity):
+        """
+        Replace the Bloom filter with one sized for `capacity`, holding
+        every issued name. Called within a write transaction
+        """
+        names = (row[0] for row in
+                 self._connection.execute("SELECT name FROM issued"))
+        bloom = BloomFilter.create(self.filter_path, capacity,
+                                   self.error_rate, names)
+        if self.filter is not None:
+            self.filter.retire()
+            self.filter.close()
+        self.filter = bloom
+
+    def _current_filter(self):
+        if self.filter.retired:
+            self._open_filter()
+        return self.filter
+
+    def _transaction(self):
+        return _WriteTransaction(self)
+
+    def _issued(self, name):
+        return self._connection.execute(
+            "SELECT 1 FROM issued WHERE name = ?", (name,)).fetchone() \
+            is not None
+
+    def __contains__(self, name):
+        """Whether `name` was issued"""
+        with self._lock:
+            return name in self._current_filter() and self._issued(name)
+
+    def claim(self, name):
+        """
+        Issue `name` unless it already was
+
+        :return True if `name` is now issued to the caller, False if it
+                was issued before
+        """
+        return bool(self.claim_many([name]))
+
+    def claim_many(self, names):
+        """
+        Issue every name of `names` that wasn't issued yet, in a single
+        transaction
+
+        :return the list of names now issued to the caller, in order
+        """
+        claimed = list()
+        with self._lock:
+            bloom = self._current_filter()
+            # names the filter has seen are most likely issued, check
+            # those without taking the write lock
+            fresh = [name for name in names
+                     if name not in bloom or not self._issued(name)]
+            if not fresh:
+                return claimed
+            with self._transaction():
+                # the filter may have been replaced while we waited
+                bloom = self._current_filter()
+                for name in fresh:
+                    cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO issued (name) VALUES (?)",
+                        (name,))
+                    if cursor.rowcount == 1:
+                        bloom.add(name)
+                        claimed.append(name)
+        return claimed
+
+    def __len__(self):
+        """Number of issued names, counted by the database in O(n)"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM issued").fetchone()[0]
+
+    def compact(self, capacity=None):
+        """
+        Reclaim unused database space and rebuild the Bloom filter
+
+        :param capacity Names to size the new filter for, by default the
+               larger of `self.capacity` and twice the number of issued
+               names
+        """
+        with self._lock:
+            self._connection.execute("VACUUM")
+            with self._transaction():
+                if capacity is None:
+                    issued = self._connection.execute(
+                        "SELECT COUNT(*) FROM issued").fetchone()[0]
+                    capacity = max(self.capacity, 2 * issued)
+                self._rebuild_filter(capacity)
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            if self.filter is not None:
+                self.filter.close()
+                self.filter = None
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _WriteTransaction(object):
+    """
+    Holds the database's write lock, shared by every process, committing
+    on success and rolling back on errors. Nests within itself: only the
+    outermost block of a registry begins and ends the transaction.
+    """
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __enter__(self):
+        if not self.registry._transactions:
+            self.registry._connection.execute("BEGIN IMMEDIATE")
+        self.registry._transactions += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry._transactions -= 1
+        if not self.registry._transactions:
+            self.registry._connection.execute(
+                "ROLLBACK" if exc_type else "COMMIT")
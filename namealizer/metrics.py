@@ -0,0 +1,213 @@
+"""Counters and timing histograms of the work namealizer does
+
+Collection is off by default. enable_metrics starts it for the whole
+process; instrumented code checks namealizer's `_metrics` global and does
+nothing more while it is None:
+
+    metrics = enable_metrics()
+    wg.generate_many(10 ** 5)
+    print(metrics.summary())
+"""
+from __future__ import absolute_import
+
+import math
+import threading
+
+from namealizer import namealizer as _core
+
+
+class Histogram(object):
+    """
+    Distribution of durations in seconds
+
+    Samples are counted in power-of-two buckets, so recording one is O(1)
+    and the memory used doesn't grow with the number of samples.
+    Percentiles are the upper bound of the bucket they fall in, so they
+    overestimate by up to a factor of two.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = dict()
+
+    def add(self, seconds):
+        """Record one duration"""
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        # 2 ** (exponent - 1) <= seconds < 2 ** exponent
+        exponent = math.frexp(seconds)[1] if seconds > 0 else -64
+        self._buckets[exponent] = self._buckets.get(exponent, 0) + 1
+
+    @property
+    def mean(self):
+        """Mean duration, None before anything was recorded"""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction):
+        """
+        Duration below which `fraction` of the samples fall, None before
+        anything was recorded
+        """
+        if not self.count:
+            return None
+        seen, rank = 0, fraction * self.count
+        for exponent in sorted(self._buckets):
+            seen += self._buckets[exponent]
+            if seen >= rank:
+                return min(math.ldexp(1.0, exponent), self.max)
+        return self.max
+
+    def snapshot(self):
+        """Dict of the count, total, mean, min, max, p50, p90 and p99"""
+        return {"count": self.count, "total": self.total, "mean": self.mean,
+                "min": self.min, "max": self.max,
+                "p50": self.percentile(0.50), "p90": self.percentile(0.90),
+                "p99": self.percentile(0.99)}
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return "{:.1f} us".format(seconds * 1e6)
+    if seconds < 1:
+        return "{:.2f} ms".format(seconds * 1e3)
+    return "{:.2f} s".format(seconds)
+
+
+class Metrics(object):
+    """
+    Counters and timing histograms of the work namealizer does, collected
+    while enabled with enable_metrics
+
+    Counters:
+
+    - loads and compiles: load_dictionary calls, and those that had to
+      compile the dictionary
+    - draws.<letter>: words drawn, by their first letter
+    - format.<wordstyle>: names formatted in each wordstyle
+    - errors.<exception>: errors raised to callers, by exception class
+    - issued.skipped: names dropped because they were issued before
+    - blocked: names dropped because they matched the blocklist
+    - reloads: dictionaries reloaded by a DictionaryWatcher
+
+    Histograms, in seconds:
+
+    - load: one load_dictionary call
+    - name: one `wg[...]` call
+    - sample and format: drawing and formatting one batch of iter_many
+    - reload: reading and rebuilding a watched dictionary
+
+    Names generated in other processes by iter_sharded are not counted.
+    Safe to use from multiple threads.
+
+    :param exporters Callables given the snapshot() on every export()
+    """
+    def __init__(self, exporters=()):
+        self.counters = dict()
+        self.histograms = dict()
+        self.exporters = list(exporters)
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        """Add `value` to the counter `name`"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record a duration in the histogram `name`"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def error(self, error):
+        """Count an exception raised to a caller"""
+        self.count("errors." + type(error).__name__)
+
+    def draws(self, words):
+        """Count drawn words by their first letter"""
+        counters = self.counters
+        with self._lock:
+            for word in words:
+                name = "draws." + word[:1].lower()
+                counters[name] = counters.get(name, 0) + 1
+
+    def add_exporter(self, exporter):
+        """Call `exporter` with the snapshot() on every export()"""
+        self.exporters.append(exporter)
+
+    def snapshot(self):
+        """
+        Dict of the "counters" and of the "histograms", each histogram as
+        given by Histogram.snapshot
+        """
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "histograms": dict(
+                        (name, histogram.snapshot())
+                        for name, histogram in self.histograms.items())}
+
+    def export(self):
+        """Pass a snapshot to every exporter, and return it"""
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter(snapshot)
+        return snapshot
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def summary(self):
+        """Human readable report of everything collected"""
+        snapshot = self.snapshot()
+        lines = ["namealizer stats"]
+        for name in sorted(snapshot["counters"]):
+            lines.append("  {:<24} {:>12}".format(
+                name, snapshot["counters"][name]))
+        if snapshot["histograms"]:
+            lines.append("  {:<12} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+                "timing", "count", "mean", "p50", "p99", "max"))
+        for name in sorted(snapshot["histograms"]):
+            histogram = snapshot["histograms"][name]
+            lines.append("  {:<12} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+                name, histogram["count"], _format_seconds(histogram["mean"]),
+                _format_seconds(histogram["p50"]),
+                _format_seconds(histogram["p99"]),
+                _format_seconds(histogram["max"])))
+        return "\n".join(lines) + "\n"
+
+
+def enable_metrics(metrics=None):
+    """
+    Start collecting metrics, into `metrics` or a new Metrics object
+
+    :return the Metrics object collecting
+    """
+    _core._metrics = Metrics() if metrics is None else metrics
+    return _core._metrics
+
+
+def disable_metrics():
+    """
+    Stop collecting metrics
+
+    :return the Metrics object that was collecting, or None
+    """
+    metrics, _core._metrics = _core._metrics, None
+    return metrics
+
+
+def get_metrics():
+    """The Metrics object collecting, None while metrics are disabled"""
+    return _core._metrics
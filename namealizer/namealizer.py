@@ -1,214 +1,2715 @@
 """Create and format random collections of words"""
-from pkg_resources import resource_filename
-import argparse
+# argparse, logging, multiprocessing, tempfile and the decompression
+# modules are imported where they are used, keeping them off the startup
+# path of the command line tool
+import bisect
+import hashlib
+from array import array
+import math
+import mmap
+import operator
+import struct
 import sys
 import random
 import os
-import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from operator import methodcaller
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+try:
+    _string_types = (basestring,)
+except NameError:
+    _string_types = (str,)
+
+# dictionary bundled with the package, relative to this file
+DEFAULT_DICTIONARY = "dictionaries/all_en_US.dict"
+
+# compiled dictionaries live next to their source as `<name>.dictc`
+COMPILED_SUFFIX = "c"
+_COMPILED_MAGIC = b"NMZD"
+_COMPILED_VERSION = 3
+
+# magic, version, source mtime, source size, source sha1, words, letters,
+# flags
+_COMPILED_HEADER = struct.Struct("<4sHxxdQ20sIII")
+_COMPILED_LETTER = struct.Struct("<H")
+_COMPILED_RANGE = struct.Struct("<II")
+_COMPILED_OFFSET = struct.Struct("<I")
+_COMPILED_WEIGHT = struct.Struct("<d")
+
+# header flag set when a weight table follows the words
+_COMPILED_WEIGHTED = 1
+
+# ways of drawing words, see WordGenerator
+DISTRIBUTIONS = ("letter", "uniform", "weighted")
+
+# draws (or bulk batches) in a row that may only find issued or blocked
+# names before a generator with an `issued` registry or a `blocklist`
+# gives up
+ISSUED_ATTEMPTS = 1000
+
+# modules decompressing dictionaries, by file suffix, and their file
+# classes, used on Python 2 where they have no text mode (nor bz2.open)
+_COMPRESSION_MODULES = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma"}
+_COMPRESSION_FILES = {"gzip": "GzipFile", "bz2": "BZ2File",
+                      "lzma": "LZMAFile"}
+
+_clock = getattr(time, "perf_counter", time.time)
 
 
 class DictionaryNotFoundError(Exception):
     """
-    Exception to be raised when the script fails at importing a dictionary
+    Exception to be raised when the script fails at importing a dictionary
+    """
+    pass
+
+
+class InvalidWordStyleError(Exception):
+    """
+    Exception to raise when the user passes in an invalid wordstyle
+    """
+    pass
+
+
+class NoWordForLetter(Exception):
+    """
+    Raised when dictionary has no word beginning with requested letter
+    """
+    pass
+
+
+class SpaceExhaustedError(Exception):
+    """
+    Raised when every distinct name for a pattern has been generated
+    """
+    pass
+
+
+# Metrics collecting in this process, None while disabled so that
+# instrumented code only pays for checking this global; switched by
+# enable_metrics and disable_metrics, see namealizer.metrics
+_metrics = None
+
+
+class WordGenerator(object):
+    """
+    Main word generation class
+
+    Every generator owns its PRNG (`self.random`), so generators never
+    disturb each other or the global `random` module. Words can be drawn
+    from a generator shared between threads, but which thread gets which
+    name is then down to scheduling; a shared unique generator still never
+    repeats a name. For output that is reproducible under concurrency give
+    each thread its own stream with `spawn`, which is cheap because the
+    dictionary is shared rather than copied.
+
+    `distribution` decides how words are drawn:
+
+    - "letter" (the default) picks a uniformly random starting letter,
+      then a uniformly random word beginning with it, so words of rare
+      letters come up far more often than those of common ones
+    - "uniform" gives every word of the dictionary the same probability
+    - "weighted" draws words in proportion to the weight column of the
+      dictionary (`word<TAB>weight` lines, missing weights count as 1)
+
+    Each draw is O(1) under every distribution. Words for initials always
+    start with the given letter, uniformly unless weighted.
+    """
+    def __init__(self,
+                 dictionary=DEFAULT_DICTIONARY,
+                 wordstyle="lowercase", separator=" ",
+                 seed=None, unique=False, filters=None,
+                 distribution="letter", precased=False, issued=None,
+                 watch=None, blocklist=None):
+        """Initializer for WordGenerator
+
+        :param dictionary Any valid .dict formatted dictionary, a
+               dictionary that has already been loaded, or the
+               DictionaryWatcher of a dictionary file
+        :param wordstyle Any allowed `wordstyle` format specification
+        :param separator What character (or word) to separate words with
+        :param seed Seed to use for the PRNG
+        :param unique Never return the same name twice for a given count
+               or initials, see iter_many
+        :param filters Only use words accepted by this WordFilter, or by a
+               WordFilter built from a dict of its keyword arguments
+        :param distribution One of DISTRIBUTIONS
+        :param precased Draw words from a copy of the dictionary cased for
+               the wordstyle, see cased_dictionary, so they need no casing
+               when names are formatted. Costs a copy of the dictionary
+               per case in use; the names are the same either way
+        :param issued Never return a name already issued by this
+               IssuedNameRegistry, or the registry at this path, and
+               claim every name returned, see namealizer.issued
+        :param watch Check the dictionary file for edits at most every
+               `watch` seconds while generating, switching to the reloaded
+               dictionary when it changed, see DictionaryWatcher and
+               reload. Only dictionary files can be watched
+        :param blocklist Never return a name containing one of these
+               substrings, ignoring case: a Blocklist, an iterable of
+               substrings or the path of a file of them, see Blocklist.
+               Blocked names are replaced by new draws
+
+        :raises DictionaryNotFoundError if the `dictionary` parameter can't
+                be found on disk
+        :raises InvalidWordStyleError if user attempts to retrieve a word
+                when `self.wordstyle` is set to an invalid value
+        :raises NoWordForLetter when the user attempts to reteive a word
+                where the starting letter given does not exist in the
+                dictionary
+        :raises SpaceExhaustedError when `unique` is set and every name
+                for the requested count or initials has been returned,
+                or when `issued` or `blocklist` is set and no name that
+                is neither issued nor blocked turned up in
+                ISSUED_ATTEMPTS tries
+        :raises ValueError if `distribution` is not one of DISTRIBUTIONS,
+                or if `watch` is set for an already loaded dictionary
+        """
+        _check_distribution(distribution)
+        dictionary = resolve_dictionary(dictionary)
+        if filters is not None and not isinstance(filters, WordFilter):
+            filters = WordFilter(**filters)
+        self.filters = filters
+        self.watch = watch
+        self._watcher = None
+        # paths and loaded dictionaries are never watchers, saving them
+        # the import of namealizer.watch unless watching
+        if watch is not None or not (isinstance(dictionary, _string_types)
+                                     or hasattr(dictionary, "keys")):
+            watching = _import_submodule("watch")
+            if isinstance(dictionary, watching.DictionaryWatcher):
+                self._watcher = dictionary
+            elif watch is not None:
+                if hasattr(dictionary, "keys"):
+                    raise ValueError("Only dictionary files can be watched")
+                self._watcher = watching.watch_dictionary(dictionary)
+
+        if self._watcher is not None:
+            self._use(self._watcher.dictionary)
+            self._next_check = _clock() + (
+                float("inf") if watch is None else watch)
+        elif hasattr(dictionary, "keys"):
+            self._use(dictionary)
+        else:
+            self._use(dictionary_registry.get(dictionary))
+        self.wordstyle = wordstyle
+        self.separator = separator
+        self.unique = unique
+        self.distribution = distribution
+        self.precased = precased
+        if isinstance(issued, _string_types):
+            issued = _import_submodule("issued").IssuedNameRegistry(issued)
+        self.issued = issued
+        if blocklist is not None:
+            blocklist = _import_submodule("blocklist")._as_blocklist(
+                blocklist)
+        self.blocklist = blocklist
+        self._unique_cursors = dict()
+        self._unique_lock = threading.Lock()
+        # seed of the unique walks and the lane of them this generator
+        # takes, set for spawned generators, see spawn
+        self._unique_seed = None
+        self._unique_lane = (0, 1)
+        self.seed = seed
+
+    @property
+    def seed(self):
+        """Seed of this generator's PRNG, setting it restarts the PRNG"""
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed):
+        if seed is None:
+            seed = _new_seed()
+        self._seed = seed
+        self.random = random.Random(seed)
+
+    def spawn(self, stream, streams=None):
+        """
+        Create a generator for the independent PRNG stream `stream`
+
+        The new generator shares this one's dictionary and copies its
+        formatting options, and is seeded with derive_seed(self.seed,
+        stream), so the same seed and stream number always give the same
+        names regardless of which thread or process uses them.
+
+        In unique mode the streams split this generator's unique walks
+        between them: stream `stream` of `streams` takes every
+        `streams`-th name of each walk, starting with name `stream`, so
+        no name repeats within a stream or across the `streams` streams.
+        This generator's own walks overlap theirs and shouldn't be used
+        alongside them.
+
+        :param streams Number of streams sharing the unique walks,
+               required in unique mode
+
+        :raises ValueError in unique mode, unless 0 <= `stream` < `streams`
+        """
+        if self.unique and (streams is None or not 0 <= stream < streams):
+            raise ValueError("Unique generators need a stream number below "
+                             "the number of `streams` sharing their walks")
+        if self._watcher is not None:
+            dictionary, filters = self._watcher, self.filters
+        else:
+            dictionary, filters = self.dictionary, None
+        spawned = WordGenerator(dictionary, wordstyle=self.wordstyle,
+                                separator=self.separator,
+                                seed=derive_seed(self.seed, stream),
+                                unique=self.unique, filters=filters,
+                                distribution=self.distribution,
+                                precased=self.precased, issued=self.issued,
+                                watch=self.watch, blocklist=self.blocklist)
+        if self.unique:
+            lane, lanes = self._unique_lane
+            spawned._unique_seed = (self.seed if self._unique_seed is None
+                                    else self._unique_seed)
+            spawned._unique_lane = (lane + stream * lanes, lanes * streams)
+        return spawned
+
+    def _use(self, dictionary):
+        """Draw from `dictionary`, through `filters` when set"""
+        self._loaded = dictionary
+        if self.filters is not None:
+            dictionary = filtered_dictionary(dictionary, self.filters)
+        self.dictionary = dictionary
+
+    @property
+    def last_reload(self):
+        """ReloadReport of the watched dictionary's last reload, or None"""
+        if self._watcher is None:
+            return None
+        return self._watcher.last_reload
+
+    def reload(self):
+        """
+        Check the watched dictionary file for edits now, switching to the
+        reloaded dictionary if it changed
+
+        The switch replaces `dictionary` in a single assignment, so names
+        are drawn from either the old or the new words, never a mix of
+        both within a name. Unique-mode walks start over on the new
+        dictionary.
+
+        :return the ReloadReport of the dictionary switched to, None if
+                there was nothing to switch to
+        """
+        if self._watcher is None:
+            return None
+        if self.watch is not None:
+            self._next_check = _clock() + self.watch
+        self._watcher.check()
+        if self._watcher.dictionary is self._loaded:
+            return None
+        self._use(self._watcher.dictionary)
+        return self._watcher.last_reload
+
+    def _poll(self):
+        """
+        reload when watching and the check interval passed, returning
+        whether the dictionary changed
+        """
+        if self._watcher is None or _clock() < self._next_check:
+            return False
+        return self.reload() is not None
+
+    def __getitem__(self, key):
+        if _metrics is None:
+            return self._name(key)
+        start = _clock()
+        try:
+            name = self._name(key)
+        except Exception as error:
+            _metrics.error(error)
+            raise
+        _metrics.observe("name", _clock() - start)
+        _metrics.count("format." + self.wordstyle)
+        return name
+
+    def _name(self, key):
+        """One formatted name for `key`, see __getitem__"""
+        if self._watcher is not None:
+            self._poll()
+        name = self._draw(key)
+        if self.issued is None and self.blocklist is None:
+            return name
+        for _ in range(ISSUED_ATTEMPTS):
+            if self._accepts(name):
+                return name
+            name = self._draw(key)
+        raise SpaceExhaustedError(
+            "No name that is neither issued nor blocked in {} tries".format(
+                ISSUED_ATTEMPTS))
+
+    def _accepts(self, name):
+        """
+        Whether `name` isn't blocked and, with an `issued` registry, was
+        claimed
+        """
+        if self.blocklist is not None and self.blocklist.blocks(name):
+            if _metrics is not None:
+                _metrics.count("blocked")
+            return False
+        if self.issued is not None and not self.issued.claim(name):
+            if _metrics is not None:
+                _metrics.count("issued.skipped")
+            return False
+        return True
+
+    def _accept_many(self, names):
+        """
+        The names of the list `names` that aren't blocked and, with an
+        `issued` registry, were claimed
+        """
+        if self.blocklist is not None:
+            allowed = self.blocklist.allowed(names)
+            if _metrics is not None:
+                _metrics.count("blocked", len(names) - len(allowed))
+            names = allowed
+        if self.issued is not None:
+            claimed = self.issued.claim_many(names)
+            if _metrics is not None:
+                _metrics.count("issued.skipped", len(names) - len(claimed))
+            names = claimed
+        return names
+
+    def _draw(self, key):
+        """One formatted name for `key`, issued or blocked or not"""
+        formatter = get_formatter(self.wordstyle, self.separator)
+        cased = False
+        if self.unique and isinstance(key, (str, int)):
+            flat = self._flat_view(self.dictionary)
+            if isinstance(key, str):
+                cursor = self._unique_cursor(flat, None, key)
+            else:
+                cursor = self._unique_cursor(flat, key, None)
+            words = cursor.next_words()
+        elif isinstance(key, str):
+            sampler, rng = self._word_sampler(formatter), self.random
+            words = [sampler.word(rng, letter.lower()) for letter in key]
+            cased = self.precased
+        elif isinstance(key, int):
+            sampler, rng = self._word_sampler(formatter), self.random
+            words = [sampler.word(rng) for _ in range(key)]
+            cased = self.precased
+        elif isinstance(key, (list, tuple)):
+            index = prefix_index(self.dictionary)
+            words = [index.random_word(prefix, self.random)
+                     for prefix in key]
+        else:
+            raise TypeError
+
+        if _metrics is not None:
+            _metrics.draws(words)
+        if cased:
+            return formatter.join(words)
+        return formatter(words)
+
+    @property
+    def prefix_index(self):
+        """PrefixIndex of the dictionary, shared with other generators"""
+        return prefix_index(self.dictionary)
+
+    def generate_many(self, number, count=None, initials=None,
+                      vectorize=None, unique=None):
+        """
+        Return a list of `number` formatted names
+
+        See iter_many for the meaning of the parameters.
+        """
+        return list(self.iter_many(number, count=count, initials=initials,
+                                   vectorize=vectorize, unique=unique))
+
+    def iter_many(self, number, count=None, initials=None, vectorize=None,
+                  chunk_size=65536, unique=None):
+        """
+        Yield `number` formatted names, drawing the words in batches
+
+        In unique mode the generator walks a seeded pseudo-random
+        permutation of every combination of words for the count or
+        initials, so names never repeat, in constant memory and time per
+        name. Each count or initials pattern has its own walk, which
+        carries on across calls until reset_unique is called or the seed
+        or dictionary change. Unique names ignore `distribution`: every
+        combination of words is produced exactly once.
+
+        A watched dictionary is checked for edits before the first batch
+        and between batches, so a batch never mixes two versions of it.
+
+        :param number How many names to produce
+        :param count Words per name, as with `wg[count]`. Defaults to 2
+        :param initials Starting letters of each word, as with
+               `wg["abc"]`. Takes priority over `count`
+        :param vectorize Sample with NumPy, by default whenever it is
+               installed. The names produced for a given seed differ
+               between the NumPy and pure-Python samplers
+        :param chunk_size How many names to sample in each batch
+        :param unique Never repeat a name, defaults to `self.unique`
+
+        :raises NoWordForLetter if `initials` has a letter no word in the
+                dictionary starts with
+        :raises SpaceExhaustedError in unique mode, once every name for
+                the count or initials has been produced, or when `issued`
+                or `blocklist` is set and ISSUED_ATTEMPTS batches in a row
+                only held names issued before or blocked
+        """
+        metrics, issued, blocklist = _metrics, self.issued, self.blocklist
+        try:
+            if self._watcher is not None:
+                self._poll()
+            formatter = get_formatter(self.wordstyle, self.separator)
+            if unique is None:
+                unique = self.unique
+            if unique:
+                flat = self._flat_view(self.dictionary)
+                cursor = self._unique_cursor(flat, count, initials)
+                while number > 0:
+                    words = cursor.next_words()
+                    name = formatter(words)
+                    if metrics is not None:
+                        metrics.draws(words)
+                        metrics.count("format." + self.wordstyle)
+                    if (issued is not None or blocklist is not None) and \
+                            not self._accepts(name):
+                        continue
+                    number -= 1
+                    yield name
+                return
+
+            flat = self._flat_view(self._source(formatter))
+            sampler = _BatchSampler(flat, self.random, count=count,
+                                    initials=initials, vectorize=vectorize,
+                                    distribution=self.distribution)
+            format_words = formatter.join if self.precased else formatter
+            misses = 0
+            while number > 0:
+                if self._watcher is not None and self._poll():
+                    flat = self._flat_view(self._source(formatter))
+                    sampler = _BatchSampler(
+                        flat, self.random, count=count, initials=initials,
+                        vectorize=vectorize, distribution=self.distribution)
+                batch = min(number, chunk_size)
+                if metrics is not None:
+                    names = self._observe_batch(metrics, sampler, batch,
+                                                format_words)
+                elif issued is not None or blocklist is not None:
+                    names = [format_words(words)
+                             for words in sampler.sample(batch)]
+                else:
+                    for words in sampler.sample(batch):
+                        yield format_words(words)
+                    number -= batch
+                    continue
+
+                if issued is not None or blocklist is not None:
+                    names = self._accept_many(names)
+                misses = 0 if names else misses + 1
+                if misses >= ISSUED_ATTEMPTS:
+                    raise SpaceExhaustedError(
+                        "No name that is neither issued nor blocked in {} "
+                        "batches".format(ISSUED_ATTEMPTS))
+                for name in names:
+                    yield name
+                number -= len(names)
+        except Exception as error:
+            if metrics is not None:
+                metrics.error(error)
+            raise
+
+    def _observe_batch(self, metrics, sampler, batch, format_words):
+        """Sample and format one batch of iter_many, recording metrics"""
+        start = _clock()
+        rows = sampler.sample(batch)
+        sampled = _clock()
+        names = [format_words(words) for words in rows]
+        metrics.observe("sample", sampled - start)
+        metrics.observe("format", _clock() - sampled)
+        metrics.count("format." + self.wordstyle, len(names))
+        for words in rows:
+            metrics.draws(words)
+        return names
+
+    def name_at(self, index, count=None, initials=None):
+        """
+        The name at position `index` of this generator's counter-based
+        stream for the count or initials
+
+        Every name of the stream is computed directly from the seed, the
+        pattern and `index`, so any part of it can be produced in any
+        order, by any process, without generating what comes before. The
+        stream is the same on every platform and Python version for a
+        given seed, dictionary, distribution and pattern. It is separate
+        from the names `wg[...]` and iter_many draw, and doesn't advance
+        the PRNG or claim `issued` names. A blocked name is replaced by
+        drawing again from the same position's stream. In unique mode the
+        stream is the unique walk itself, so names never repeat, `index`
+        must be below the number of possible names, and every position
+        holds its name whether the blocklist matches it or not.
+
+        :param index Position in the stream, from 0
+        :param count Words per name, as with `wg[count]`. Defaults to 2
+        :param initials Starting letters of each word, as with
+               `wg["abc"]`. Takes priority over `count`
+
+        :raises IndexError if `index` is negative, or past the last name
+                in unique mode
+        :raises NoWordForLetter if `initials` has a letter no word in the
+                dictionary starts with
+        :raises SpaceExhaustedError if every one of ISSUED_ATTEMPTS names
+                drawn at `index` was blocked
+        """
+        if index < 0:
+            raise IndexError("name index out of range")
+        return self._stream_namer(count, initials)(index)
+
+    def names_range(self, start, stop, count=None, initials=None):
+        """
+        Yield the names at positions `start` up to `stop` of the
+        counter-based stream, see name_at
+        """
+        if start < 0:
+            raise IndexError("name index out of range")
+        name_at = self._stream_namer(count, initials)
+        for index in range(start, stop):
+            yield name_at(index)
+
+    def _stream_namer(self, count, initials):
+        """Function giving the name at an index, see name_at"""
+        formatter = get_formatter(self.wordstyle, self.separator)
+        if self.unique:
+            flat = self._flat_view(self.dictionary)
+            cursor = self._unique_cursor(flat, count, initials)
+
+            def unique_name_at(index):
+                if index >= cursor.size:
+                    raise IndexError("name index out of range")
+                return formatter(cursor.words_at(index))
+            return unique_name_at
+
+        sampler = self._word_sampler(formatter)
+        format_words = formatter.join if self.precased else formatter
+        if initials is not None:
+            letters = initials.lower()
+            key = "{}:initials:{}".format(self.seed, letters)
+        else:
+            letters = [None] * (2 if count is None else count)
+            key = "{}:count:{}".format(self.seed, len(letters))
+
+        blocklist = self.blocklist
+
+        def name_at(index):
+            stream = _CounterStream(key, index)
+            for _ in range(ISSUED_ATTEMPTS):
+                name = format_words([sampler.word_at(stream, letter)
+                                     for letter in letters])
+                if blocklist is None or not blocklist.blocks(name):
+                    return name
+            raise SpaceExhaustedError(
+                "No name that isn't blocked in {} tries".format(
+                    ISSUED_ATTEMPTS))
+        return name_at
+
+    def iter_sharded(self, number, count=None, initials=None, jobs=None,
+                     shard_size=100000, vectorize=None):
+        """
+        Yield `number` formatted names generated by a pool of processes
+
+        The names are split into shards of `shard_size`. Shard `k` is
+        generated from the PRNG stream derive_seed(self.seed, k), and the
+        shards are yielded in order, so for a given seed and shard size the
+        output is identical however many processes produce it. Workers
+        receive the dictionary once when they start; compiled dictionaries
+        are mapped from the same file rather than copied. With an `issued`
+        registry every worker opens its own connection to it, and names
+        issued before are replaced within their shard, as are blocked
+        names. The blocklist is compiled once per worker.
+
+        In unique mode the shards are consecutive stretches of the unique
+        walk instead, which carries on past them as with iter_many. Names
+        that were issued before or blocked are dropped by the shards, and
+        replaced by the names following the last shard once every shard
+        was yielded.
+
+        :param jobs Number of worker processes, defaults to one per CPU.
+               With a single job the shards are generated in this process
+        :param shard_size How many names each shard holds
+
+        See iter_many for the remaining parameters.
+        """
+        import multiprocessing
+
+        if vectorize is None:
+            vectorize = _import_numpy() is not None
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+
+        cursor, walk = None, None
+        if self.unique:
+            cursor = self._unique_cursor(self._flat_view(self.dictionary),
+                                         count, initials)
+            walk = (cursor.seed, cursor.lane, cursor.lanes)
+            # the shards take over this stretch of the walk
+            first, sharded = cursor.claim(number)
+        else:
+            first, sharded = 0, number
+
+        shards = list()
+        for shard, start in enumerate(range(0, sharded, shard_size)):
+            shards.append((self.seed, shard, min(shard_size, sharded - start),
+                           count, initials, vectorize,
+                           None if walk is None else walk + (first + start,)))
+
+        remaining = number
+        for names in self._run_shards(shards, jobs):
+            for name in names:
+                yield name
+            remaining -= len(names)
+
+        if cursor is not None:
+            formatter = get_formatter(self.wordstyle, self.separator)
+            while remaining > 0:
+                name = formatter(cursor.next_words())
+                if self._accepts(name):
+                    remaining -= 1
+                    yield name
+
+    def _run_shards(self, shards, jobs):
+        """Yield the names of every shard, see iter_sharded"""
+        import multiprocessing
+
+        if jobs <= 1 or len(shards) <= 1:
+            generator = WordGenerator(self.dictionary,
+                                      wordstyle=self.wordstyle,
+                                      separator=self.separator, seed=0,
+                                      distribution=self.distribution,
+                                      precased=self.precased,
+                                      issued=self.issued,
+                                      blocklist=self.blocklist)
+            for shard in shards:
+                yield _generate_shard(shard, generator)
+            return
+
+        pool = multiprocessing.Pool(
+            min(jobs, len(shards)), initializer=_init_shard_worker,
+            initargs=(self.dictionary, self.wordstyle, self.separator,
+                      self.distribution, self.precased, self.issued,
+                      self.blocklist))
+        try:
+            for names in pool.imap(_generate_shard, shards):
+                yield names
+        finally:
+            pool.terminate()
+
+    def space(self, pattern=2):
+        """
+        NameSpace of every name `wg[pattern]` can produce, formatted with
+        the current wordstyle and separator
+
+        Words keep the dictionary's order, or alphabetical order for
+        prefixes, so for a sorted dictionary the names are in
+        lexicographic order. The distribution has no effect, every
+        combination of words is in the space once.
+
+        :param pattern Words per name, initials or a list of prefixes, as
+               with `wg[pattern]`
+
+        :raises NoWordForLetter if no word in the dictionary starts with
+                one of the initials or prefixes
+        """
+        formatter = get_formatter(self.wordstyle, self.separator)
+        if isinstance(pattern, (list, tuple)):
+            index, positions = prefix_index(self.dictionary), list()
+            for prefix in pattern:
+                start, stop = index.prefix_range(prefix)
+                if start == stop:
+                    msg = "Dictionary does not contain a word starting " \
+                          "with '{}'"
+                    raise NoWordForLetter(msg.format(prefix))
+                positions.append((index.sorted_word, start, stop - start))
+            return NameSpace(positions, formatter)
+
+        flat = self._flat_view(self.dictionary)
+        if isinstance(pattern, str):
+            positions = [(flat.word,) + flat.letter_range(letter.lower())
+                         for letter in pattern]
+        elif isinstance(pattern, int):
+            positions = [(flat.word, 0, flat.total)] * pattern
+        else:
+            raise TypeError
+        return NameSpace(positions, formatter)
+
+    def reset_unique(self):
+        """Start every unique-mode walk over, allowing names to repeat"""
+        self._unique_cursors.clear()
+
+    def _unique_cursor(self, flat, count, initials):
+        """The unique-mode walk for this count or initials pattern"""
+        if initials is not None:
+            key = ("initials", initials.lower())
+        else:
+            key = ("count", 2 if count is None else count)
+
+        seed = self.seed if self._unique_seed is None else self._unique_seed
+        with self._unique_lock:
+            cursor = self._unique_cursors.get(key)
+            if cursor is None or \
+                    cursor.flat.dictionary is not flat.dictionary or \
+                    cursor.seed != seed:
+                cursor = _UniqueCursor(flat, count, initials, seed, key,
+                                       *self._unique_lane)
+                self._unique_cursors[key] = cursor
+        return cursor
+
+    def _flat_view(self, dictionary):
+        """Absolute-index view of `dictionary`, cached"""
+        flat = getattr(self, "_flat", None)
+        if flat is None or flat.dictionary is not dictionary:
+            flat = self._flat = _FlatView(dictionary)
+        return flat
+
+    def _source(self, formatter):
+        """
+        Dictionary to draw words from, the copy cased for `formatter` when
+        `precased` is set
+        """
+        if not self.precased:
+            return self.dictionary
+        cased = getattr(self, "_cased", None)
+        if cased is None or cased[0] is not self.dictionary or \
+                cased[1] != formatter.case:
+            cased = self._cased = (self.dictionary, formatter.case,
+                                   cased_dictionary(self.dictionary,
+                                                    formatter.case))
+        return cased[2]
+
+    def _word_sampler(self, formatter):
+        """_WordSampler for the current source and distribution"""
+        dictionary = self._source(formatter)
+        sampler = getattr(self, "_sampler", None)
+        if sampler is None or sampler.dictionary is not dictionary or \
+                sampler.distribution != self.distribution:
+            sampler = self._sampler = word_sampler(dictionary,
+                                                   self.distribution)
+        return sampler
+
+
+# generator used by the shards run in this process, see iter_sharded
+_shard_generator = None
+
+
+def _init_shard_worker(dictionary, wordstyle, separator, distribution,
+                       precased, issued, blocklist):
+    """Set up the generator every shard in this process draws from"""
+    global _shard_generator
+    _shard_generator = WordGenerator(dictionary, wordstyle=wordstyle,
+                                     separator=separator, seed=0,
+                                     distribution=distribution,
+                                     precased=precased, issued=issued,
+                                     blocklist=blocklist)
+
+
+def _generate_shard(shard, generator=None):
+    """Generate the names of one shard, see iter_sharded"""
+    if generator is None:
+        generator = _shard_generator
+    seed, index, number, count, initials, vectorize, walk = shard
+    if walk is None:
+        generator.seed = derive_seed(seed, index)
+        return generator.generate_many(number, count=count,
+                                       initials=initials,
+                                       vectorize=vectorize)
+
+    # a stretch of a unique walk, (seed, lane, lanes, first position)
+    generator.seed = walk[0]
+    generator._unique_lane = walk[1:3]
+    cursor = generator._unique_cursor(
+        generator._flat_view(generator.dictionary), count, initials)
+    formatter = get_formatter(generator.wordstyle, generator.separator)
+    names = [formatter(cursor.words_at(position))
+             for position in range(walk[3], walk[3] + number)]
+    if generator.issued is None and generator.blocklist is None:
+        return names
+    return generator._accept_many(names)
+
+
+class _FlatView(object):
+    """
+    Addresses every word of a dictionary by a single absolute index
+
+    Letters keep the dictionary's key order and words of one letter occupy
+    the contiguous indices `starts[i]` up to `starts[i] + sizes[i]`.
+    """
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.letters = list(dictionary.keys())
+        self.sizes = [len(dictionary[letter]) for letter in self.letters]
+        self.total = sum(self.sizes)
+        self._positions = dict()
+
+        self._words = None
+
+        if isinstance(dictionary, _PackedDictionary):
+            self.starts = [dictionary[letter].start
+                           for letter in self.letters]
+            self.word = dictionary.word
+        else:
+            self.starts, words = list(), list()
+            for letter in self.letters:
+                self.starts.append(len(words))
+                words.extend(dictionary[letter])
+            self.word = words.__getitem__
+            self._words = words
+
+        for position, letter in enumerate(self.letters):
+            self._positions[letter] = position
+
+    def words(self):
+        """
+        Every word as a list, for batches large enough that decoding the
+        whole dictionary once beats decoding each drawn word
+        """
+        if self._words is None:
+            self._words = [self.word(index) for index in range(self.total)]
+        return self._words
+
+    def letter_range(self, letter):
+        """(start, size) of the words beginning with `letter`"""
+        try:
+            position = self._positions[letter]
+        except KeyError:
+            msg = "Dictionary does not contain a word starting with '{}'"
+            raise NoWordForLetter(msg.format(letter))
+        return self.starts[position], self.sizes[position]
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value):
+    """splitmix64 finalizer, a fast well-distributed 64 bit hash"""
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return value ^ (value >> 31)
+
+
+class IndexPermutation(object):
+    """
+    Seeded pseudo-random bijection of range(size) onto itself
+
+    A balanced Feistel network permutes the smallest even-width power of
+    two covering `size`, and indices falling outside `size` are encrypted
+    again until they land inside it (cycle walking). Since that domain is
+    less than four times `size`, each lookup is O(1) on average and the
+    permutation takes no memory however large `size` is.
+    """
+    rounds = 4
+
+    def __init__(self, size, seed):
+        self.size = size
+        self._half = (max(size - 1, 1).bit_length() + 1) // 2
+        self._mask = (1 << self._half) - 1
+        self._keys = [derive_seed(seed, "permutation:{}".format(index))
+                      for index in range(self.rounds)]
+
+    def _round(self, value, key):
+        digest = key
+        while True:
+            digest = _mix64(digest ^ (value & _MASK64))
+            value >>= 64
+            if not value:
+                break
+
+        output, shift = 0, 0
+        while shift < self._half:
+            output |= _mix64(digest + shift) << shift
+            shift += 64
+        return output & self._mask
+
+    def _encrypt(self, value):
+        left, right = value >> self._half, value & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self._half) | right
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self):
+        return self.size
+
+
+class _CounterStream(object):
+    """
+    Random numbers of one name in a counter-based stream
+
+    The numbers are the 64 bit words of SHA-256 digests of the stream's
+    key, the name's index and a block counter, so they depend on nothing
+    else and are the same on every platform and Python version. Bounded
+    integers come from a 128 bit multiply of a 64 bit word, with Lemire's
+    rejection step making them exactly uniform.
+    """
+    def __init__(self, key, index):
+        self._prefix = "{}:{}:".format(key, index)
+        self._block = 0
+        self._values = list()
+
+    def next64(self):
+        """Next 64 bit word of the stream"""
+        if not self._values:
+            digest = hashlib.sha256("{}{}".format(
+                self._prefix, self._block).encode("utf-8")).digest()
+            self._block += 1
+            self._values = list(struct.unpack("<4Q", digest))[::-1]
+        return self._values.pop()
+
+    def randbelow(self, bound):
+        """Uniform integer in range(bound)"""
+        if bound <= 0:
+            raise ValueError("Cannot draw from an empty range")
+        product = self.next64() * bound
+        if product & _MASK64 < bound:
+            threshold = ((1 << 64) - bound) % bound
+            while product & _MASK64 < threshold:
+                product = self.next64() * bound
+        return product >> 64
+
+    def random(self):
+        """Uniform float in [0, 1), with 53 random bits"""
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+
+class _UniqueCursor(object):
+    """
+    Position of one unique-mode walk, see WordGenerator.iter_many
+
+    The walk covers every `lanes`-th position of the permutation starting
+    at `lane`, so walks of the same seed in different lanes never meet,
+    see WordGenerator.spawn. Positions are claimed under a lock, so threads
+    sharing a cursor never get the same one.
+    """
+    def __init__(self, flat, count, initials, seed, key, lane=0, lanes=1):
+        if initials is not None:
+            ranges = [flat.letter_range(letter.lower())
+                      for letter in initials]
+        else:
+            ranges = [(0, flat.total)] * (2 if count is None else count)
+
+        size = 1
+        for _, radix in ranges:
+            size *= radix
+
+        self.flat = flat
+        self.seed = seed
+        self.position = 0
+        self._lock = threading.Lock()
+        self.lane = lane
+        self.lanes = lanes
+        self._ranges = ranges[::-1]
+        self._permutation = IndexPermutation(
+            size, derive_seed(seed, "unique:{}:{}".format(*key)))
+
+    @property
+    def size(self):
+        """Number of names in the walk"""
+        return max(0, (self._permutation.size - self.lane + self.lanes - 1)
+                   // self.lanes)
+
+    def claim(self, number):
+        """
+        Claim the next `number` positions of the walk, or as many as are
+        left, returning the first of them and how many were claimed
+        """
+        with self._lock:
+            first = self.position
+            claimed = max(0, min(number, self.size - first))
+            self.position += claimed
+        return first, claimed
+
+    def next_words(self):
+        """Words of the next name in the walk"""
+        position, claimed = self.claim(1)
+        if not claimed:
+            raise SpaceExhaustedError(
+                "Every one of the {} names has been generated".format(
+                    self.size))
+        return self.words_at(position)
+
+    def words_at(self, position):
+        """Words of the name at `position` in the walk"""
+        index = self._permutation[self.lane + position * self.lanes]
+        words = list()
+        for start, radix in self._ranges:
+            index, digit = divmod(index, radix)
+            words.append(self.flat.word(start + digit))
+        words.reverse()
+        return words
+
+
+def _slice_range(key, length):
+    """
+    (start, step, length) of the slice `key` of range(length), like
+    slice.indices but exact for lengths beyond sys.maxsize
+
+    :raises ValueError if the slice step is zero
+    """
+    step = 1 if key.step is None else key.step
+    if step == 0:
+        raise ValueError("slice step cannot be zero")
+    lower, upper = (0, length) if step > 0 else (-1, length - 1)
+
+    def bound(value, default):
+        if value is None:
+            return default
+        if value < 0:
+            return max(value + length, lower)
+        return min(value, upper)
+
+    if step > 0:
+        start, stop = bound(key.start, lower), bound(key.stop, upper)
+        return start, step, max(0, (stop - start + step - 1) // step)
+    start, stop = bound(key.start, upper), bound(key.stop, lower)
+    return start, step, max(0, (start - stop - step - 1) // -step)
+
+
+class NameSpace(object):
+    """
+    Every name a pattern can produce, see WordGenerator.space
+
+    The names are those of itertools.product over the words available at
+    each position of the pattern, in that order, without materializing
+    anything: the name at an index is decoded from it as a mixed-radix
+    number, one digit per word, so `len`, indexing and slicing are O(1)
+    and iterating holds a single name at a time. Slices are NameSpaces
+    themselves.
+
+    `size` is the number of names. Python's len() can't go beyond
+    sys.maxsize, past which it raises OverflowError where `size` still
+    works. `entropy` is log2(size), the bits of a name drawn uniformly
+    from the space, as unique mode does; other distributions give less.
+    """
+    def __init__(self, positions, formatter, start=0, step=1, size=None):
+        """
+        :param positions List of (word, start, size) per word of the
+               names, `word(start + i)` being the i-th of `size` words
+        :param formatter Formatter of the names
+        """
+        self._positions = positions
+        self._formatter = formatter
+        self._start = start
+        self._step = step
+        self._full = 1
+        for _, _, radix in positions:
+            self._full *= radix
+        self.size = self._full if size is None else size
+
+    @property
+    def entropy(self):
+        """log2 of the number of names, in bits"""
+        if not self.size:
+            return 0.0
+        if self.size == self._full:
+            return sum(math.log(radix, 2) for _, _, radix in self._positions)
+        return math.log(self.size, 2)
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<NameSpace of {} names, {:.1f} bits>".format(
+            self.size, self.entropy)
+
+    def words(self, index):
+        """List of the words of the name at `index`, unformatted"""
+        index = operator.index(index)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("name index out of range")
+        index = self._start + index * self._step
+        words = list()
+        for word, start, radix in reversed(self._positions):
+            index, digit = divmod(index, radix)
+            words.append(word(start + digit))
+        words.reverse()
+        return words
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, step, size = _slice_range(index, self.size)
+            return NameSpace(self._positions, self._formatter,
+                             self._start + start * self._step,
+                             self._step * step, size)
+        return self._formatter(self.words(index))
+
+    def __iter__(self):
+        if self._step != 1 or not self.size:
+            index = 0
+            while index < self.size:
+                yield self[index]
+                index += 1
+            return
+
+        # count up like an odometer, decoding only the words that change
+        positions, words = self._positions, self.words(0)
+        digits, index = list(), self._start
+        for _, _, radix in reversed(positions):
+            index, digit = divmod(index, radix)
+            digits.append(digit)
+        digits.reverse()
+
+        remaining = self.size
+        while True:
+            yield self._formatter(words)
+            remaining -= 1
+            if not remaining:
+                return
+            position = len(positions) - 1
+            while True:
+                word, start, radix = positions[position]
+                digits[position] += 1
+                if digits[position] < radix:
+                    words[position] = word(start + digits[position])
+                    break
+                digits[position] = 0
+                words[position] = word(start)
+                position -= 1
+
+
+class _SortedWords(Sequence):
+    """Words of a _FlatView in the order given by an index array"""
+    def __init__(self, flat, order):
+        self._word = flat.word
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, index):
+        return self._word(self._order[index])
+
+
+class PrefixIndex(object):
+    """
+    Sorted index answering prefix queries over a dictionary
+
+    Holds the absolute index of every word in alphabetical order, so the
+    words sharing a prefix form one contiguous run located with two binary
+    searches: counting them or drawing one at random is O(log N).
+    Prefixes are matched case-insensitively, like initials.
+    """
+    def __init__(self, dictionary):
+        flat = _FlatView(dictionary)
+        words = flat.words()
+        order = array("I", sorted(range(flat.total), key=words.__getitem__))
+
+        self.dictionary = dictionary
+        self.nbytes = order.itemsize * len(order)
+        self._sorted = _SortedWords(flat, order)
+
+    def prefix_range(self, prefix):
+        """[start, stop) positions in sorted order of words with `prefix`"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._sorted, prefix)
+        if not prefix:
+            return start, len(self._sorted)
+
+        try:
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        except ValueError:
+            # the last character can't be incremented, fall back to a scan
+            stop = start
+            while stop < len(self._sorted) and \
+                    self._sorted[stop].startswith(prefix):
+                stop += 1
+            return start, stop
+        return start, bisect.bisect_left(self._sorted, upper, start)
+
+    def sorted_word(self, position):
+        """Word at `position` in alphabetical order"""
+        return self._sorted[position]
+
+    def count(self, prefix):
+        """Number of words starting with `prefix`"""
+        start, stop = self.prefix_range(prefix)
+        return stop - start
+
+    def words(self, prefix):
+        """List of the words starting with `prefix`, in sorted order"""
+        start, stop = self.prefix_range(prefix)
+        return [self._sorted[index] for index in range(start, stop)]
+
+    def random_word(self, prefix, rng=None):
+        """
+        Uniformly random word starting with `prefix`
+
+        :raises NoWordForLetter if no word starts with `prefix`
+        """
+        start, stop = self.prefix_range(prefix)
+        if start == stop:
+            msg = "Dictionary does not contain a word starting with '{}'"
+            raise NoWordForLetter(msg.format(prefix))
+        if rng is None:
+            rng = random
+        return self._sorted[start + int(rng.random() * (stop - start))]
+
+
+class AliasTable(object):
+    """
+    Walker's alias table, drawing indices in proportion to their weights
+
+    Vose's construction turns n weights into n equally likely columns of
+    at most two outcomes each, in O(n) time. A draw then costs O(1) and a
+    single uniform variate, whose integer part (once scaled by n) picks
+    the column and whose fractional part picks one of its two outcomes.
+
+    :param weights Non-negative weights, not all zero
+    """
+    def __init__(self, weights):
+        size = len(weights)
+        total = float(sum(weights))
+        if not size or not total > 0 or min(weights) < 0:
+            raise ValueError("Weights must be non-negative and not all zero")
+
+        scaled = [weight * size / total for weight in weights]
+        small = [index for index in range(size) if scaled[index] < 1.0]
+        large = [index for index in range(size) if scaled[index] >= 1.0]
+        prob = array("d", [1.0]) * size
+        alias = array("I", range(size))
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left over has a probability of 1 up to rounding
+
+        self.size = size
+        self.prob = prob
+        self.alias = alias
+
+    def draw(self, uniform):
+        """Index chosen by the uniform variate `uniform` in [0, 1)"""
+        column = uniform * self.size
+        index = int(column)
+        if column - index < self.prob[index]:
+            return index
+        return self.alias[index]
+
+    def sample(self, rng=None):
+        """Random index, drawn from `rng` or the global `random` module"""
+        return self.draw((random if rng is None else rng).random())
+
+    @property
+    def nbytes(self):
+        """Size of the probability and alias tables in bytes"""
+        return (self.prob.itemsize * len(self.prob) +
+                self.alias.itemsize * len(self.alias))
+
+
+class _WordSampler(object):
+    """
+    Draws single words of a dictionary under one of DISTRIBUTIONS
+
+    The "letter" distribution consumes the PRNG exactly like
+    get_random_word, so seeds keep giving the names they always gave.
+    Weighted draws go through an AliasTable over every word, or over the
+    words of one letter for initials. Uniform draws are the alias method's
+    degenerate case of equal weights, a single scaled index that needs no
+    table, which is also what weighting a dictionary without weights
+    comes down to.
+    """
+    def __init__(self, dictionary, distribution):
+        flat = _FlatView(dictionary)
+        weights = None
+        if distribution == "weighted":
+            weights = getattr(dictionary, "weights", None)
+
+        self.dictionary = dictionary
+        self.distribution = distribution
+        self.flat = flat
+        self.table = None if weights is None else AliasTable(weights)
+        self._weights = weights
+        self._letter_words = [dictionary[letter] for letter in flat.letters]
+        self._letter_tables = dict()
+
+    @property
+    def nbytes(self):
+        """Size of the alias tables built so far in bytes"""
+        tables = [table for _, table in self._letter_tables.values()]
+        if self.table is not None:
+            tables.append(self.table)
+        return sum(table.nbytes for table in tables)
+
+    def letter_table(self, letter):
+        """
+        (start, AliasTable) drawing the words beginning with `letter` by
+        weight, None unless sampling by weight
+
+        :raises NoWordForLetter if no word starts with `letter`
+        """
+        if self._weights is None:
+            return None
+        entry = self._letter_tables.get(letter)
+        if entry is None:
+            start, size = self.flat.letter_range(letter)
+            entry = (start, AliasTable(self._weights[start:start + size]))
+            self._letter_tables[letter] = entry
+        return entry
+
+    def word_at(self, stream, letter=None):
+        """
+        Word drawn from the _CounterStream `stream`, beginning with
+        `letter` if given, see WordGenerator.name_at
+
+        :raises NoWordForLetter if no word starts with `letter`
+        """
+        flat = self.flat
+        if letter is not None:
+            entry = self.letter_table(letter)
+            if entry is not None:
+                start, table = entry
+                return flat.word(start + table.draw(stream.random()))
+            start, size = flat.letter_range(letter)
+            return flat.word(start + stream.randbelow(size))
+
+        if self.table is not None:
+            return flat.word(self.table.draw(stream.random()))
+        if self.distribution != "letter":
+            return flat.word(stream.randbelow(flat.total))
+        position = stream.randbelow(len(flat.letters))
+        return flat.word(flat.starts[position] +
+                         stream.randbelow(flat.sizes[position]))
+
+    def word(self, rng, letter=None):
+        """
+        Random word, beginning with `letter` if given
+
+        :raises NoWordForLetter if no word starts with `letter`
+        """
+        flat = self.flat
+        if letter is None:
+            if self.table is not None:
+                return flat.word(self.table.sample(rng))
+            if self.distribution != "letter":
+                return flat.word(int(rng.random() * flat.total))
+            return rng.choice(rng.choice(self._letter_words))
+
+        entry = self.letter_table(letter)
+        if entry is not None:
+            start, table = entry
+            return flat.word(start + table.sample(rng))
+        try:
+            words = self.dictionary[letter]
+        except KeyError:
+            msg = "Dictionary does not contain a word starting with '{}'"
+            raise NoWordForLetter(msg.format(letter))
+        return rng.choice(words)
+
+
+def _import_numpy():
+    """NumPy if it is installed, otherwise None"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class _BatchSampler(object):
+    """
+    Draws the words of batches of names
+
+    Words follow the same distribution as _WordSampler's: by default a
+    uniformly random starting letter (or the one given by `initials`),
+    then a uniformly random word beginning with it. With NumPy, letters
+    and offsets come from two streams seeded once from `rng`; either way
+    the names drawn don't depend on how they are split into batches.
+    """
+    def __init__(self, flat, rng, count=None, initials=None,
+                 vectorize=None, distribution="letter"):
+        tables = None
+        if distribution != "letter":
+            tables = word_sampler(flat.dictionary, distribution)
+
+        # every column is drawn from (start, size, AliasTable or None),
+        # except for counts under the letter distribution
+        if initials is not None:
+            self._columns = list()
+            for letter in initials:
+                entry = tables and tables.letter_table(letter.lower())
+                if entry is None:
+                    start, size = flat.letter_range(letter.lower())
+                    self._columns.append((start, size, None))
+                else:
+                    start, table = entry
+                    self._columns.append((start, table.size, table))
+            self.width = len(self._columns)
+        else:
+            self.width = 2 if count is None else count
+            self._columns = None
+            if tables is not None:
+                self._columns = [(0, flat.total, tables.table)] * self.width
+
+        numpy = _import_numpy() if vectorize is not False else None
+        if vectorize and numpy is None:
+            raise ImportError("NumPy is required for vectorized sampling")
+
+        self.flat = flat
+        self._rng = rng
+        self._numpy = numpy
+        if numpy is not None:
+            self._letter_state = numpy.random.RandomState(rng.getrandbits(32))
+            self._offset_state = numpy.random.RandomState(rng.getrandbits(32))
+            self._column_tables = [
+                None if table is None
+                else (numpy.asarray(table.prob), numpy.asarray(table.alias))
+                for _, _, table in self._columns or ()]
+
+    def sample(self, number):
+        """Return the word lists of the next `number` names"""
+        flat, width = self.flat, self.width
+        if width == 0:
+            return [[] for _ in range(number)]
+
+        if self._numpy is not None:
+            indices = self._sample_vectorized(number)
+        elif self._columns is not None:
+            uniform, columns = self._rng.random, self._columns
+            indices = [[start + (int(uniform() * size) if table is None
+                                 else table.draw(uniform()))
+                        for start, size, table in columns]
+                       for _ in range(number)]
+        else:
+            uniform = self._rng.random
+            starts, sizes = flat.starts, flat.sizes
+            letters = len(flat.letters)
+            indices = list()
+            for _ in range(number):
+                row = list()
+                for _ in range(width):
+                    letter = int(uniform() * letters)
+                    row.append(starts[letter] +
+                               int(uniform() * sizes[letter]))
+                indices.append(row)
+
+        if number * width < flat.total:
+            word = flat.word
+            return [[word(index) for index in row] for row in indices]
+        words = flat.words()
+        return [[words[index] for index in row] for row in indices]
+
+    def _sample_vectorized(self, number):
+        numpy, flat, shape = self._numpy, self.flat, (number, self.width)
+        if self._columns is None:
+            letters = self._letter_state.randint(0, len(flat.letters), shape)
+            starts = numpy.array(flat.starts)[letters]
+            sizes = numpy.array(flat.sizes)[letters]
+            offsets = self._offset_state.random_sample(shape) * sizes
+            return (starts + offsets.astype(numpy.int64)).tolist()
+
+        variates = self._offset_state.random_sample(shape)
+        indices = numpy.empty(shape, numpy.int64)
+        for column, (start, size, _) in enumerate(self._columns):
+            scaled = variates[:, column] * size
+            offsets = scaled.astype(numpy.int64)
+            tables = self._column_tables[column]
+            if tables is not None:
+                prob, alias = tables
+                offsets = numpy.where(scaled - offsets < prob[offsets],
+                                      offsets, alias[offsets])
+            indices[:, column] = start + offsets
+        return indices.tolist()
+
+
+def write_names(names, stream=None, buffer_size=65536):
+    """
+    Write names to `stream` (stdout by default), one per line
+
+    Lines are gathered into writes of roughly `buffer_size` characters.
+    Returns the number of names written.
+    """
+    if stream is None:
+        stream = sys.stdout
+
+    written, pending, pending_size = 0, list(), 0
+    for name in names:
+        pending.append(name)
+        pending_size += len(name) + 1
+        written += 1
+        if pending_size >= buffer_size:
+            pending.append("")
+            stream.write("\n".join(pending))
+            pending, pending_size = list(), 0
+
+    if pending:
+        pending.append("")
+        stream.write("\n".join(pending))
+    return written
+
+
+def format_word_list_lowercase(word_list):
+    """
+    Given a list of words, this function returns a new list where all of
+    the words are lowercase
+
+    :param word_list: list, a list of words
+    :return: list, a list of words formatted in lowercase
+    """
+    return [word.lower() for word in word_list]
+
+
+def format_word_list_uppercase(word_list):
+    """
+    Given a list of words, this function returns a new list where all of
+    the words are uppercase
+
+    :param word_list: list, a list of words
+    :return: list, a list of words formatted in uppercase
+    """
+    return [word.upper() for word in word_list]
+
+
+def format_word_list_capitalize(word_list):
+    """
+    Given a list of words, this function returns a new list where all of
+    the words are capitalized
+
+    :param word_list: list, a list of words
+    :return: list, a list of words where each word is capitalized
+    """
+    return [word.capitalize() for word in word_list]
+
+
+def format_word_list_mixedcase(word_list):
+    """
+    Given a list of words, this function returns a new list where the
+    words follow mixed case convention.
+
+    As a reminder this is mixedCase.
+
+    :param word_list: list, a list of words
+    :return: list, a list of words where the words are mixed case
+    """
+    to_return, first_word = list(), True
+    for word in word_list:
+        if first_word:
+            to_return.append(word.lower())
+            first_word = False
+        else:
+            to_return.append(word.capitalize())
+    return to_return
+
+
+# wordstyle: (word list formatter, str method casing most words,
+# separator the style imposes if any)
+_WORDSTYLES = {
+    "lowercase": (format_word_list_lowercase, "lower", None),
+    "uppercase": (format_word_list_uppercase, "upper", None),
+    "capitalize": (format_word_list_capitalize, "capitalize", None),
+    "mixedcase": (format_word_list_mixedcase, "capitalize", None),
+    "snake": (format_word_list_lowercase, "lower", "_"),
+    "kebab": (format_word_list_lowercase, "lower", "-"),
+    "constant": (format_word_list_uppercase, "upper", "_"),
+    "dot": (format_word_list_lowercase, "lower", "."),
+}
+
+
+class Formatter(object):
+    """
+    Turns lists of words into names for one wordstyle and separator
+
+    Everything that depends on the style is worked out once, when the
+    formatter is created, so formatting a name is a single pass casing
+    its words and a join. The snake, kebab, constant and dot styles come
+    with their own separator, which takes the place of `separator`.
+
+    `case` names the str method the style applies to every word (but the
+    first, for mixedcase). Words that already went through it, such as
+    those of cased_dictionary(dictionary, formatter.case), can be given to
+    `join` instead, which skips casing them.
+
+    :raises InvalidWordStyleError if `wordstyle` is not a known style
+    """
+    def __init__(self, wordstyle="lowercase", separator=" "):
+        try:
+            format_words, case, style_separator = _WORDSTYLES[wordstyle]
+        except KeyError:
+            msg = "Passed in an invalid wordstyle, allowed styles are {}"
+            raise InvalidWordStyleError(msg.format(sorted(_WORDSTYLES)))
+
+        self.wordstyle = wordstyle
+        self.separator = (str(separator) if style_separator is None
+                          else style_separator)
+        self.case = case
+        self._format_words = format_words
+        self._mixed = wordstyle == "mixedcase"
+        self._join = self.separator.join
+
+    def __call__(self, words):
+        """Name made of the list of `words`"""
+        return self._join(self._format_words(words))
+
+    def join(self, words):
+        """Name made of a list of `words` already cased by `case`"""
+        if self._mixed and words:
+            return self._join([words[0].lower()] + words[1:])
+        return self._join(words)
+
+
+# formatters handed out by get_formatter
+_formatters = dict()
+
+
+def get_formatter(wordstyle="lowercase", separator=" "):
+    """
+    Shared Formatter for `wordstyle` and `separator`, created on first use
+
+    :raises InvalidWordStyleError if `wordstyle` is not a known style
+    """
+    try:
+        return _formatters[(wordstyle, separator)]
+    except KeyError:
+        pass
+    formatter = Formatter(wordstyle, separator)
+    if len(_formatters) >= 256:
+        # arbitrary separators could grow the cache without bound
+        _formatters.clear()
+    _formatters[(wordstyle, separator)] = formatter
+    return formatter
+
+
+def format_string(string_to_format, wordstyle="lowercase", separator=" "):
+    """
+    Takes an un-formatted string and returns it in the desired format
+    Acceptable formats are the keys of the _WORDSTYLES dictionary.
+    """
+    return get_formatter(wordstyle, separator)(string_to_format.split(" "))
+
+
+def get_random_word(dictionary, starting_letter=None, rng=None):
+    """
+    Takes the dictionary to read from and returns a random word
+    optionally accepts a starting letter and the PRNG to draw from,
+    which defaults to the global `random` module
+    """
+    if rng is None:
+        rng = random
+
+    if starting_letter is None:
+        starting_letter = rng.choice(list(dictionary.keys()))
+
+    try:
+        to_return = rng.choice(dictionary[starting_letter])
+    except KeyError:
+        msg = "Dictionary does not contain a word starting with '{}'"
+        raise NoWordForLetter(msg.format(starting_letter))
+
+    return to_return
+
+
+def _parse_line(line):
+    """
+    Word and weight of a `word` or `word<TAB>weight` dictionary line, the
+    weight being None when the line has none
+
+    :raises ValueError if the weight is not a non-negative number
+    """
+    word, _, weight = line.strip().partition("\t")
+    word = word.rstrip().lower()
+    if not weight:
+        return word, None
+    try:
+        value = float(weight)
+    except ValueError:
+        value = -1.0
+    if not value >= 0:
+        raise ValueError("Invalid weight {!r} for the word {!r}".format(
+            weight, word))
+    return word, value
+
+
+def _load_into_dictionary(dictionary_file):
+    """
+    create the dictionary to hold the words, its letters in the order they
+    first appear in the file
+    """
+    to_return = OrderedDict()
+    for line in dictionary_file:
+        word = _parse_line(line)[0]
+        try:
+            to_return[line[0].lower()].append(word)
+        except KeyError:
+            to_return[line[0].lower()] = [word]
+
+    return to_return
+
+
+def open_dictionary(path, mode="r"):
+    """
+    Open a dictionary file as text, transparently (de)compressing files
+    ending in .gz, .bz2 or .xz as they are read or written
+
+    :param mode "r" to read the file, "w" to write it
+    """
+    module = None
+    if isinstance(path, _string_types):
+        module = _COMPRESSION_MODULES.get(os.path.splitext(path)[1].lower())
+    if module is None:
+        return open(path, mode)
+    import importlib
+    if sys.version_info[0] == 2:
+        # byte strings, as open() gives on Python 2
+        file_class = _COMPRESSION_FILES[module]
+        return getattr(importlib.import_module(module), file_class)(path,
+                                                                    mode)
+    return importlib.import_module(module).open(path, mode + "t")
+
+
+def _hash_file(path, chunk_size=1 << 20):
+    """sha1 digest of the file at `path`, read a chunk at a time"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def import_dictionary(dictionary):
+    """
+    Function used to import the dictionary file into memory
+    opened_file should be an already opened dictionary file
+
+    :raises DictionaryNotFoundError if dictionary can't be loaded
+    """
+    try:
+        with open_dictionary(dictionary) as dictionary_file:
+            to_return = _load_into_dictionary(dictionary_file)
+
+    except TypeError:
+        to_return = _load_into_dictionary(dictionary)
+
+    except IOError:
+        message = "Could not find the dictionary at {}".format(dictionary)
+        raise DictionaryNotFoundError(message)
+
+    return to_return
+
+
+class _WordRange(Sequence):
+    """Lazily decoded run of words sharing a starting letter"""
+    def __init__(self, dictionary, start, stop):
+        self._dictionary = dictionary
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("word index out of range")
+        return self._dictionary.word(self.start + index)
+
+
+class _PackedDictionary(object):
+    """
+    Dictionary whose words are stored packed and decoded on lookup
+
+    Subclasses fill `_letters` with the starting letters in the order they
+    first appear in the source file and `_ranges` with the _WordRange of
+    each letter, and implement `word`. Lookups mirror the `{letter: [words]}`
+    mapping from import_dictionary, including key order and word order
+    within each letter, so a given seed picks the same words from either
+    representation on any interpreter.
+
+    `weights` holds the weight of every word by absolute position, as an
+    array('d'), or is None when the dictionary has no weight column.
     """
-    pass
+    weights = None
 
+    def word(self, index):
+        """Decode the word at absolute position `index`"""
+        raise NotImplementedError
 
-class InvalidWordStyleError(Exception):
+    def keys(self):
+        return list(self._letters)
+
+    def values(self):
+        return [self._ranges[letter] for letter in self._letters]
+
+    def items(self):
+        return [(letter, self._ranges[letter]) for letter in self._letters]
+
+    def __getitem__(self, letter):
+        return self._ranges[letter]
+
+    def __contains__(self, letter):
+        return letter in self._ranges
+
+    def __iter__(self):
+        return iter(self._letters)
+
+    def __len__(self):
+        return len(self._letters)
+
+
+class CompiledDictionary(_PackedDictionary):
     """
-    Exception to raise when the user passes in an invalid wordstyle
+    Read-only view over a compiled dictionary
+
+    The compiled format is a header, a table of per-letter word ranges,
+    an offset table, a packed blob of utf-8 encoded words and, for
+    dictionaries with a weight column, a table of weights. Words are
+    only decoded when they are looked up, so wrapping an `mmap` of a
+    compiled file costs next to nothing and its pages are shared between
+    every process that maps the same file.
+
+    `path` is the compiled file mapped into `buffer`, if any. Pickling a
+    mapped dictionary only records that path, so other processes map the
+    same file instead of receiving a copy of it.
     """
-    pass
+    def __init__(self, buffer, path=None):
+        header = _read_compiled_header(buffer)
+        if header is None:
+            raise DictionaryNotFoundError("Not a compiled dictionary")
 
+        self._buffer = buffer
+        self.path = path
+        self.word_count = header[5]
+        self._ranges = dict()
+        self._letters = list()
 
-class NoWordForLetter(Exception):
+        position = _COMPILED_HEADER.size
+        for _ in range(header[6]):
+            length, = _COMPILED_LETTER.unpack_from(buffer, position)
+            position += _COMPILED_LETTER.size
+            letter = bytes(buffer[position:position + length]).decode("utf-8")
+            position += length
+            start, stop = _COMPILED_RANGE.unpack_from(buffer, position)
+            position += _COMPILED_RANGE.size
+            self._letters.append(letter)
+            self._ranges[letter] = _WordRange(self, start, stop)
+
+        self._offsets = position + (-position % _COMPILED_OFFSET.size)
+        offsets_size = _COMPILED_OFFSET.size * (self.word_count + 1)
+        self._blob = self._offsets + offsets_size
+
+        self._weights = None
+        self._weighted = bool(header[7] & _COMPILED_WEIGHTED)
+        blob_size, = _COMPILED_OFFSET.unpack_from(
+            buffer, self._blob - _COMPILED_OFFSET.size)
+        position = self._blob + blob_size
+        self._weight_table = position + (-position % _COMPILED_WEIGHT.size)
+
+    def __reduce__(self):
+        if self.path is not None:
+            return _open_compiled, (self.path,)
+        return CompiledDictionary, (bytes(self._buffer),)
+
+    @property
+    def nbytes(self):
+        """Size of the underlying compiled buffer in bytes"""
+        return len(self._buffer)
+
+    @property
+    def weights(self):
+        """Weight of every word, unpacked on first use"""
+        if self._weights is None and self._weighted:
+            self._weights = array("d", struct.unpack_from(
+                "<{}d".format(self.word_count), self._buffer,
+                self._weight_table))
+        return self._weights
+
+    def word(self, index):
+        """Decode the word at absolute position `index`"""
+        position = self._offsets + _COMPILED_OFFSET.size * index
+        start, stop = _COMPILED_RANGE.unpack_from(self._buffer, position)
+        start += self._blob
+        stop += self._blob
+        return bytes(self._buffer[start:stop]).decode("utf-8")
+
+    def _letter_block(self, letter):
+        """
+        Packed words of `letter`, as the bytes holding them and the
+        offsets delimiting them, see WordStore._letter_block
+        """
+        words = self._ranges[letter]
+        position = self._offsets + _COMPILED_OFFSET.size * words.start
+        offsets = array("I", bytes(self._buffer[
+            position:position + _COMPILED_OFFSET.size * (len(words) + 1)]))
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        return (bytes(self._buffer[self._blob + offsets[0]:
+                                   self._blob + offsets[-1]]), offsets)
+
+
+class WordStore(_PackedDictionary):
     """
-    Raised when dictionary has no word beginning with requested letter
+    Compact in-memory dictionary
+
+    All words live utf-8 encoded in one bytes buffer, delimited by an
+    `array('I')` offset table, with the words of each letter occupying a
+    contiguous range of indices. That avoids a str object and a list slot
+    per word, cutting the memory of the bundled dictionary to about a
+    fifth of import_dictionary's, and words are only decoded when drawn.
     """
-    pass
+    def __init__(self, blob, offsets, letter_ranges, weights=None):
+        """
+        :param blob Every word, utf-8 encoded and concatenated
+        :param offsets array('I') where word i is blob[offsets[i]:
+               offsets[i + 1]]
+        :param letter_ranges List of (letter, start, stop) word ranges
+        :param weights array('d') holding the weight of every word, or
+               None when the words have no weights
+        """
+        self._blob = blob
+        self._offsets = offsets
+        self._letter_ranges = letter_ranges
+        self.weights = weights
+        self.word_count = len(offsets) - 1
+        self._letters = [letter for letter, _, _ in letter_ranges]
+        self._ranges = dict((letter, _WordRange(self, start, stop))
+                            for letter, start, stop in letter_ranges)
 
+    @classmethod
+    def from_dictionary(cls, dictionary, transform=None):
+        """
+        Pack a `{letter: [words]}` mapping, or any loaded dictionary, into
+        a WordStore, keeping the weights of packed dictionaries
 
-class WordGenerator(object):
-    """Main word generation class"""
-    def __init__(self,
-                 dictionary="dictionaries/all_en_US.dict",
-                 wordstyle="lowercase", separator=" ",
-                 seed=None):
-        """Initializer for WordGenerator
+        :param transform Function applied to every word, if given
+        """
+        blob, offsets, letter_ranges = list(), array("I", [0]), list()
+        source_weights = getattr(dictionary, "weights", None)
+        weights = None if source_weights is None else array("d")
+        position = 0
+        for letter, words in dictionary.items():
+            start = len(offsets) - 1
+            for word in words:
+                if transform is not None:
+                    word = transform(word)
+                encoded = word.encode("utf-8")
+                blob.append(encoded)
+                position += len(encoded)
+                offsets.append(position)
+            letter_ranges.append((letter, start, len(offsets) - 1))
+            if weights is not None:
+                weights.extend(source_weights[words.start:words.stop])
+        return cls(b"".join(blob), offsets, letter_ranges, weights)
 
-        :param dictionary Any valid .dict formatted dictionary
-        :param wordstyle Any allowed `wordstyle` format specification
-        :param separator What character (or word) to separate words with
-        :param seed Seed to use for the PRNG
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        Pack the lines of a .dict file into a WordStore, with the same
+        letters and words import_dictionary would produce, without ever
+        holding a str object per word. Weights are kept when any line has
+        one, words without a weight then weigh 1.
 
-        :raises DictionaryNotFoundError if the `dictionary` parameter can't
-                be found on disk
-        :raises InvalidWordStyleError if user attempts to retrieve a word
-                when `self.wordstyle` is set to an invalid value
-        :raises NoWordForLetter when the user attempts to reteive a word
-                where the starting letter given does not exist in the
-                dictionary
+        :raises ValueError if a line has an invalid weight
         """
-        if dictionary == "dictionaries/all_en_US.dict":
-            dictionary = resource_filename('namealizer', dictionary)
+        blobs, lengths, weights = OrderedDict(), dict(), dict()
+        weighted = False
+        for line in lines:
+            letter = line[0].lower()
+            word, weight = _parse_line(line)
+            encoded = word.encode("utf-8")
+            try:
+                blobs[letter] += encoded
+            except KeyError:
+                blobs[letter] = bytearray(encoded)
+                lengths[letter] = array("I")
+                weights[letter] = array("d")
+            lengths[letter].append(len(encoded))
+            if weight is None:
+                weights[letter].append(1.0)
+            else:
+                weights[letter].append(weight)
+                weighted = True
 
-        self.dictionary = import_dictionary(dictionary)
-        self.wordstyle = wordstyle
-        self.separator = separator
-        self.seed = generate_seed(seed)
+        offsets, letter_ranges, position = array("I", [0]), list(), 0
+        for letter in blobs:
+            start = len(offsets) - 1
+            for length in lengths[letter]:
+                position += length
+                offsets.append(position)
+            letter_ranges.append((letter, start, len(offsets) - 1))
+        blob = b"".join(bytes(blobs.pop(letter))
+                        for letter, _, _ in letter_ranges)
+        all_weights = None
+        if weighted:
+            all_weights = array("d")
+            for letter, _, _ in letter_ranges:
+                all_weights.extend(weights[letter])
+        return cls(blob, offsets, letter_ranges, all_weights)
 
-    def __getitem__(self, key):
-        if isinstance(key, str):
-            return format_string(string_for_initials(self.dictionary, key),
-                                 wordstyle=self.wordstyle,
-                                 separator=self.separator)
-        elif isinstance(key, int):
-            return format_string(string_for_count(self.dictionary, key),
-                                 wordstyle=self.wordstyle,
-                                 separator=self.separator)
-        else:
-            raise TypeError
+    @classmethod
+    def merge(cls, stores, dedup=True):
+        """
+        Combine several WordStores into one, letter by letter
 
+        Letters keep the order in which they first appear and words the
+        order of the stores, as if their source files were concatenated.
+        With `dedup`, only the first occurrence of each word is kept,
+        along with its weight; only one letter's words are tracked at a
+        time. Words of stores without weights weigh 1 when others have
+        weights.
+        """
+        letters = list()
+        for store in stores:
+            letters.extend(letter for letter in store._letters
+                           if letter not in letters)
+        weighted = any(store.weights is not None for store in stores)
 
-def format_word_list_lowercase(word_list):
+        blob, offsets, letter_ranges = bytearray(), array("I", [0]), list()
+        weights = array("d") if weighted else None
+        for letter in letters:
+            start, seen = len(offsets) - 1, set()
+            for store in stores:
+                if letter not in store:
+                    continue
+                words, source_offsets = store[letter], store._offsets
+                for index in range(words.start, words.stop):
+                    encoded = store._blob[source_offsets[index]:
+                                          source_offsets[index + 1]]
+                    if dedup:
+                        if encoded in seen:
+                            continue
+                        seen.add(encoded)
+                    blob += encoded
+                    offsets.append(len(blob))
+                    if weighted:
+                        weights.append(1.0 if store.weights is None
+                                       else store.weights[index])
+            letter_ranges.append((letter, start, len(offsets) - 1))
+        return cls(bytes(blob), offsets, letter_ranges, weights)
+
+    def __reduce__(self):
+        return WordStore, (self._blob, self._offsets, self._letter_ranges,
+                           self.weights)
+
+    @property
+    def nbytes(self):
+        """Size of the word buffer, offset and weight tables in bytes"""
+        nbytes = len(self._blob) + self._offsets.itemsize * len(self._offsets)
+        if self.weights is not None:
+            nbytes += self.weights.itemsize * len(self.weights)
+        return nbytes
+
+    def word(self, index):
+        """Decode the word at absolute position `index`"""
+        offsets = self._offsets
+        return self._blob[offsets[index]:offsets[index + 1]].decode("utf-8")
+
+    def _letter_block(self, letter):
+        """
+        Packed words of `letter`, as the bytes holding them and the
+        array('I') of their offsets, starting with the offset of the first
+        word and ending with the end of the last one
+        """
+        words = self._ranges[letter]
+        offsets = self._offsets[words.start:words.stop + 1]
+        return self._blob[offsets[0]:offsets[-1]], offsets
+
+
+class WordFilter(object):
     """
-    Given a list of words, this function returns a new list where all of
-    the words are lowercase
+    Declarative description of the words a generator may use
 
-    :param word_list: list, a list of words
-    :return: list, a list of words formatted in lowercase
+    :param min_length Shortest allowed word
+    :param max_length Longest allowed word
+    :param ascii_only Reject words with non-ASCII characters
+    :param apostrophes Allow words containing apostrophes
+    :param characters If given, only words made entirely of these
+           characters are allowed
+    :param exclude Words that are never allowed, such as a deny list
+    :param pattern Regular expression words must match in full
+
+    Filters with the same settings compare equal, which lets generators
+    share the filtered dictionaries built from them.
     """
-    return [word.lower() for word in word_list]
+    def __init__(self, min_length=None, max_length=None, ascii_only=False,
+                 apostrophes=True, characters=None, exclude=(),
+                 pattern=None):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.ascii_only = ascii_only
+        self.apostrophes = apostrophes
+        self.characters = (None if characters is None
+                           else frozenset(characters.lower()))
+        self.exclude = frozenset(word.lower() for word in exclude)
+        self.pattern = pattern
+        self._regex = (None if pattern is None
+                       else re.compile("(?:{})\\Z".format(pattern)))
 
+    @property
+    def key(self):
+        """Hashable summary of every setting"""
+        return (self.min_length, self.max_length, self.ascii_only,
+                self.apostrophes, self.characters, self.exclude,
+                self.pattern)
 
-def format_word_list_uppercase(word_list):
+    def __eq__(self, other):
+        return isinstance(other, WordFilter) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def accepts(self, word):
+        """Whether `word` passes every setting of this filter"""
+        if self.min_length is not None and len(word) < self.min_length:
+            return False
+        if self.max_length is not None and len(word) > self.max_length:
+            return False
+        if self.ascii_only and any(ord(char) > 127 for char in word):
+            return False
+        if not self.apostrophes and "'" in word:
+            return False
+        if self.characters is not None and \
+                not self.characters.issuperset(word):
+            return False
+        if word in self.exclude:
+            return False
+        if self._regex is not None and self._regex.match(word) is None:
+            return False
+        return True
+
+
+class FilteredDictionary(_PackedDictionary):
     """
-    Given a list of words, this function returns a new list where all of
-    the words are uppercase
+    The words of a dictionary accepted by a WordFilter
 
-    :param word_list: list, a list of words
-    :return: list, a list of words formatted in uppercase
+    The filter runs once, when the view is built. Surviving words are kept
+    as an array('I') of indices into the source dictionary, grouped by
+    starting letter and, within a letter, by length, so both every letter
+    and every (letter, length) bucket is a contiguous range and each draw
+    is O(1) without any rejection. Letters left without words are dropped.
     """
-    return [word.upper() for word in word_list]
+    def __init__(self, dictionary, word_filter):
+        flat = _FlatView(dictionary)
+        words = flat.words()
 
+        self.dictionary = dictionary
+        self.word_filter = word_filter
+        self._source_word = flat.word
+        self._weights = None
+        self._ids = array("I")
+        self._letters = list()
+        self._ranges = dict()
+        self._buckets = dict()
 
-def format_word_list_capitalize(word_list):
+        for letter, start, size in zip(flat.letters, flat.starts,
+                                       flat.sizes):
+            accepted = [index for index in range(start, start + size)
+                        if word_filter.accepts(words[index])]
+            if not accepted:
+                continue
+            accepted.sort(key=lambda index: len(words[index]))
+
+            first = len(self._ids)
+            for index in accepted:
+                length = len(words[index])
+                position = len(self._ids)
+                bucket = self._buckets.get((letter, length))
+                self._buckets[(letter, length)] = (
+                    (position, position + 1) if bucket is None
+                    else (bucket[0], position + 1))
+                self._ids.append(index)
+            self._letters.append(letter)
+            self._ranges[letter] = _WordRange(self, first, len(self._ids))
+
+        for key, (start, stop) in self._buckets.items():
+            self._buckets[key] = _WordRange(self, start, stop)
+
+    @property
+    def nbytes(self):
+        """Size of the index table in bytes"""
+        return self._ids.itemsize * len(self._ids)
+
+    @property
+    def weights(self):
+        """Weights of the surviving words, taken from the source"""
+        source = getattr(self.dictionary, "weights", None)
+        if source is not None and self._weights is None:
+            self._weights = array("d", (source[index] for index in self._ids))
+        return self._weights
+
+    def word(self, index):
+        """Decode the word at absolute position `index`"""
+        return self._source_word(self._ids[index])
+
+    def bucket(self, letter, length):
+        """
+        Sequence of the words starting with `letter` that are `length`
+        characters long
+
+        :raises NoWordForLetter if there are none
+        """
+        try:
+            return self._buckets[(letter, length)]
+        except KeyError:
+            msg = "Dictionary does not contain a {} letter word " \
+                  "starting with '{}'"
+            raise NoWordForLetter(msg.format(length, letter))
+
+
+def _read_compiled_header(buffer):
+    """Unpack the header of a compiled dictionary, None if it isn't one"""
+    if len(buffer) < _COMPILED_HEADER.size:
+        return None
+    header = _COMPILED_HEADER.unpack_from(buffer, 0)
+    if header[0] != _COMPILED_MAGIC or header[1] != _COMPILED_VERSION:
+        return None
+    return header
+
+
+def _pack_dictionary(dictionary, source_stat, source_hash):
     """
-    Given a list of words, this function returns a new list where all of
-    the words are capitalized
+    Serialize a WordStore, or a `{letter: [words]}` mapping, into the
+    compiled format
+    """
+    if not isinstance(dictionary, WordStore):
+        dictionary = WordStore.from_dictionary(dictionary)
 
-    :param word_list: list, a list of words
-    :return: list, a list of words where each word is capitalized
+    letters = list()
+    for letter, start, stop in dictionary._letter_ranges:
+        encoded = letter.encode("utf-8")
+        letters.append(_COMPILED_LETTER.pack(len(encoded)) + encoded +
+                       _COMPILED_RANGE.pack(start, stop))
+
+    offsets, weights = dictionary._offsets, dictionary.weights
+    header = _COMPILED_HEADER.pack(
+        _COMPILED_MAGIC, _COMPILED_VERSION, source_stat.st_mtime,
+        source_stat.st_size, source_hash, dictionary.word_count,
+        len(letters), 0 if weights is None else _COMPILED_WEIGHTED)
+    table = b"".join(letters)
+    padding = b"\0" * (-(len(header) + len(table)) % _COMPILED_OFFSET.size)
+    offset_table = struct.pack("<{}I".format(len(offsets)), *offsets)
+    parts = [header, table, padding, offset_table, dictionary._blob]
+    if weights is not None:
+        position = sum(len(part) for part in parts)
+        parts.append(b"\0" * (-position % _COMPILED_WEIGHT.size))
+        parts.append(struct.pack("<{}d".format(len(weights)), *weights))
+    return b"".join(parts)
+
+
+def _compiled_path(dictionary, cache_dir=None):
+    """Where the compiled form of `dictionary` lives"""
+    if cache_dir is None:
+        return dictionary + COMPILED_SUFFIX
+    source = os.path.realpath(dictionary).encode("utf-8")
+    digest = hashlib.sha1(source).hexdigest()[:16]
+    name = "{}-{}{}".format(digest, os.path.basename(dictionary),
+                            COMPILED_SUFFIX)
+    return os.path.join(cache_dir, name)
+
+
+def _default_cache_dir():
+    """Per-user cache directory used when the dictionary's is read-only"""
+    cache_dir = os.environ.get("NAMEALIZER_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "namealizer")
+
+
+@contextmanager
+def _replacing(path):
     """
-    return [word.capitalize() for word in word_list]
+    Context giving a temporary path next to `path`, which is moved over
+    `path` when the block succeeds and removed when it fails, so readers
+    never see a partial file. The temporary name ends in the basename of
+    `path`, keeping its extension.
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    handle, temporary = tempfile.mkstemp(dir=directory,
+                                         suffix=os.path.basename(path))
+    os.close(handle)
+    try:
+        yield temporary
+        getattr(os, "replace", os.rename)(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
 
 
-def format_word_list_mixedcase(word_list):
+def _write_atomic(path, data):
+    """Write `data` to `path` so readers never see a partial file"""
+    with _replacing(path) as temporary:
+        with open(temporary, "wb") as temporary_file:
+            temporary_file.write(data)
+
+
+def _map_compiled(path):
+    """Memory-map a compiled dictionary read-only, None if it can't be"""
+    try:
+        with open(path, "rb") as compiled_file:
+            return mmap.mmap(compiled_file.fileno(), 0,
+                             access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _open_compiled(path):
+    """Map the compiled dictionary at `path`"""
+    buffer = _map_compiled(path)
+    if buffer is None:
+        message = "Could not find the dictionary at {}".format(path)
+        raise DictionaryNotFoundError(message)
+    return CompiledDictionary(buffer, path)
+
+
+def compile_dictionary(dictionary, destination=None):
     """
-    Given a list of words, this function returns a new list where the
-    words follow mixed case convention.
+    Compile a .dict file into the binary format read by load_dictionary
 
-    As a reminder this is mixedCase.
+    :param dictionary Path to any valid .dict formatted dictionary
+    :param destination Where to write the compiled file, defaults to the
+           dictionary path with a trailing "c" (`words.dict` -> `words.dictc`)
+    :return the path of the compiled dictionary
 
-    :param word_list: list, a list of words
-    :return: list, a list of words where the words are mixed case
+    :raises DictionaryNotFoundError if dictionary can't be loaded
     """
-    to_return, first_word = list(), True
-    for word in word_list:
-        if first_word:
-            to_return.append(word.lower())
-            first_word = False
-        else:
-            to_return.append(word.capitalize())
-    return to_return
+    if destination is None:
+        destination = _compiled_path(dictionary)
+    _write_atomic(destination, _compile_source(dictionary))
+    return destination
 
 
-def format_string(string_to_format, wordstyle="lowercase", separator=" "):
+def _compile_source(dictionary):
     """
-    Takes an un-formatted string and returns it in the desired format
-    Acceptable formats are defined in the function_map dictionary.
+    Hash and pack a dictionary into its compiled form, streaming it so the
+    raw file, compressed or not, is never held in memory
+    """
+    try:
+        source_stat = os.stat(dictionary)
+        source_hash = _hash_file(dictionary)
+        with open_dictionary(dictionary) as dictionary_file:
+            words = WordStore.from_lines(dictionary_file)
+    except (IOError, OSError):
+        message = "Could not find the dictionary at {}".format(dictionary)
+        raise DictionaryNotFoundError(message)
+    if _metrics is not None:
+        _metrics.count("compiles")
+    return _pack_dictionary(words, source_stat, source_hash)
+
+
+def _load_compiled(dictionary, compiled_path, source_stat):
     """
-    # first split the string up into its constituent words
-    words = string_to_format.split(" ")
+    Map `compiled_path` if it is up to date with `dictionary`
 
-    # format the individual words
-    function_map = {
-        "lowercase": format_word_list_lowercase,
-        "uppercase": format_word_list_uppercase,
-        "capitalize": format_word_list_capitalize,
-        "mixedcase": format_word_list_mixedcase
-    }
+    Size and mtime are checked first; when only those differ the source is
+    hashed, and a matching hash just refreshes the stored metadata.
+    """
+    buffer = _map_compiled(compiled_path)
+    if buffer is None:
+        return None
+
+    header = _read_compiled_header(buffer)
+    if header is None:
+        return None
+    if (header[2] == source_stat.st_mtime and
+            header[3] == source_stat.st_size):
+        return CompiledDictionary(buffer, compiled_path)
 
     try:
-        words = function_map[wordstyle](words)
-    except KeyError:
-        msg = "Passed in an invalid wordstyle, allowed styles are {}"
-        raise InvalidWordStyleError(msg.format(function_map.keys()))
+        source_hash = _hash_file(dictionary)
+    except (IOError, OSError):
+        return None
+    if header[4] != source_hash:
+        return None
 
-    # now add in the separator and return
-    return str(separator).join(words)
+    refreshed = _COMPILED_HEADER.pack(
+        _COMPILED_MAGIC, _COMPILED_VERSION, source_stat.st_mtime,
+        source_stat.st_size, source_hash, header[5], header[6], header[7])
+    data = refreshed + buffer[_COMPILED_HEADER.size:]
+    try:
+        _write_atomic(compiled_path, data)
+    except (IOError, OSError):
+        pass
+    return CompiledDictionary(buffer, compiled_path)
 
 
-def get_random_word(dictionary, starting_letter=None):
+def load_dictionary(dictionary, cache_dir=None):
     """
-    Takes the dictionary to read from and returns a random word
-    optionally accepts a starting letter
+    Load a dictionary for word generation, through the compiled cache
+
+    Paths are served from a memory-mapped compiled copy of the dictionary,
+    stored next to it or, when that location isn't writable, in `cache_dir`
+    (by default $NAMEALIZER_CACHE_DIR or ~/.cache/namealizer). The compiled
+    copy is rebuilt whenever the source's size, mtime and hash say it is
+    stale. Dictionaries ending in .gz, .bz2 or .xz are decompressed while
+    they are compiled. Already opened files are parsed into a WordStore.
+
+    :raises DictionaryNotFoundError if dictionary can't be loaded
     """
-    if starting_letter is None:
-        starting_letter = random.choice(list(dictionary.keys()))
+    if _metrics is None:
+        return _load_dictionary(dictionary, cache_dir)
+    start = _clock()
+    try:
+        loaded = _load_dictionary(dictionary, cache_dir)
+    except Exception as error:
+        _metrics.error(error)
+        raise
+    _metrics.observe("load", _clock() - start)
+    _metrics.count("loads")
+    return loaded
+
+
+def _load_dictionary(dictionary, cache_dir):
+    if not isinstance(dictionary, _string_types):
+        return WordStore.from_lines(dictionary)
 
     try:
-        to_return = random.choice(dictionary[starting_letter])
-    except KeyError:
-        msg = "Dictionary does not contain a word starting with '{}'"
-        raise NoWordForLetter(msg.format(starting_letter))
+        source_stat = os.stat(dictionary)
+    except OSError:
+        message = "Could not find the dictionary at {}".format(dictionary)
+        raise DictionaryNotFoundError(message)
 
-    return to_return
+    if cache_dir is not None:
+        candidates = [_compiled_path(dictionary, cache_dir)]
+    else:
+        candidates = [_compiled_path(dictionary),
+                      _compiled_path(dictionary, _default_cache_dir())]
 
+    for compiled_path in candidates:
+        compiled = _load_compiled(dictionary, compiled_path, source_stat)
+        if compiled is not None:
+            return compiled
 
-def import_dictionary(dictionary):
+    data = _compile_source(dictionary)
+    for compiled_path in candidates:
+        try:
+            _write_atomic(compiled_path, data)
+        except (IOError, OSError):
+            continue
+        compiled = _map_compiled(compiled_path)
+        if compiled is not None:
+            return CompiledDictionary(compiled, compiled_path)
+
+    # nowhere to cache it, serve the freshly compiled copy from memory
+    return CompiledDictionary(data)
+
+
+def _dictionary_nbytes(dictionary):
+    """Approximate memory held by a loaded dictionary"""
+    nbytes = getattr(dictionary, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+
+    nbytes = sys.getsizeof(dictionary)
+    for letter, words in dictionary.items():
+        nbytes += sys.getsizeof(letter) + sys.getsizeof(words)
+        nbytes += sum(sys.getsizeof(word) for word in words)
+    return nbytes
+
+
+class DictionaryRegistry(object):
     """
-    Function used to import the dictionary file into memory
-    opened_file should be an already opened dictionary file
+    Least-recently-used cache of loaded dictionaries
 
-    :raises DictionaryNotFoundError if dictionary can't be loaded
+    Dictionary files are keyed by their resolved path plus size, mtime and
+    inode, so every WordGenerator loading the same file gets back the same
+    shared, read-only dictionary object, while an edited file is loaded
+    afresh. Entries are evicted once either `max_entries` or `max_bytes`
+    (when set) is exceeded. Safe to use from multiple threads.
     """
-    def load_into_dictionary(dictionary_file):
-        """create the dictionary to hold the words"""
-        to_return = dict()
-        for line in dictionary_file:
+    def __init__(self, max_entries=16, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, dictionary, cache_dir=None):
+        """
+        Return the shared dictionary loaded from the path `dictionary`
+
+        Already opened files can't be identified and are loaded every time.
+
+        :raises DictionaryNotFoundError if dictionary can't be loaded
+        """
+        if not isinstance(dictionary, _string_types):
+            return load_dictionary(dictionary, cache_dir)
+
+        try:
+            source_stat = os.stat(dictionary)
+        except OSError:
+            message = "Could not find the dictionary at {}".format(dictionary)
+            raise DictionaryNotFoundError(message)
+
+        key = (os.path.realpath(dictionary), source_stat.st_size,
+               source_stat.st_mtime, source_stat.st_ino, cache_dir)
+        return self.get_or_load(
+            key, lambda: load_dictionary(dictionary, cache_dir))
+
+    def get_or_load(self, key, loader):
+        """Return the entry cached under `key`, creating it with `loader`"""
+        with self._lock:
             try:
-                to_return[line[0].lower()].append(line.strip().lower())
+                value = self._entries[key][0]
             except KeyError:
-                to_return[line[0].lower()] = [line.strip().lower()]
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._touch(key)
+                return value
 
-        return to_return
+        # load outside of the lock so slow loads don't serialize lookups
+        value = loader()
+        nbytes = _dictionary_nbytes(value)
 
-    try:
-        with open(dictionary) as dictionary_file:
-            to_return = load_into_dictionary(dictionary_file)
+        with self._lock:
+            if key in self._entries:
+                self._touch(key)
+                return self._entries[key][0]
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+        return value
 
-    except TypeError:
-        to_return = load_into_dictionary(dictionary)
+    def _touch(self, key):
+        entry = self._entries.pop(key)
+        self._entries[key] = entry
 
-    except IOError:
-        message = "Could not find the dictionary at {}".format(dictionary)
-        raise DictionaryNotFoundError(message)
+    def _evict(self):
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and
+                 self._nbytes > self.max_bytes)):
+            self._nbytes -= self._entries.popitem(last=False)[1][1]
 
-    return to_return
+    @property
+    def nbytes(self):
+        """Approximate memory held by all cached entries"""
+        return self._nbytes
+
+    def clear(self):
+        """Drop every cached entry and reset the hit/miss counters"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
 
+    def __len__(self):
+        return len(self._entries)
 
-def string_for_initials(dictionary, initials):
+    def __contains__(self, key):
+        return key in self._entries
+
+
+# shared by every WordGenerator and main() call in this process
+dictionary_registry = DictionaryRegistry()
+
+# indexes derived from loaded dictionaries, shared the same way
+index_registry = DictionaryRegistry()
+
+
+def prefix_index(dictionary):
+    """PrefixIndex of `dictionary`, built on first use and then shared"""
+    # the index references the dictionary, so its id stays unique for as
+    # long as the entry is cached
+    return index_registry.get_or_load(("prefix", id(dictionary)),
+                                      lambda: PrefixIndex(dictionary))
+
+
+def filtered_dictionary(dictionary, word_filter):
+    """
+    FilteredDictionary of `dictionary`, shared by every generator using an
+    equal filter on the same dictionary
+    """
+    key = ("filter", id(dictionary), word_filter)
+    return index_registry.get_or_load(
+        key, lambda: FilteredDictionary(dictionary, word_filter))
+
+
+def cased_dictionary(dictionary, case):
+    """
+    Copy of `dictionary` with every word passed through the str method
+    `case` ("lower", "upper" or "capitalize", see Formatter.case), built on
+    first use and shared by every generator
+
+    The copy keeps the letters, word order and weights of `dictionary`,
+    so drawing from either with the same seed picks the same words.
+    """
+    def build():
+        cased = WordStore.from_dictionary(dictionary, methodcaller(case))
+        # like the other derived entries, the copy references its source
+        # so that the id in its key stays unique while it is cached
+        cased.source = dictionary
+        return cased
+    return index_registry.get_or_load(("cased", id(dictionary), case), build)
+
+
+def _check_distribution(distribution):
+    """Raise ValueError unless `distribution` is one of DISTRIBUTIONS"""
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError("Unknown distribution {!r}, allowed are {}".format(
+            distribution, DISTRIBUTIONS))
+
+
+def word_sampler(dictionary, distribution="letter"):
+    """
+    Sampler drawing words of `dictionary` under `distribution`, with its
+    alias tables built on first use and then shared
+
+    :raises ValueError if `distribution` is not one of DISTRIBUTIONS
+    """
+    _check_distribution(distribution)
+    return index_registry.get_or_load(
+        ("sampler", id(dictionary), distribution),
+        lambda: _WordSampler(dictionary, distribution))
+
+
+def string_for_initials(dictionary, initials, rng=None):
     """Create a random string of words of len(initials)"""
     string_to_print = ""
     for letter in initials:
-        word = get_random_word(dictionary, letter.lower())
+        word = get_random_word(dictionary, letter.lower(), rng)
         string_to_print += "{} ".format(word)
 
     return string_to_print.strip()
 
 
-def string_for_count(dictionary, count):
+def string_for_prefixes(dictionary, prefixes, rng=None):
+    """Create a random string of words, one starting with each prefix"""
+    index = prefix_index(dictionary)
+    return " ".join(index.random_word(prefix, rng) for prefix in prefixes)
+
+
+def string_for_count(dictionary, count, rng=None):
     """Create a random string of N=`count` words"""
     string_to_print = ""
     if count is not None:
@@ -218,7 +2719,7 @@ def string_for_count(dictionary, count):
     else:
         ranger = 2
     for index in range(ranger):
-        string_to_print += "{} ".format(get_random_word(dictionary))
+        string_to_print += "{} ".format(get_random_word(dictionary, rng=rng))
 
     return string_to_print.strip()
 
@@ -233,34 +2734,198 @@ def generate_seed(seed):
     return seed
 
 
-def main(dictionary='dictionaries/all_en_US.dict', count=None, initials=None,
-         seed=None, wordstyle='lowercase', separator=' '):
-    """Main processing function for namealizer"""
-    generate_seed(seed)
+def _new_seed():
+    """Pick a fresh seed without touching the global PRNG's state"""
+    return random.SystemRandom().randint(0, sys.maxsize)
+
+
+def derive_seed(seed, stream):
+    """
+    Derive the seed of the independent PRNG stream `stream` from `seed`
+
+    Derivation hashes both values, so the result is the same on every
+    platform and Python version and nearby streams are uncorrelated.
+    """
+    digest = hashlib.sha256("{}:{}".format(seed, stream).encode("utf-8"))
+    return struct.unpack("<Q", digest.digest()[:8])[0] >> 1
+
 
+def resolve_dictionary(dictionary):
+    """
+    Map the default dictionary name onto the copy bundled with namealizer,
+    anything else is returned unchanged
+    """
+    if dictionary == DEFAULT_DICTIONARY:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            DEFAULT_DICTIONARY)
+    return dictionary
+
+
+def main(dictionary=DEFAULT_DICTIONARY, count=None, initials=None,
+         seed=None, wordstyle='lowercase', separator=' ',
+         distribution='letter', issued=None, blocklist=None):
+    """Main processing function for namealizer"""
     # attempt to read in the given dictionary
-    dictionary = import_dictionary(dictionary)
+    wg = WordGenerator(dictionary, wordstyle=wordstyle, separator=separator,
+                       seed=seed, distribution=distribution, issued=issued,
+                       blocklist=blocklist)
 
     # if count and initials are both set, let the user know what's up
     if count and initials:
+        import logging
         msg = "--count and --initials are mutually exclusive, using initials"
         logging.info(msg)
 
     if initials is not None:
-        string_to_print = string_for_initials(dictionary, initials)
+        return wg[initials]
+    return wg[2 if count is None else count]
+
+
+def _import_submodule(name):
+    """Import the namealizer submodule `name`, on first use"""
+    import importlib
+
+    return importlib.import_module("namealizer." + name)
+
+
+def cli(args=None, stream=None):
+    """
+    Entry point of the namealizer command line tool, `namealizer serve`
+    starts a name server (see namealizer.server) and `namealizer ingest`
+    merges dictionaries (see namealizer.ingest)
+
+    :param args Command line arguments, defaults to sys.argv[1:]
+    :param stream Where to write the generated names, defaults to stdout
+    :return the process exit status
+    """
+    if stream is None:
+        stream = sys.stdout
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] == "serve":
+        return _import_submodule("server").cli(args[1:])
+    if args and args[0] == "ingest":
+        return _import_submodule("ingest").cli(args[1:])
+
+    args = create_parser(args)
+    if not args.stats:
+        return _generate(args, stream)
+
+    switch = _import_submodule("metrics")
+    metrics = switch.enable_metrics()
+    try:
+        return _generate(args, stream)
+    finally:
+        switch.disable_metrics()
+        sys.stderr.write(metrics.summary())
+
+
+def _names_for_initials(wg, lines, report):
+    """
+    Yield a name from `wg` for the initials on every line of `lines`, in
+    order. Lines whose initials have a letter no word starts with give an
+    empty name and are passed to `report` as (line number, error)
+    """
+    for number, line in enumerate(lines, 1):
+        try:
+            yield wg[line.strip()]
+        except NoWordForLetter as error:
+            report(number, error)
+            yield ""
+
+
+def _generate_for_initials(args, stream):
+    """
+    Write a name for every line of initials read from the file (or "-"
+    for stdin) given with --initials-from, reporting failed lines to
+    stderr. Returns 1 if any line failed
+    """
+    wg = WordGenerator(dictionary=args.dictionary,
+                       wordstyle=args.wordstyle,
+                       separator=args.separator,
+                       seed=args.seed,
+                       distribution=args.distribution,
+                       issued=args.issued,
+                       blocklist=args.blocklist)
+    failed = list()
+
+    def report(number, error):
+        failed.append(number)
+        sys.stderr.write("namealizer: line {}: {}\n".format(number, error))
+
+    if args.initials_from == "-":
+        write_names(_names_for_initials(wg, sys.stdin, report), stream)
     else:
-        string_to_print = string_for_count(dictionary, count)
+        with open(args.initials_from) as lines:
+            write_names(_names_for_initials(wg, lines, report), stream)
+    return 1 if failed else 0
+
+
+def _generate_from_template(args, stream):
+    """Write --number names (default 1) of the --template to `stream`"""
+    pools = dict()
+    for option in args.pool:
+        name, _, path = option.partition("=")
+        pools[name] = path
+    templates = _import_submodule("templates")
+    template = templates.NameTemplate(args.template, pools=pools,
+                                      seed=args.seed,
+                                      wordstyle=args.wordstyle,
+                                      distribution=args.distribution,
+                                      blocklist=args.blocklist)
+    write_names(template.iter_many(1 if args.number is None
+                                   else args.number), stream)
+    return 0
 
-    return format_string(string_to_print, wordstyle, separator)
 
+def _generate(args, stream):
+    """Write the names asked for on the command line to `stream`"""
+    if args.template is not None:
+        return _generate_from_template(args, stream)
+    if args.initials_from is not None:
+        return _generate_for_initials(args, stream)
+    if args.number is None:
+        stream.write(main(dictionary=args.dictionary,
+                          count=args.count,
+                          initials=args.initials,
+                          seed=args.seed,
+                          wordstyle=args.wordstyle,
+                          separator=args.separator,
+                          distribution=args.distribution,
+                          issued=args.issued,
+                          blocklist=args.blocklist) + "\n")
+        return 0
 
-def create_parser():
+    wg = WordGenerator(dictionary=args.dictionary,
+                       wordstyle=args.wordstyle,
+                       separator=args.separator,
+                       seed=args.seed,
+                       distribution=args.distribution,
+                       issued=args.issued,
+                       blocklist=args.blocklist)
+    if args.jobs is not None:
+        names = wg.iter_sharded(args.number,
+                                count=args.count,
+                                initials=args.initials,
+                                jobs=args.jobs,
+                                shard_size=args.shard_size)
+    else:
+        names = wg.iter_many(args.number,
+                             count=args.count,
+                             initials=args.initials)
+    write_names(names, stream)
+    return 0
+
+
+def create_parser(args=None):
     """Creates the Namespace object to be used by the rest of the tool"""
+    import argparse
+
     parser = argparse.ArgumentParser(description=__doc__)
 
     parser.add_argument('-d', '--dictionary',
                         nargs='?',
-                        default='dictionaries/all_en_US.dict',
+                        default=DEFAULT_DICTIONARY,
                         help='Specify a non-default word dictionary to use.')
     parser.add_argument('-c', '--count',
                         help='Specify the number of words to return.',
@@ -268,6 +2933,12 @@ def create_parser():
     parser.add_argument('-i', '--initials',
                         type=str,
                         help='String of letters used to form the word list')
+    parser.add_argument('--initials-from',
+                        metavar='FILE',
+                        help='Read initials from FILE, or stdin for -, one '
+                        'per line, and write a name for each line in order. '
+                        'Lines with a letter no word starts with give an '
+                        'empty line and an error on stderr.')
     parser.add_argument('-s', '--seed',
                         help='Specify the seed to use for the random number '
                         'generator. Using the same seed without changing '
@@ -277,12 +2948,65 @@ def create_parser():
                         nargs='?',
                         default='lowercase',
                         type=str,
-                        help='Specify how to style the individual words. '
-                        'Default is lowercase.')
+                        help='Specify how to style the individual words: '
+                        'lowercase, uppercase, capitalize, mixedcase, or '
+                        'snake, kebab, constant and dot, which also set the '
+                        'separator. Default is lowercase.')
     parser.add_argument('-sep', '--separator',
                         nargs='?',
                         default=' ',
                         type=str,
                         help='How to separate words. Default is space.')
+    parser.add_argument('--distribution',
+                        choices=DISTRIBUTIONS,
+                        default='letter',
+                        help='How to draw words: a random letter then a '
+                        'word starting with it (letter), every word equally '
+                        'likely (uniform), or by the dictionary\'s weight '
+                        'column (weighted). Default is letter.')
+    parser.add_argument('--template',
+                        help='Build names from a template such as '
+                        '"{adjective}-{noun:uppercase}-{num:4}": {pool} is a '
+                        'word from the dictionary named pool, optionally '
+                        'cased as a wordstyle, and {num:N} is N digits. The '
+                        'pool "word" is the default dictionary.')
+    parser.add_argument('--pool',
+                        action='append',
+                        default=[],
+                        metavar='NAME=PATH',
+                        help='Dictionary to use for the pool NAME of '
+                        '--template. May be repeated.')
+    parser.add_argument('-n', '--number',
+                        type=int,
+                        help='Generate this many names, one per line.')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        help='Generate --number names with this many '
+                        'processes. Output for a given seed does not depend '
+                        'on the number of jobs.')
+    parser.add_argument('--shard-size',
+                        type=int,
+                        default=100000,
+                        help='Names per shard when using --jobs. '
+                        'Default is 100000.')
+    parser.add_argument('--issued',
+                        metavar='PATH',
+                        help='Never output a name already issued according '
+                        'to the registry database at PATH, and record every '
+                        'name output there.')
+    parser.add_argument('--blocklist',
+                        metavar='FILE',
+                        help='Never output a name containing any of the '
+                        'substrings listed in FILE, one per line, ignoring '
+                        'case. Blocked names are replaced.')
+    parser.add_argument('--stats',
+                        action='store_true',
+                        help='Print counters and timings of dictionary '
+                        'loading, word draws and formatting to stderr.')
 
-    return parser.parse_args()
+    parsed = parser.parse_args(args)
+    for option in parsed.pool:
+        name, equals, path = option.partition("=")
+        if not (name and equals and path):
+            parser.error("--pool must be NAME=PATH, not {!r}".format(option))
+    return parsed
@@ -0,0 +1,325 @@
+"""Long-running name generation server and its client
+
+The server keeps its dictionaries loaded and answers requests over a Unix
+socket or a localhost TCP port. The protocol is newline-delimited JSON:
+each line sent by a client is a request object, or a list of request
+objects, such as
+
+    {"id": 1, "count": 3, "number": 1000, "seed": 7}
+
+Recognised fields are id, dictionary, count, initials, wordstyle,
+separator, seed, distribution and number (default 1). Every request is
+answered, in the order requests were sent, by one or more lines
+
+    {"id": 1, "names": ["...", ...]}
+
+carrying at most `chunk_size` names each, followed by
+
+    {"id": 1, "done": true, "number": 1000}
+
+or by a single {"id": 1, "error": "...", "type": "..."} line when the
+request fails. Connections stay open for any number of requests, and
+clients may send further requests without waiting for earlier answers.
+"""
+import json
+import os
+import socket
+import sys
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from namealizer import (DEFAULT_DICTIONARY, InvalidWordStyleError,
+                        NoWordForLetter, SpaceExhaustedError, WordGenerator,
+                        dictionary_registry, resolve_dictionary)
+
+REQUEST_FIELDS = frozenset(["id", "dictionary", "count", "initials",
+                            "wordstyle", "separator", "seed", "number",
+                            "distribution"])
+
+
+class ServerError(Exception):
+    """
+    Raised by the client when the server reports a failed request
+    """
+    pass
+
+
+def handle_request(request, dictionaries, chunk_size=1000):
+    """
+    Yield the response objects answering a single request
+
+    :param request Request object decoded from the client
+    :param dictionaries Mapping of dictionary names to loaded dictionaries,
+           requests without a `dictionary` field use "default"
+    :param chunk_size Maximum number of names per response line
+    """
+    request_id = request.get("id") if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict):
+            raise ValueError("Requests must be JSON objects")
+        unknown = set(request) - REQUEST_FIELDS
+        if unknown:
+            raise ValueError("Unknown request fields: {}".format(
+                ", ".join(sorted(unknown))))
+
+        number = request.get("number", 1)
+        if not isinstance(number, int) or number < 0:
+            raise ValueError("number must be a non-negative integer")
+        try:
+            dictionary = dictionaries[request.get("dictionary", "default")]
+        except KeyError:
+            raise ValueError("Unknown dictionary {!r}".format(
+                request.get("dictionary")))
+
+        wg = WordGenerator(dictionary,
+                           wordstyle=request.get("wordstyle", "lowercase"),
+                           separator=request.get("separator", " "),
+                           seed=request.get("seed"),
+                           distribution=request.get("distribution",
+                                                    "letter"))
+        names = wg.iter_many(number, count=request.get("count"),
+                             initials=request.get("initials"),
+                             chunk_size=chunk_size)
+
+        chunk = list()
+        for name in names:
+            chunk.append(name)
+            if len(chunk) >= chunk_size:
+                yield {"id": request_id, "names": chunk}
+                chunk = list()
+        if chunk:
+            yield {"id": request_id, "names": chunk}
+        yield {"id": request_id, "done": True, "number": number}
+
+    except (ValueError, TypeError, InvalidWordStyleError, NoWordForLetter,
+            SpaceExhaustedError) as error:
+        yield {"id": request_id, "error": str(error),
+               "type": type(error).__name__}
+
+
+def _encode(response):
+    return (json.dumps(response, separators=(",", ":")) + "\n").encode(
+        "utf-8")
+
+
+class NameRequestHandler(socketserver.StreamRequestHandler):
+    """Serves every request sent over one client connection, in order"""
+    wbufsize = 65536
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                payload = json.loads(line.decode("utf-8"))
+            except ValueError as error:
+                payload = None
+                self.wfile.write(_encode({"id": None, "error": str(error),
+                                          "type": "ValueError"}))
+
+            requests = payload if isinstance(payload, list) else [payload]
+            for request in requests if payload is not None else []:
+                for response in handle_request(request,
+                                               self.server.dictionaries,
+                                               self.server.chunk_size):
+                    self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+
+class _NameServerMixin(socketserver.ThreadingMixIn):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class TCPNameServer(_NameServerMixin, socketserver.TCPServer):
+    """Name server listening on a TCP address"""
+    pass
+
+
+if hasattr(socket, "AF_UNIX"):
+    class UnixNameServer(_NameServerMixin, socketserver.UnixStreamServer):
+        """Name server listening on a Unix socket"""
+        pass
+
+
+def load_dictionaries(dictionaries=None):
+    """
+    Load the dictionaries a server offers
+
+    :param dictionaries Mapping of names to dictionary paths, by default
+           just the bundled dictionary as "default"
+    """
+    if not dictionaries:
+        dictionaries = {"default": DEFAULT_DICTIONARY}
+    return dict((name, dictionary_registry.get(resolve_dictionary(path)))
+                for name, path in dictionaries.items())
+
+
+def create_server(socket_path=None, host="127.0.0.1", port=0,
+                  dictionaries=None, chunk_size=1000):
+    """
+    Create a name server with its dictionaries loaded
+
+    Listens on the Unix socket `socket_path` when given, otherwise on
+    `host`:`port` (port 0 picks a free port, see `server_address`).
+    Call `serve_forever()` on the result to start answering requests.
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixNameServer(socket_path, NameRequestHandler)
+    else:
+        server = TCPNameServer((host, port), NameRequestHandler)
+
+    # the server holds its own references, so registry eviction never
+    # forces a reload while serving
+    server.dictionaries = load_dictionaries(dictionaries)
+    server.chunk_size = chunk_size
+    return server
+
+
+class NameClient(object):
+    """
+    Client for a name server, keeping one connection open for every
+    request it makes
+
+    Requests can be pipelined: `send` any number of them, then call
+    `receive` once per request to read the answers in the same order.
+    """
+    def __init__(self, socket_path=None, host="127.0.0.1", port=None,
+                 timeout=None):
+        if socket_path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(socket_path)
+        else:
+            self._socket = socket.create_connection((host, port), timeout)
+        self._reader = self._socket.makefile("rb")
+        self._pending = list()
+        self._next_id = 0
+
+    def send(self, requests):
+        """
+        Send one request object, or a list of them, without waiting for
+        the answers. Returns the ids given to the requests.
+        """
+        if isinstance(requests, dict):
+            requests = [requests]
+
+        ids, lines = list(), list()
+        for request in requests:
+            request = dict(request)
+            request.setdefault("id", self._next_id)
+            self._next_id += 1
+            ids.append(request["id"])
+            lines.append(_encode(request))
+        self._socket.sendall(b"".join(lines))
+        self._pending.extend(ids)
+        return ids
+
+    def receive(self):
+        """
+        Iterate over the names answering the oldest request still pending,
+        which must be exhausted before receiving the next answer
+
+        :raises ServerError if the server could not fulfil the request
+        """
+        return self._read_response(self._pending.pop(0))
+
+    def _read_response(self, request_id):
+        while True:
+            line = self._reader.readline()
+            if not line:
+                raise ServerError("Connection closed by the server")
+            response = json.loads(line.decode("utf-8"))
+            if response.get("id") != request_id:
+                raise ServerError("Unexpected response {!r}".format(response))
+            if "error" in response:
+                raise ServerError(response["error"])
+            if response.get("done"):
+                return
+            for name in response["names"]:
+                yield name
+
+    def generate(self, **request):
+        """Send one request and return the list of names answering it"""
+        self.send(request)
+        return list(self.receive())
+
+    def pipeline(self, requests):
+        """Send every request at once, returning a list of name lists"""
+        ids = self.send(list(requests))
+        return [list(self.receive()) for _ in ids]
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _dictionary_options(options):
+    """Names and paths of the PATH or NAME=PATH `--dictionary` options"""
+    dictionaries = dict()
+    for option in options:
+        # names can't hold "=", paths can
+        name, equals, path = option.partition("=")
+        if not equals:
+            name, path = "default", option
+        dictionaries[name or "default"] = path
+    return dictionaries
+
+
+def cli(args=None):
+    """Entry point of `namealizer serve`"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="namealizer serve",
+        description="Serve names to clients over a Unix socket or "
+        "localhost TCP port.")
+    parser.add_argument('--socket',
+                        help='Listen on this Unix socket path.')
+    parser.add_argument('--host',
+                        default='127.0.0.1',
+                        help='Address to listen on without --socket. '
+                        'Default is 127.0.0.1.')
+    parser.add_argument('-p', '--port',
+                        type=int,
+                        default=8479,
+                        help='Port to listen on without --socket. '
+                        'Default is 8479.')
+    parser.add_argument('-d', '--dictionary',
+                        action='append',
+                        default=[],
+                        help='Dictionary to serve, as PATH or NAME=PATH. '
+                        'May be repeated, a bare PATH becomes "default".')
+    parser.add_argument('--chunk-size',
+                        type=int,
+                        default=1000,
+                        help='Maximum names per response line.')
+    args = parser.parse_args(args)
+
+    server = create_server(socket_path=args.socket, host=args.host,
+                           port=args.port,
+                           dictionaries=_dictionary_options(args.dictionary),
+                           chunk_size=args.chunk_size)
+    sys.stderr.write("namealizer serving on {}\n".format(
+        server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
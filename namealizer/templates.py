@@ -0,0 +1,222 @@
+"""Names built from a template over several named word pools
+
+    template = NameTemplate("{adjective}-{noun}-{num:4}",
+                            pools={"adjective": "adjectives.dict",
+                                   "noun": "nouns.dict"})
+    template()                          # e.g. "brisk-otter-0412"
+
+See NameTemplate for the template syntax.
+"""
+from __future__ import absolute_import
+
+import random
+import string
+from operator import methodcaller
+
+from namealizer import namealizer as _core
+from namealizer.namealizer import (
+    DEFAULT_DICTIONARY, ISSUED_ATTEMPTS, SpaceExhaustedError, _BatchSampler,
+    _FlatView, _import_submodule, _new_seed, dictionary_registry,
+    get_formatter, resolve_dictionary, word_sampler)
+
+
+def _load_pool(dictionary):
+    """Shared loaded dictionary for a path, loaded dictionaries as is"""
+    dictionary = resolve_dictionary(dictionary)
+    if hasattr(dictionary, "keys"):
+        return dictionary
+    return dictionary_registry.get(dictionary)
+
+
+class NameTemplate(object):
+    """
+    Compiled template for names drawing on several named word pools
+
+    A template mixes literal text with slots, as in str.format:
+
+        template = NameTemplate("{adjective}-{noun}-{num:4}",
+                                pools={"adjective": "adjectives.dict",
+                                       "noun": "nouns.dict"}, seed=7)
+        template()                          # e.g. "brisk-otter-0412"
+        template.generate_many(10 ** 6)
+
+    - `{pool}` is a word from the dictionary named `pool`
+    - `{pool:wordstyle}` cases that word as `wordstyle` would, for example
+      `{noun:uppercase}` or `{noun:capitalize}`
+    - `{num:N}` is N random digits
+    - `{{` and `}}` are literal braces
+
+    The pool "word" is the bundled dictionary unless `pools` says
+    otherwise. Templates are parsed once, into a format string and one
+    drawing step per slot, so producing a name only draws and cases its
+    words, draws its digits and fills them in with a single str.format
+    call.
+
+    :param template Template string
+    :param pools Mapping of pool names to dictionaries, as paths or
+           already loaded
+    :param seed Seed of the template's PRNG
+    :param wordstyle Style whose case applies to words of slots without
+           one of their own
+    :param distribution How words are drawn, one of DISTRIBUTIONS
+    :param blocklist Substrings names may not contain, as with
+           WordGenerator; blocked names are replaced by new draws
+
+    :raises ValueError if the template is malformed or uses an unknown pool
+    :raises InvalidWordStyleError if a slot names an unknown wordstyle
+    :raises DictionaryNotFoundError if a pool can't be loaded
+    """
+    def __init__(self, template, pools=None, seed=None,
+                 wordstyle="lowercase", distribution="letter",
+                 blocklist=None):
+        available = {"word": DEFAULT_DICTIONARY}
+        available.update(pools or {})
+
+        self.template = template
+        self.wordstyle = wordstyle
+        self.distribution = distribution
+        self.pools = dict()
+        # (pool, case) of every word slot and the width of every digit
+        # slot, in template order, with the format string they fill
+        self.slots = list()
+        parts = list()
+        for literal, field, spec, conversion in \
+                string.Formatter().parse(template):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if conversion is not None or not field:
+                raise ValueError("Template slots must be {{pool}}, "
+                                 "{{pool:wordstyle}} or {{num:N}}, not "
+                                 "{!r}".format(field))
+            if field == "num":
+                if not spec.isdigit() or not int(spec):
+                    raise ValueError("{{num:N}} needs a number of digits, "
+                                     "got {!r}".format(spec))
+                self.slots.append(("num", int(spec)))
+                parts.append("{:0" + spec + "d}")
+                continue
+
+            if field not in available:
+                raise ValueError("Unknown pool {!r}, given pools are "
+                                 "{}".format(field, sorted(available)))
+            if field not in self.pools:
+                self.pools[field] = _load_pool(available[field])
+            case = get_formatter(spec or wordstyle).case
+            self.slots.append((field, case))
+            parts.append("{}")
+        self.format_string = "".join(parts)
+        self._steps = [(None, width) if pool == "num" else
+                       (word_sampler(self.pools[pool], distribution),
+                        methodcaller(width))
+                       for pool, width in self.slots]
+        self._flats = dict()
+        if blocklist is not None:
+            blocklist = _import_submodule("blocklist")._as_blocklist(
+                blocklist)
+        self.blocklist = blocklist
+        self.seed = seed
+
+    @property
+    def seed(self):
+        """Seed of this template's PRNG, setting it restarts the PRNG"""
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed):
+        if seed is None:
+            seed = _new_seed()
+        self._seed = seed
+        self.random = random.Random(seed)
+
+    def __call__(self):
+        """
+        Next name from the template
+
+        :raises SpaceExhaustedError if ISSUED_ATTEMPTS names in a row were
+                blocked
+        """
+        for _ in range(ISSUED_ATTEMPTS):
+            name = self._draw()
+            if self.blocklist is None or not self.blocklist.blocks(name):
+                return name
+            metrics = _core._metrics
+            if metrics is not None:
+                metrics.count("blocked")
+        raise SpaceExhaustedError(
+            "No name that isn't blocked in {} tries".format(ISSUED_ATTEMPTS))
+
+    def _draw(self):
+        """Next name from the template, blocked or not"""
+        rng, values = self.random, list()
+        for sampler, step in self._steps:
+            if sampler is None:
+                values.append(rng.randrange(10 ** step))
+            else:
+                values.append(step(sampler.word(rng)))
+        return self.format_string.format(*values)
+
+    def generate_many(self, number, vectorize=None):
+        """Return a list of `number` names, see iter_many"""
+        return list(self.iter_many(number, vectorize=vectorize))
+
+    def iter_many(self, number, chunk_size=65536, vectorize=None):
+        """
+        Yield `number` names, drawing their words in batches
+
+        The words of every pool are drawn together, with NumPy when it is
+        installed unless `vectorize` is False, and the names are filled in
+        a batch at a time. As with WordGenerator.iter_many the names
+        produced for a given seed depend on whether NumPy is used.
+        """
+        rng = self.random
+        # one sampler per pool, drawing the words of all its slots at once
+        samplers, columns = dict(), list()
+        for pool, case in self.slots:
+            if pool == "num":
+                columns.append((None, None, case))
+                continue
+            if pool not in samplers:
+                samplers[pool] = 0
+            columns.append((pool, samplers[pool], methodcaller(case)))
+            samplers[pool] += 1
+        for pool, width in samplers.items():
+            flat = self._flats.get(pool)
+            if flat is None:
+                flat = self._flats[pool] = _FlatView(self.pools[pool])
+            samplers[pool] = _BatchSampler(flat, rng, count=width,
+                                           vectorize=vectorize,
+                                           distribution=self.distribution)
+
+        fill, blocklist, misses = self.format_string.format, \
+            self.blocklist, 0
+        while number > 0:
+            batch = min(number, chunk_size)
+            rows = dict((pool, sampler.sample(batch))
+                        for pool, sampler in samplers.items())
+            values = list()
+            for pool, column, case in columns:
+                if pool is None:
+                    bound = 10 ** case
+                    values.append([rng.randrange(bound)
+                                   for _ in range(batch)])
+                    continue
+                values.append([case(row[column]) for row in rows[pool]])
+            if blocklist is None:
+                for name in map(fill, *values):
+                    yield name
+                number -= batch
+                continue
+
+            names = blocklist.allowed(map(fill, *values))
+            metrics = _core._metrics
+            if metrics is not None:
+                metrics.count("blocked", batch - len(names))
+            misses = 0 if names else misses + 1
+            if misses >= ISSUED_ATTEMPTS:
+                raise SpaceExhaustedError(
+                    "No name that isn't blocked in {} batches".format(
+                        ISSUED_ATTEMPTS))
+            for name in names:
+                yield name
+            number -= len(names)
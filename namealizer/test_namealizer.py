@@ -3,9 +3,35 @@ import sys
 import os
 import unittest
 import glob
+import itertools
+import json
+import math
+import pickle
 import random
+import shutil
+import socket
 import string
-import namealizer
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    # takes the native str written to sys.stdout on Python 2 as well
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# the package rather than the namealizer module next to this file
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+import namealizer  # noqa: E402
+from namealizer import ingest, issued, server  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "utilities"))
+import duplicate_cleaner  # noqa: E402
 
 
 def write_dictionary(file_name, words_to_write):
@@ -13,6 +39,15 @@ def write_dictionary(file_name, words_to_write):
         dictionary_file.write("\n".join(words_to_write))
 
 
+def check_both_samplers(check):
+    check(False)
+    try:
+        import numpy
+    except ImportError:
+        return
+    check(True)
+
+
 def are_two_seed_runs_equal(seed_to_use, **kwargs):
     first = namealizer.main(seed=seed_to_use, **kwargs)
     second = namealizer.main(seed=seed_to_use, **kwargs)
@@ -72,6 +107,750 @@ class TestWordGenerator(unittest.TestCase):
             wg[None]
 
 
+class TestGeneratorRandomState(unittest.TestCase):
+    """Test that every WordGenerator owns its PRNG"""
+    def setUp(self):
+        self.dictionary = namealizer.load_dictionary(
+            "dictionaries/all_en_US.dict")
+
+    def test_seed_reproducible(self):
+        first = namealizer.WordGenerator(self.dictionary, seed=300)
+        second = namealizer.WordGenerator(self.dictionary, seed=300)
+        self.assertEqual([first[3] for _ in range(5)],
+                         [second[3] for _ in range(5)])
+
+    def test_setting_seed_restarts(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=300)
+        expected = wg["abc"]
+        wg.seed = 300
+        self.assertEqual(expected, wg["abc"])
+
+    def test_generators_independent(self):
+        first = namealizer.WordGenerator(self.dictionary, seed=300)
+        expected = [first[2] for _ in range(5)]
+
+        first.seed = 300
+        second = namealizer.WordGenerator(self.dictionary, seed=1)
+        interleaved = list()
+        for _ in range(5):
+            interleaved.append(first[2])
+            second[2]
+            random.random()
+        self.assertEqual(expected, interleaved)
+
+    def test_matches_main(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=3008)
+        self.assertEqual(namealizer.main(initials="cxm", seed=3008),
+                         wg["cxm"])
+
+    def test_spawn(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=300)
+        first, second = wg.spawn(0), wg.spawn(1)
+        self.assertIs(wg.dictionary, first.dictionary)
+        self.assertEqual(namealizer.derive_seed(300, 0), first.seed)
+        self.assertNotEqual(first.seed, second.seed)
+        self.assertEqual(first[4], wg.spawn(0)[4])
+
+    def test_spawn_across_threads(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=300)
+
+        def run(results, stream):
+            spawned = wg.spawn(stream)
+            results[stream] = [spawned[3] for _ in range(100)]
+
+        threaded = dict()
+        threads = [threading.Thread(target=run, args=(threaded, stream))
+                   for stream in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sequential = dict()
+        for stream in range(4):
+            run(sequential, stream)
+        self.assertEqual(sequential, threaded)
+
+
+class TestBulkGeneration(unittest.TestCase):
+    """Test generating many names in one call"""
+    def setUp(self):
+        self.wg = namealizer.WordGenerator("dictionaries/all_en_US.dict")
+
+    def test_count(self):
+        def check(vectorize):
+            names = self.wg.generate_many(50, count=3, vectorize=vectorize)
+            self.assertEqual(50, len(names))
+            for name in names:
+                self.assertEqual(3, len(name.split(" ")))
+        check_both_samplers(check)
+
+    def test_initials(self):
+        def check(vectorize):
+            for name in self.wg.generate_many(50, initials="XyZ",
+                                              vectorize=vectorize):
+                self.assertEqual(["x", "y", "z"],
+                                 [word[0] for word in name.split(" ")])
+        check_both_samplers(check)
+
+    def test_formatting(self):
+        self.wg.wordstyle = "uppercase"
+        self.wg.separator = "-"
+        for name in self.wg.generate_many(10, count=2, vectorize=False):
+            self.assertEqual(name.upper(), name)
+            self.assertEqual(2, len(name.split("-")))
+
+    def test_chunks(self):
+        names = list(self.wg.iter_many(10, vectorize=False, chunk_size=3))
+        self.assertEqual(10, len(names))
+
+    def test_chunking_does_not_change_names(self):
+        def check(vectorize):
+            self.wg.seed = 3
+            whole = self.wg.generate_many(30, vectorize=vectorize)
+            self.wg.seed = 3
+            chunked = list(self.wg.iter_many(30, vectorize=vectorize,
+                                             chunk_size=7))
+            self.assertEqual(whole, chunked)
+        check_both_samplers(check)
+
+    def test_zero_count(self):
+        self.assertEqual(["", ""], self.wg.generate_many(2, count=0))
+
+    def test_seeded(self):
+        self.wg.seed = 3008
+        first = self.wg.generate_many(20, count=3, vectorize=False)
+        self.wg.seed = 3008
+        second = self.wg.generate_many(20, count=3, vectorize=False)
+        self.assertEqual(first, second)
+
+    def test_unavailable_letter(self):
+        wg = namealizer.WordGenerator({"a": ["apple"]})
+        with self.assertRaises(namealizer.NoWordForLetter):
+            wg.generate_many(1, initials="b")
+
+    def test_write_names(self):
+        stream = StringIO()
+        written = namealizer.write_names(["one", "two", "three"], stream,
+                                         buffer_size=4)
+        self.assertEqual(3, written)
+        self.assertEqual("one\ntwo\nthree\n", stream.getvalue())
+
+
+class TestUniqueGeneration(unittest.TestCase):
+    """Test that unique mode never repeats a name"""
+    dictionary = {"a": ["apple", "avocado"], "b": ["banana"],
+                  "c": ["cherry", "clementine", "coconut"]}
+
+    def test_permutation_is_bijection(self):
+        for size in [0, 1, 2, 3, 17, 64, 1000]:
+            permutation = namealizer.IndexPermutation(size, seed=size)
+            self.assertEqual(list(range(size)),
+                             sorted(permutation[i] for i in range(size)))
+
+    def test_permutation_seeded(self):
+        first = namealizer.IndexPermutation(1000, seed=1)
+        second = namealizer.IndexPermutation(1000, seed=2)
+        self.assertNotEqual([first[i] for i in range(20)],
+                            [second[i] for i in range(20)])
+        self.assertEqual([first[i] for i in range(20)],
+                         [namealizer.IndexPermutation(1000, 1)[i]
+                          for i in range(20)])
+
+    def test_initials_space(self):
+        wg = namealizer.WordGenerator(self.dictionary, unique=True)
+        names = [wg["ac"] for _ in range(6)]
+        self.assertEqual(6, len(set(names)))
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg["ac"]
+
+    def test_count_space(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=5)
+        names = wg.generate_many(36, count=2, unique=True)
+        self.assertEqual(36, len(set(names)))
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg.generate_many(1, count=2, unique=True)
+
+    def test_walk_continues_across_calls(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=5)
+        first = wg.generate_many(3, count=2, unique=True)
+        rest = wg.generate_many(33, count=2, unique=True)
+        self.assertEqual(36, len(set(first + rest)))
+
+    def test_reset(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=5, unique=True)
+        first = wg.generate_many(6, initials="ac")
+        wg.reset_unique()
+        self.assertEqual(first, wg.generate_many(6, initials="ac"))
+
+    def test_large_space(self):
+        wg = namealizer.WordGenerator("dictionaries/all_en_US.dict",
+                                      unique=True)
+        names = wg.generate_many(1000, count=4)
+        self.assertEqual(1000, len(set(names)))
+
+    def test_spawned_walks_disjoint(self):
+        wg = namealizer.WordGenerator(self.dictionary, seed=5, unique=True)
+        streams = [wg.spawn(stream, 3) for stream in range(3)]
+        names = [spawned.generate_many(12, count=2) for spawned in streams]
+        self.assertEqual(36, len(set(sum(names, []))))
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            streams[0].generate_many(1, count=2)
+
+    def test_shared_across_threads(self):
+        core = namealizer.namealizer
+        cursor_class = core._UniqueCursor
+
+        class SlowCursor(cursor_class):
+            """Cursor slow to create and to advance, widening any race"""
+            def __init__(self, *args):
+                time.sleep(0.01)
+                cursor_class.__init__(self, *args)
+
+            @property
+            def position(self):
+                return self._position
+
+            @position.setter
+            def position(self, position):
+                self._position = position
+                time.sleep(0.001)
+
+        self.addCleanup(setattr, core, "_UniqueCursor", cursor_class)
+        core._UniqueCursor = SlowCursor
+        wg = namealizer.WordGenerator("dictionaries/all_en_US.dict",
+                                      seed=5, unique=True)
+        start = threading.Event()
+
+        def run(results, thread):
+            start.wait()
+            results[thread] = [wg[3] for _ in range(20)]
+
+        threaded = dict()
+        threads = [threading.Thread(target=run, args=(threaded, thread))
+                   for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(160, len(set(sum(threaded.values(), []))))
+
+    def test_spawn_needs_streams(self):
+        wg = namealizer.WordGenerator(self.dictionary, unique=True)
+        with self.assertRaises(ValueError):
+            wg.spawn(1)
+        with self.assertRaises(ValueError):
+            wg.spawn(2, 2)
+
+
+class TestIssuedNames(unittest.TestCase):
+    """Test that names issued once are never generated again"""
+    dictionary = {"a": ["apple", "avocado"], "b": ["banana"]}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "issued.db")
+        self.registry = issued.IssuedNameRegistry(self.path, capacity=100)
+
+    def test_claim(self):
+        self.assertTrue(self.registry.claim("apple banana"))
+        self.assertFalse(self.registry.claim("apple banana"))
+        self.assertIn("apple banana", self.registry)
+        self.assertNotIn("banana apple", self.registry)
+        self.assertEqual(["x", "y"],
+                         self.registry.claim_many(["x", "apple banana",
+                                                   "y", "x"]))
+
+    def test_persists(self):
+        self.registry.claim("apple")
+        self.registry.close()
+        os.remove(self.path + ".bloom")
+        with issued.IssuedNameRegistry(self.path) as reopened:
+            self.assertIn("apple", reopened)
+            self.assertFalse(reopened.claim("apple"))
+
+    def test_generation_skips_issued(self):
+        self.registry.claim("apple")
+        wg = namealizer.WordGenerator(self.dictionary, seed=1,
+                                      issued=self.registry)
+        self.assertEqual(["avocado", "banana"],
+                         sorted([wg[1], wg.generate_many(1, count=1)[0]]))
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg[1]
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg.generate_many(1, count=1)
+
+    def test_registries_share_claims(self):
+        other = issued.IssuedNameRegistry(self.path)
+        first = namealizer.WordGenerator(self.dictionary, seed=1,
+                                         issued=self.registry)
+        second = namealizer.WordGenerator(self.dictionary, seed=1,
+                                          issued=other)
+        names = first.generate_many(2, count=1) + \
+            second.generate_many(1, count=1)
+        self.assertEqual(["apple", "avocado", "banana"], sorted(names))
+        other.close()
+
+    def test_compact(self):
+        other = issued.IssuedNameRegistry(self.path)
+        names = ["name{}".format(index) for index in range(300)]
+        self.registry.claim_many(names)
+        other.compact()
+        self.assertTrue(self.registry.filter.retired)
+        self.assertTrue(other.claim("fresh"))
+        # the stale filter is swapped for the rebuilt one on next use
+        self.assertIn("fresh", self.registry)
+        self.assertFalse(self.registry.filter.retired)
+        self.assertTrue(all(name in self.registry for name in names))
+        self.assertEqual(301, len(self.registry))
+        other.close()
+
+    def test_nested_transactions(self):
+        with self.assertRaises(KeyError):
+            with self.registry._transaction():
+                self.assertTrue(self.registry.claim("apple"))
+                raise KeyError
+        # the claim committed with the outermost block, which rolled back
+        self.assertNotIn("apple", self.registry)
+        self.assertTrue(self.registry.claim("apple"))
+        self.assertEqual(0, self.registry._transactions)
+
+    def test_pickles_by_path(self):
+        restored = pickle.loads(pickle.dumps(self.registry))
+        self.registry.claim("apple")
+        self.assertIn("apple", restored)
+        restored.close()
+
+    def tearDown(self):
+        self.registry.close()
+        shutil.rmtree(self.directory)
+
+
+class TestBlocklist(unittest.TestCase):
+    """Test that names containing blocked substrings are replaced"""
+    dictionary = {"b": ["bad", "bat"], "d": ["dog", "den"]}
+
+    def test_matching(self):
+        blocklist = namealizer.Blocklist(["he", "She", "his", "hers", ""])
+        self.assertEqual(["he", "hers", "his", "she"], blocklist.patterns)
+        for name in ["ushers", "HIS", "ahishe", "the", "shhe"]:
+            self.assertTrue(blocklist.blocks(name), name)
+        for name in ["", "sh", "hi", "ushr", "h-e"]:
+            self.assertFalse(blocklist.blocks(name), name)
+        self.assertEqual(["sh", "hi"],
+                         blocklist.allowed(["sh", "she", "hi", "this"]))
+
+    def test_matches_like_substring_search(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            patterns = ["".join(rng.choice("abc")
+                                for _ in range(rng.randint(1, 4)))
+                        for _ in range(rng.randint(1, 5))]
+            blocklist = namealizer.Blocklist(patterns)
+            for _ in range(10):
+                name = "".join(rng.choice("abc ")
+                               for _ in range(rng.randint(0, 10)))
+                self.assertEqual(
+                    any(pattern in name for pattern in patterns),
+                    blocklist.blocks(name))
+
+    def test_spanning_words(self):
+        wg = namealizer.WordGenerator(self.dictionary, separator="",
+                                      seed=3, blocklist=["DD"])
+        allowed = ["batdog", "batden"]
+        for index in range(50):
+            self.assertIn(wg["bd"], allowed)
+            self.assertIn(wg.name_at(index, initials="bd"), allowed)
+
+        def check(vectorize):
+            names = wg.generate_many(200, initials="bd", vectorize=vectorize)
+            self.assertEqual(200, len(names))
+            self.assertEqual(set(allowed), set(names))
+        check_both_samplers(check)
+        self.assertIn(wg.spawn(1)["bd"], allowed)
+
+    def test_everything_blocked(self):
+        wg = namealizer.WordGenerator(self.dictionary,
+                                      blocklist=["a", "e", "o"])
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg[2]
+        with self.assertRaises(namealizer.SpaceExhaustedError):
+            wg.generate_many(10, count=1)
+
+    def test_pickle(self):
+        blocklist = namealizer.Blocklist(["abc", "bd"])
+        copy = pickle.loads(pickle.dumps(blocklist))
+        self.assertEqual(blocklist.patterns, copy.patterns)
+        self.assertTrue(copy.blocks("xabdx"))
+
+
+class TestCounterStreams(unittest.TestCase):
+    """Test random access to names by their position in a stream"""
+    def setUp(self):
+        self.wg = namealizer.WordGenerator("dictionaries/all_en_US.dict",
+                                           seed=3008)
+
+    def test_known_names(self):
+        # must never change: streams are stable across platforms and
+        # Python versions
+        self.assertEqual("yahi xylocopa", self.wg.name_at(0))
+        self.assertEqual("xian yawp zygoptera",
+                         namealizer.WordGenerator(seed=42).name_at(
+                             7, initials="XyZ"))
+
+    def test_cache_built_elsewhere(self):
+        # caches are shared between interpreters, one written in the
+        # previous format, whose letter order followed string hashing on
+        # Python 2.7, is rebuilt instead of changing the stream
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "shared.dict")
+            write_dictionary(path, [letter + ending
+                                    for letter in "zamqbxckdj"
+                                    for ending in ("ord", "ane", "ix")])
+            imported = namealizer.import_dictionary(path)
+            expected = namealizer.WordGenerator(imported, seed=3008)
+            expected = [expected.name_at(index) for index in range(20)]
+
+            core = namealizer.namealizer
+            packed = core._pack_dictionary(
+                OrderedDict(sorted(imported.items())), os.stat(path),
+                core._hash_file(path))
+            with open(path + namealizer.COMPILED_SUFFIX, "wb") as cache:
+                cache.write(packed[:4])
+                cache.write(struct.pack("<H", core._COMPILED_VERSION - 1))
+                cache.write(packed[6:])
+
+            wg = namealizer.WordGenerator(path, seed=3008)
+            self.assertEqual(expected,
+                             [wg.name_at(index) for index in range(20)])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_random_access(self):
+        names = list(self.wg.names_range(0, 50, count=3))
+        self.assertEqual(names[10:20],
+                         list(self.wg.names_range(10, 20, count=3)))
+        self.assertEqual(names[42], self.wg.name_at(42, count=3))
+        self.assertNotEqual(names[:10],
+                            list(self.wg.names_range(0, 10, count=2)))
+
+    def test_independent_of_prng(self):
+        first = self.wg.name_at(5, initials="abc")
+        self.wg[3]
+        self.wg.generate_many(10)
+        self.assertEqual(first, self.wg.name_at(5, initials="abc"))
+        self.assertNotEqual(first, self.wg.spawn(1).name_at(5,
+                                                            initials="abc"))
+
+    def test_formatting(self):
+        self.wg.wordstyle = "kebab"
+        self.wg.precased = True
+        self.assertEqual("yahi-xylocopa", self.wg.name_at(0))
+
+    def test_uniform_draws(self):
+        wg = namealizer.WordGenerator({"a": ["x", "y", "z"]}, seed=1,
+                                      distribution="uniform")
+        names = list(wg.names_range(0, 3000, count=1))
+        for word in "xyz":
+            self.assertTrue(800 < names.count(word) < 1200)
+
+    def test_unique_walk(self):
+        dictionary = {"a": ["apple", "avocado"], "b": ["banana"]}
+        wg = namealizer.WordGenerator(dictionary, seed=1, unique=True)
+        names = list(wg.names_range(0, 9, count=2))
+        self.assertEqual(9, len(set(names)))
+        self.assertEqual(names[:4], wg.generate_many(4, count=2))
+        with self.assertRaises(IndexError):
+            wg.name_at(9, count=2)
+
+
+class TestNameSpaces(unittest.TestCase):
+    """Test sizing, enumerating and indexing every name of a pattern"""
+    def setUp(self):
+        self.words = {"a": ["ant", "ape"], "b": ["bee", "bat", "boa"]}
+        self.wg = namealizer.WordGenerator(self.words,
+                                           wordstyle="capitalize",
+                                           separator="-")
+        self.expected = ["-".join(word.capitalize() for word in words)
+                         for words in itertools.product(self.words["a"],
+                                                        self.words["b"])]
+
+    def test_enumeration(self):
+        space = self.wg.space("ab")
+        self.assertEqual(6, len(space))
+        self.assertAlmostEqual(math.log(6, 2), space.entropy)
+        self.assertEqual(self.expected, list(space))
+        self.assertEqual(["ape", "boa"], space.words(-1))
+
+    def test_slicing(self):
+        space = self.wg.space("ab")
+        for key in [slice(1, 5), slice(None, None, -1), slice(4, 0, -2),
+                    slice(-2, None), slice(5, 2), slice(1, None, 2)]:
+            self.assertEqual(self.expected[key], list(space[key]))
+            self.assertEqual(self.expected[key][::-1],
+                             list(space[key][::-1]))
+        with self.assertRaises(IndexError):
+            space[6]
+
+    def test_patterns(self):
+        self.assertEqual(25, len(self.wg.space(2)))
+        self.assertEqual(["Ape-Bat", "Ape-Bee"],
+                         list(self.wg.space(["ap", "b"])[:2]))
+        self.assertEqual([""], list(self.wg.space(0)))
+        with self.assertRaises(namealizer.NoWordForLetter):
+            self.wg.space("abc")
+
+    def test_beyond_maxsize(self):
+        space = namealizer.WordGenerator().space(6)
+        self.assertGreater(space.size, sys.maxsize)
+        self.assertAlmostEqual(math.log(space.size, 2), space.entropy)
+        index = 12345678901234567890123
+        self.assertEqual([space[index + offset] for offset in range(3)],
+                         list(itertools.islice(space[index:], 3)))
+
+
+class TestNameTemplates(unittest.TestCase):
+    """Test names built from templates over several word pools"""
+    pools = {"adjective": {"a": ["amber"], "b": ["brisk"]},
+             "noun": {"o": ["otter"], "h": ["heron"]}}
+
+    def test_slots(self):
+        template = namealizer.NameTemplate(
+            "{adjective}-{noun:uppercase}-{num:4} {{x}}", pools=self.pools,
+            seed=7)
+        adjective, noun, rest = template().split("-")
+        self.assertIn(adjective, ["amber", "brisk"])
+        self.assertIn(noun, ["OTTER", "HERON"])
+        self.assertEqual(4, len(rest.split(" ")[0]))
+        self.assertTrue(rest.split(" ")[0].isdigit())
+        self.assertEqual("{x}", rest.split(" ")[1])
+
+    def test_default_style_and_pool(self):
+        template = namealizer.NameTemplate("{word}.{word:lowercase}",
+                                           wordstyle="capitalize")
+        first, second = template().split(".")
+        self.assertEqual(first.capitalize(), first)
+        self.assertEqual(second.lower(), second)
+
+    def test_seeded(self):
+        template = namealizer.NameTemplate("{adjective}{noun}{num:2}",
+                                           pools=self.pools, seed=3)
+        single = [template() for _ in range(20)]
+        bulk = template.generate_many(20)
+        template.seed = 3
+        self.assertEqual(single, [template() for _ in range(20)])
+        self.assertEqual(bulk, template.generate_many(20))
+        self.assertEqual(2, len(set(name[:5] for name in bulk)))
+
+    def check_bulk(self, vectorize):
+        template = namealizer.NameTemplate("{noun}:{noun:capitalize}",
+                                           pools=self.pools, seed=1)
+        names = list(template.iter_many(500, chunk_size=64,
+                                        vectorize=vectorize))
+        self.assertEqual(500, len(names))
+        for name in names:
+            first, second = name.split(":")
+            self.assertIn(first, ["otter", "heron"])
+            self.assertIn(second, ["Otter", "Heron"])
+        self.assertEqual(4, len(set(names)))
+
+    def test_bulk(self):
+        check_both_samplers(self.check_bulk)
+
+    def test_invalid_templates(self):
+        for template in ["{}", "{num:x}", "{num}", "{missing}", "{word!r}",
+                         "{word"]:
+            with self.assertRaises(ValueError):
+                namealizer.NameTemplate(template)
+        with self.assertRaises(namealizer.InvalidWordStyleError):
+            namealizer.NameTemplate("{word:bogus}")
+
+
+class TestShardedGeneration(unittest.TestCase):
+    """Test generating names across a pool of processes"""
+    def setUp(self):
+        self.wg = namealizer.WordGenerator("dictionaries/all_en_US.dict",
+                                           seed=3008)
+
+    def test_independent_of_jobs(self):
+        single = list(self.wg.iter_sharded(250, count=3, jobs=1,
+                                           shard_size=100))
+        pooled = list(self.wg.iter_sharded(250, count=3, jobs=2,
+                                           shard_size=100))
+        self.assertEqual(250, len(single))
+        self.assertEqual(single, pooled)
+
+    def test_shards_use_derived_seeds(self):
+        names = list(self.wg.iter_sharded(20, initials="ab", jobs=1,
+                                          shard_size=10, vectorize=False))
+        shard = self.wg.spawn(1).generate_many(10, initials="ab",
+                                               vectorize=False)
+        self.assertEqual(shard, names[10:])
+
+    def test_unique_shards(self):
+        wg = namealizer.WordGenerator(self.wg.dictionary, seed=3008,
+                                      unique=True)
+        single = list(wg.iter_sharded(250, count=2, jobs=1, shard_size=100))
+        pooled = namealizer.WordGenerator(self.wg.dictionary, seed=3008,
+                                          unique=True)
+        self.assertEqual(single, list(pooled.iter_sharded(
+            250, count=2, jobs=2, shard_size=100)))
+        self.assertEqual(250, len(set(single)))
+        self.assertEqual(single, namealizer.WordGenerator(
+            self.wg.dictionary, seed=3008).generate_many(
+                250, count=2, unique=True))
+        # the walk carries on past the shards
+        self.assertNotIn(wg.generate_many(1, count=2)[0], single)
+
+    def test_compiled_dictionary_pickles_by_path(self):
+        restored = pickle.loads(pickle.dumps(self.wg.dictionary))
+        self.assertEqual(self.wg.dictionary.path, restored.path)
+        self.assertEqual(list(self.wg.dictionary["q"]), list(restored["q"]))
+
+
+class TestNameServer(unittest.TestCase):
+    """Test the name server and its client over a local connection"""
+    def setUp(self):
+        self.server = server.create_server(port=0, chunk_size=4)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.client = server.NameClient(port=self.server.server_address[1],
+                                        timeout=10)
+
+    def test_generate(self):
+        names = self.client.generate(count=3, number=10, separator="-")
+        self.assertEqual(10, len(names))
+        for name in names:
+            self.assertEqual(3, len(name.split("-")))
+
+    def test_seeded_matches_library(self):
+        wg = namealizer.WordGenerator(seed=11)
+        self.assertEqual(wg.generate_many(6, initials="xyz"),
+                         self.client.generate(initials="xyz", number=6,
+                                              seed=11))
+
+    def test_pipelining(self):
+        requests = [{"initials": "ab"}, {"count": 1, "number": 9},
+                    {"number": 0}]
+        answers = self.client.pipeline(requests)
+        self.assertEqual([1, 9, 0], [len(answer) for answer in answers])
+        self.assertEqual(["a", "b"],
+                         [word[0] for word in answers[0][0].split()])
+
+    def test_error_keeps_connection(self):
+        with self.assertRaises(server.ServerError):
+            self.client.generate(wordstyle="cookies")
+        with self.assertRaises(server.ServerError):
+            self.client.generate(colour="blue")
+        self.assertEqual(1, len(self.client.generate()))
+
+    def test_handle_request(self):
+        responses = list(server.handle_request(
+            {"id": "x", "number": 5}, self.server.dictionaries, 2))
+        self.assertEqual([2, 2, 1], [len(response["names"])
+                                     for response in responses[:-1]])
+        self.assertEqual({"id": "x", "done": True, "number": 5},
+                         responses[-1])
+
+    def test_dictionary_options(self):
+        self.assertEqual({"default": "words.dict", "odd": "a=b.dict"},
+                         server._dictionary_options(["words.dict",
+                                                     "odd=a=b.dict"]))
+        self.assertEqual({"default": "words.dict"},
+                         server._dictionary_options(["=words.dict"]))
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix sockets")
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "namealizer.sock")
+        unix_server = server.create_server(socket_path=path)
+        thread = threading.Thread(target=unix_server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            with server.NameClient(socket_path=path, timeout=10) as client:
+                self.assertEqual(2, len(client.generate(number=2)))
+        finally:
+            unix_server.shutdown()
+            unix_server.server_close()
+            shutil.rmtree(directory)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@unittest.skipIf(sys.version_info < (3, 6), "needs async generators")
+class TestAsyncWordGenerator(unittest.TestCase):
+    """Test the asyncio interface"""
+    def setUp(self):
+        import asyncio
+        from namealizer import aio
+        self.aio = aio
+        self.loop = asyncio.new_event_loop()
+        self.wg = self.loop.run_until_complete(
+            aio.AsyncWordGenerator.open(seed=21))
+
+    def test_open_forwards_parameters(self):
+        blocklist = namealizer.Blocklist(["b"])
+        wg = self.loop.run_until_complete(self.aio.AsyncWordGenerator.open(
+            {"a": ["apple"], "b": ["banana"]}, "uppercase", unique=True,
+            blocklist=blocklist))
+        self.assertTrue(wg.generator.unique)
+        self.assertIs(blocklist, wg.generator.blocklist)
+        self.assertEqual("APPLE", wg[1])
+
+    def collect(self, names):
+        collected = list()
+        while True:
+            try:
+                collected.append(self.loop.run_until_complete(
+                    names.__anext__()))
+            except StopAsyncIteration:
+                return collected
+
+    def test_stream(self):
+        names = self.collect(self.wg.stream(25, count=3, chunk_size=10))
+        self.assertEqual(25, len(names))
+        self.wg.generator.seed = 21
+        self.assertEqual(self.wg.generator.generate_many(25, count=3),
+                         names)
+
+    def test_generate_many(self):
+        names = self.loop.run_until_complete(
+            self.wg.generate_many(5, initials="ab"))
+        self.assertEqual(5, len(names))
+
+    def test_event_loop_keeps_running(self):
+        ticks = list()
+
+        def tick():
+            ticks.append(None)
+            self.loop.call_soon(tick)
+        self.loop.call_soon(tick)
+
+        self.collect(self.wg.stream(20000, chunk_size=5000))
+        self.assertGreater(len(ticks), 3)
+
+    def test_close_early(self):
+        names = self.wg.stream(100, chunk_size=10)
+        self.loop.run_until_complete(names.__anext__())
+        self.loop.run_until_complete(names.aclose())
+        with self.assertRaises(StopAsyncIteration):
+            self.loop.run_until_complete(names.__anext__())
+
+    def test_errors_propagate(self):
+        with self.assertRaises(namealizer.NoWordForLetter):
+            self.collect(self.wg.stream(5, initials="a1"))
+
+    def tearDown(self):
+        self.loop.close()
+
+
 class TestDictionaryImport(unittest.TestCase):
     """
     Test the ability of the tool to import dictionaries. This tests
@@ -158,6 +937,673 @@ class TestDictionaryImport(unittest.TestCase):
             os.remove(dict_file)
 
 
+class TestDictionaryIngest(unittest.TestCase):
+    """Verifies streaming, compressed and multi-source ingestion"""
+    def setUp(self):
+        with namealizer.open_dictionary("first.dict.gz", "w") as first:
+            first.write("apple\t2\nbanana\n\navocado\n")
+        with namealizer.open_dictionary("second.dict.bz2", "w") as second:
+            second.write("cherry\nbanana\t5\napricot\n")
+        write_dictionary("third.dict", ["date", "apple"])
+        self.sources = ["first.dict.gz", "second.dict.bz2", "third.dict"]
+
+    def test_merge_with_dedup(self):
+        store, stats = ingest.ingest(self.sources)
+        self.assertEqual(["a", "b", "c", "d"], store.keys())
+        self.assertEqual(["apple", "avocado", "apricot"], list(store["a"]))
+        self.assertEqual(["banana"], list(store["b"]))
+        self.assertEqual([2.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+                         list(store.weights))
+        self.assertEqual(8, stats.lines)
+        self.assertEqual(6, stats.words)
+        self.assertEqual(2, stats.duplicates)
+
+    def test_keep_duplicates(self):
+        store, _ = ingest.ingest(self.sources, dedup=False)
+        self.assertEqual(["apple", "avocado", "apricot", "apple"],
+                         list(store["a"]))
+
+    def test_parallel_matches_serial(self):
+        serial, _ = ingest.ingest(self.sources, jobs=1)
+        parallel, _ = ingest.ingest(self.sources, jobs=2)
+        self.assertEqual(serial.keys(), parallel.keys())
+        for letter in serial:
+            self.assertEqual(list(serial[letter]), list(parallel[letter]))
+
+    def test_progress(self):
+        reports = list()
+        ingest.ingest(self.sources,
+                      progress=lambda stats: reports.append(str(stats)))
+        self.assertEqual(4, len(reports))
+        self.assertTrue(reports[0].startswith("parsed 1/3 sources"))
+        self.assertTrue(reports[-1].startswith("loaded 6 words"))
+
+    def test_load_compressed(self):
+        dictionary = namealizer.load_dictionary("first.dict.gz")
+        self.assertEqual(["apple", "avocado"], list(dictionary["a"]))
+        self.assertEqual(["banana"],
+                         namealizer.import_dictionary("second.dict.bz2")["b"])
+
+    def test_write_round_trip(self):
+        store, _ = ingest.ingest(self.sources)
+        ingest.write_dictionary(store, "merged.dict.gz")
+        loaded = namealizer.load_dictionary("merged.dict.gz")
+        self.assertEqual(store.keys(), loaded.keys())
+        self.assertEqual(list(store.weights), list(loaded.weights))
+
+    def test_cli(self):
+        self.assertEqual(0, ingest.cli(self.sources +
+                                       ["-q", "-o", "merged.dict"]))
+        merged = namealizer.load_dictionary("merged.dict")
+        self.assertEqual(6, merged.word_count)
+        self.assertEqual(1, ingest.cli(["-q", "missing.dict"]))
+
+    def tearDown(self):
+        for dict_file in glob.glob("*.dict*"):
+            os.remove(dict_file)
+
+
+class TestDuplicateCleaner(unittest.TestCase):
+    """Test the external merge sort removing duplicate dictionary words"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "words.dict")
+        write_dictionary(self.path, ["cherry", "Apple\t3", "banana", "",
+                                     "apple\t5", "cherry", "avocado",
+                                     "banana\t2", "apple"])
+
+    def read(self, path=None):
+        with open(path or self.path) as dict_file:
+            return dict_file.read().splitlines()
+
+    def test_duplicates_across_runs(self):
+        statistics = duplicate_cleaner.clean(self.path, chunk_size=2)
+        self.assertEqual(4, statistics["runs"])
+        self.assertEqual(["apple\t3.0", "avocado", "banana", "cherry"],
+                         self.read())
+        self.assertEqual(8, statistics["words"])
+        self.assertEqual(4, statistics["duplicates"])
+        self.assertEqual(1, statistics["blank"])
+
+    def test_first_weight_kept(self):
+        for chunk_size in [1, 3, 100]:
+            output = os.path.join(self.directory, "clean.dict")
+            duplicate_cleaner.clean(self.path, output, chunk_size)
+            self.assertEqual("apple\t3.0", self.read(output)[0])
+            self.assertEqual("banana", self.read(output)[2])
+
+    def test_statistics_json(self):
+        stat_path = os.path.join(self.directory, "stats.json")
+        duplicate_cleaner.main(self.path, stat_path, chunk_size=3)
+        with open(stat_path) as stat_file:
+            statistics = json.load(stat_file)
+        self.assertEqual(4, statistics["unique"])
+        self.assertEqual({"a": 4, "b": 2, "c": 2}, statistics["old"])
+        self.assertEqual({"a": 2, "b": 1, "c": 1}, statistics["new"])
+        self.assertEqual(self.path, statistics["output"])
+
+    def test_input_kept_on_failure(self):
+        original = self.read()
+        format_entry = duplicate_cleaner._format_entry
+
+        def failing(word, weight):
+            if word == "banana":
+                raise IOError("disk full")
+            return format_entry(word, weight)
+        duplicate_cleaner._format_entry = failing
+        try:
+            with self.assertRaises(IOError):
+                duplicate_cleaner.clean(self.path)
+        finally:
+            duplicate_cleaner._format_entry = format_entry
+        self.assertEqual(original, self.read())
+        self.assertEqual(["words.dict"], os.listdir(self.directory))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestCompiledDictionary(unittest.TestCase):
+    """Verifies the compiled dictionary cache used by load_dictionary"""
+    dictionary_path = "compiled-source.dict"
+    words = ["apple", "Avocado", "banana", "cherry", "clementine", "date"]
+
+    def setUp(self):
+        write_dictionary(self.dictionary_path, self.words)
+
+    def test_matches_import_dictionary(self):
+        imported = namealizer.import_dictionary(self.dictionary_path)
+        compiled = namealizer.load_dictionary(self.dictionary_path)
+        self.assertIsInstance(compiled, namealizer.CompiledDictionary)
+        self.assertEqual(list(imported.keys()), list(compiled.keys()))
+        for letter, words in imported.items():
+            self.assertEqual(words, list(compiled[letter]))
+
+    def test_cache_written_next_to_dictionary(self):
+        namealizer.load_dictionary(self.dictionary_path)
+        compiled_path = self.dictionary_path + namealizer.COMPILED_SUFFIX
+        self.assertTrue(os.path.exists(compiled_path))
+
+        # a second load maps the existing file instead of rebuilding it
+        mtime = os.stat(compiled_path).st_mtime
+        namealizer.load_dictionary(self.dictionary_path)
+        self.assertEqual(mtime, os.stat(compiled_path).st_mtime)
+
+    def test_cache_dir(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            namealizer.load_dictionary(self.dictionary_path,
+                                       cache_dir=cache_dir)
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_stale_cache_is_rebuilt(self):
+        namealizer.load_dictionary(self.dictionary_path)
+        write_dictionary(self.dictionary_path, self.words + ["eggplant"])
+        compiled = namealizer.load_dictionary(self.dictionary_path)
+        self.assertEqual(["eggplant"], list(compiled["e"]))
+
+    def test_same_seed_same_words(self):
+        imported = namealizer.import_dictionary(self.dictionary_path)
+        compiled = namealizer.load_dictionary(self.dictionary_path)
+        namealizer.generate_seed(42)
+        expected = namealizer.string_for_count(imported, 5)
+        namealizer.generate_seed(42)
+        self.assertEqual(expected, namealizer.string_for_count(compiled, 5))
+
+    def test_letters_in_file_order(self):
+        # the order must not depend on string hashing, the cache is shared
+        # between interpreters
+        letters = ["z", "a", "m", "q", "b", "x", "c", "k", "d", "j"]
+        write_dictionary(self.dictionary_path,
+                         [letter + "ord" for letter in letters])
+        imported = namealizer.import_dictionary(self.dictionary_path)
+        self.assertEqual(letters, list(imported.keys()))
+        compiled = namealizer.load_dictionary(self.dictionary_path)
+        self.assertEqual(letters, list(compiled.keys()))
+        with namealizer.open_dictionary(self.dictionary_path) as lines:
+            stored = namealizer.WordStore.from_lines(lines)
+        self.assertEqual(letters, list(stored.keys()))
+
+    def test_unavailable_letter(self):
+        compiled = namealizer.load_dictionary(self.dictionary_path)
+        with self.assertRaises(namealizer.NoWordForLetter):
+            namealizer.get_random_word(compiled, starting_letter="z")
+
+    def test_missing_dictionary(self):
+        with self.assertRaises(namealizer.DictionaryNotFoundError):
+            namealizer.load_dictionary("your_mom.dict")
+
+    def tearDown(self):
+        for dict_file in glob.glob("*.dict") + glob.glob("*.dictc"):
+            os.remove(dict_file)
+
+
+class TestWordStore(unittest.TestCase):
+    """Verifies the compact in-memory word store"""
+    words = ["Apple", "banana", "avocado", "cherry", "\u00e9clair", "bean"]
+
+    def setUp(self):
+        lines = [word + "\n" for word in self.words]
+        self.imported = namealizer.import_dictionary(lines)
+        self.store = namealizer.WordStore.from_lines(lines)
+
+    def test_matches_import_dictionary(self):
+        self.assertEqual(list(self.imported.keys()), list(self.store.keys()))
+        for letter, words in self.imported.items():
+            self.assertEqual(words, list(self.store[letter]))
+
+    def test_from_dictionary(self):
+        store = namealizer.WordStore.from_dictionary(self.imported)
+        self.assertEqual(self.store.keys(), store.keys())
+        for letter in self.imported:
+            self.assertEqual(list(self.store[letter]), list(store[letter]))
+
+    def test_same_seed_same_words(self):
+        expected = namealizer.string_for_count(self.imported, 8,
+                                               random.Random(4))
+        self.assertEqual(expected, namealizer.string_for_count(
+            self.store, 8, random.Random(4)))
+
+    def test_unavailable_letter(self):
+        with self.assertRaises(namealizer.NoWordForLetter):
+            namealizer.get_random_word(self.store, starting_letter="z")
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.store))
+        self.assertEqual(list(self.store["b"]), list(restored["b"]))
+
+    def test_smaller_than_dictionary(self):
+        dictionary = namealizer.import_dictionary(
+            "dictionaries/all_en_US.dict")
+        store = namealizer.WordStore.from_dictionary(dictionary)
+        word_objects = sum(sys.getsizeof(word)
+                           for words in dictionary.values()
+                           for word in words)
+        self.assertLess(store.nbytes * 3, word_objects)
+
+    def test_load_opened_file(self):
+        with open("dictionaries/all_en_US.dict") as dictionary_file:
+            loaded = namealizer.load_dictionary(dictionary_file)
+        self.assertIsInstance(loaded, namealizer.WordStore)
+
+
+class TestWordDistributions(unittest.TestCase):
+    """Verifies word-uniform and weighted sampling"""
+    lines = ["apple\t1\n", "avocado\t3\n", "banana\t0\n", "berry\t6\n",
+             "cherry\n"]
+
+    def setUp(self):
+        write_dictionary("weighted.dict", [line.strip("\n")
+                                           for line in self.lines])
+
+    def test_alias_table(self):
+        table = namealizer.AliasTable([1, 0, 3])
+        rng = random.Random(5)
+        draws = [table.sample(rng) for _ in range(8000)]
+        self.assertNotIn(1, draws)
+        self.assertAlmostEqual(3.0, draws.count(2) / float(draws.count(0)),
+                               delta=0.3)
+
+    def test_alias_table_rejects_bad_weights(self):
+        for weights in ([], [0, 0], [1, -1]):
+            with self.assertRaises(ValueError):
+                namealizer.AliasTable(weights)
+
+    def test_weight_column(self):
+        store = namealizer.WordStore.from_lines(self.lines)
+        self.assertEqual(["apple", "avocado"], list(store["a"]))
+        self.assertEqual([1.0, 3.0, 0.0, 6.0, 1.0], list(store.weights))
+        self.assertEqual(["apple", "avocado"],
+                         namealizer.import_dictionary(self.lines)["a"])
+        with self.assertRaises(ValueError):
+            namealizer.WordStore.from_lines(["apple\theavy\n"])
+
+    def test_compiled_weights(self):
+        compiled = namealizer.load_dictionary("weighted.dict")
+        self.assertIsInstance(compiled, namealizer.CompiledDictionary)
+        self.assertEqual([1.0, 3.0, 0.0, 6.0, 1.0], list(compiled.weights))
+        self.assertEqual(["berry"], list(compiled["b"])[1:])
+
+        write_dictionary("plain.dict", ["apple", "banana"])
+        self.assertIsNone(namealizer.load_dictionary("plain.dict").weights)
+
+    def test_weighted(self):
+        def check(vectorize):
+            wg = namealizer.WordGenerator("weighted.dict", seed=2,
+                                          distribution="weighted")
+            names = wg.generate_many(4000, count=1, vectorize=vectorize)
+            self.assertNotIn("banana", names)
+            self.assertGreater(names.count("berry"), names.count("avocado"))
+            self.assertGreater(names.count("avocado"), names.count("apple"))
+            self.assertEqual({"berry"}, set(wg.generate_many(
+                50, initials="b", vectorize=vectorize)))
+        check_both_samplers(check)
+
+        wg = namealizer.WordGenerator("weighted.dict", seed=2,
+                                      distribution="weighted")
+        self.assertEqual({"berry"}, set(wg["b"] for _ in range(50)))
+
+    def test_uniform(self):
+        write_dictionary("skewed.dict", ["apple"] + ["banana"] * 9)
+        wg = namealizer.WordGenerator("skewed.dict", seed=3,
+                                      distribution="uniform")
+        names = [wg[1] for _ in range(2000)]
+        self.assertGreater(names.count("banana"), 6 * names.count("apple"))
+
+        wg.distribution = "letter"
+        names = [wg[1] for _ in range(2000)]
+        self.assertLess(names.count("banana"), 2 * names.count("apple"))
+
+    def test_letter_matches_get_random_word(self):
+        wg = namealizer.WordGenerator("weighted.dict", seed=8)
+        rng = random.Random(8)
+        expected = [namealizer.get_random_word(wg.dictionary, rng=rng)
+                    for _ in range(20)]
+        self.assertEqual(expected, wg[20].split(" "))
+
+    def test_invalid_distribution(self):
+        with self.assertRaises(ValueError):
+            namealizer.WordGenerator(distribution="zipf")
+
+    def test_cli_distribution(self):
+        stream = StringIO()
+        namealizer.cli(["-d", "weighted.dict", "-n", "20", "-c", "1",
+                        "--distribution", "weighted"], stream)
+        self.assertNotIn("banana", stream.getvalue().split())
+
+    def tearDown(self):
+        for dict_file in glob.glob("*.dict") + glob.glob("*.dictc"):
+            os.remove(dict_file)
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Verifies prefix queries and prefix access"""
+    words = ["stop", "pro", "state", "protest", "apple", "prune", "probe",
+             "stack", "Xylophone"]
+
+    def setUp(self):
+        self.dictionary = namealizer.import_dictionary(
+            [word + "\n" for word in self.words])
+        self.index = namealizer.PrefixIndex(self.dictionary)
+
+    def test_count(self):
+        self.assertEqual(3, self.index.count("pro"))
+        self.assertEqual(3, self.index.count("PRO"))
+        self.assertEqual(2, self.index.count("sta"))
+        self.assertEqual(0, self.index.count("zzz"))
+        self.assertEqual(len(self.words), self.index.count(""))
+
+    def test_words(self):
+        self.assertEqual(["pro", "probe", "protest"],
+                         self.index.words("pro"))
+
+    def test_random_word(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            self.assertTrue(self.index.random_word("pr", rng).startswith("pr"))
+
+    def test_empty_prefix_raises(self):
+        with self.assertRaises(namealizer.NoWordForLetter):
+            self.index.random_word("q")
+
+    def test_packed_dictionary(self):
+        store = namealizer.WordStore.from_dictionary(self.dictionary)
+        index = namealizer.PrefixIndex(store)
+        self.assertEqual(["stack", "state"], index.words("sta"))
+
+    def test_prefix_access_method(self):
+        wg = namealizer.WordGenerator(self.dictionary, separator="-")
+        words = wg[["pro", "st", "x"]].split("-")
+        self.assertEqual(3, len(words))
+        self.assertTrue(words[0].startswith("pro"))
+        self.assertTrue(words[1].startswith("st"))
+        self.assertEqual("xylophone", words[2])
+
+    def test_index_shared(self):
+        first = namealizer.WordGenerator(self.dictionary)
+        second = namealizer.WordGenerator(self.dictionary)
+        self.assertIs(first.prefix_index, second.prefix_index)
+
+    def test_full_dictionary(self):
+        wg = namealizer.WordGenerator("dictionaries/all_en_US.dict")
+        expected = sum(1 for words in wg.dictionary.values()
+                       for word in words if word.startswith("pre"))
+        self.assertEqual(expected, wg.prefix_index.count("pre"))
+
+
+class TestWordFilters(unittest.TestCase):
+    """Verifies filtered dictionaries"""
+    words = ["at", "apple", "avocado", "aardvark's", "banana", "bean",
+             u"b\u00e9b\u00e9", "cherry", "cat", "crab"]
+
+    def setUp(self):
+        self.dictionary = namealizer.import_dictionary(
+            [word + "\n" for word in self.words])
+
+    def filtered(self, **settings):
+        view = namealizer.FilteredDictionary(
+            self.dictionary, namealizer.WordFilter(**settings))
+        return dict((letter, sorted(words)) for letter, words in view.items())
+
+    def test_length(self):
+        self.assertEqual({"a": ["apple"], "b": ["banana"], "c": ["cherry"]},
+                         self.filtered(min_length=5, max_length=6))
+
+    def test_characters(self):
+        self.assertEqual(["aardvark's", "apple", "at", "avocado"],
+                         self.filtered(ascii_only=True)["a"])
+        self.assertEqual(["apple", "at", "avocado"],
+                         self.filtered(apostrophes=False)["a"])
+        self.assertEqual(["banana", "bean"],
+                         self.filtered(characters="abnem")["b"])
+        self.assertEqual(["cat", "crab"],
+                         self.filtered(pattern="c[a-z]{2}b?")["c"])
+
+    def test_exclude_drops_empty_letters(self):
+        filtered = self.filtered(exclude=["Cherry", "cat", "crab"])
+        self.assertNotIn("c", filtered)
+
+    def test_buckets(self):
+        view = namealizer.FilteredDictionary(self.dictionary,
+                                             namealizer.WordFilter())
+        self.assertEqual(["cat"], list(view.bucket("c", 3)))
+        self.assertEqual(["bean", "crab"],
+                         [list(view.bucket("b", 4))[0],
+                          list(view.bucket("c", 4))[0]])
+        with self.assertRaises(namealizer.NoWordForLetter):
+            view.bucket("c", 9)
+
+    def test_generator_filters(self):
+        wg = namealizer.WordGenerator(self.dictionary,
+                                      filters={"min_length": 7})
+        for name in wg.generate_many(50, count=3):
+            for word in name.split():
+                self.assertGreaterEqual(len(word), 7)
+        with self.assertRaises(namealizer.NoWordForLetter):
+            wg["b"]
+
+    def test_filtered_views_shared(self):
+        first = namealizer.WordGenerator(
+            self.dictionary, filters=namealizer.WordFilter(min_length=4))
+        second = namealizer.WordGenerator(self.dictionary,
+                                          filters={"min_length": 4})
+        self.assertIs(first.dictionary, second.dictionary)
+
+    def test_packed_source(self):
+        wg = namealizer.WordGenerator("dictionaries/all_en_US.dict",
+                                      filters={"min_length": 3,
+                                               "max_length": 8,
+                                               "ascii_only": True})
+        for word in wg[40].split():
+            self.assertTrue(3 <= len(word) <= 8)
+
+
+class TestDictionaryRegistry(unittest.TestCase):
+    """Verifies dictionaries are shared between generators"""
+    first_path = "registry-first.dict"
+    second_path = "registry-second.dict"
+
+    def setUp(self):
+        write_dictionary(self.first_path, ["apple", "banana"])
+        write_dictionary(self.second_path, ["cherry", "date"])
+        self.registry = namealizer.DictionaryRegistry(max_entries=1)
+
+    def test_hits_and_misses(self):
+        first = self.registry.get(self.first_path)
+        self.assertIs(first, self.registry.get(self.first_path))
+        self.assertEqual(1, self.registry.misses)
+        self.assertEqual(1, self.registry.hits)
+
+    def test_lru_eviction(self):
+        self.registry.get(self.first_path)
+        self.registry.get(self.second_path)
+        self.assertEqual(1, len(self.registry))
+        self.registry.get(self.first_path)
+        self.assertEqual(3, self.registry.misses)
+
+    def test_byte_budget(self):
+        self.registry.max_entries = 16
+        self.registry.max_bytes = 1
+        self.registry.get(self.first_path)
+        self.registry.get(self.second_path)
+        self.assertEqual(1, len(self.registry))
+
+    def test_clear(self):
+        self.registry.get(self.first_path)
+        self.registry.clear()
+        self.assertEqual(0, len(self.registry))
+        self.assertEqual(0, self.registry.misses)
+
+    def test_generators_share_dictionary(self):
+        first = namealizer.WordGenerator(self.first_path)
+        second = namealizer.WordGenerator(self.first_path)
+        self.assertIs(first.dictionary, second.dictionary)
+
+    def test_generator_from_loaded_dictionary(self):
+        loaded = namealizer.import_dictionary(self.first_path)
+        wg = namealizer.WordGenerator(loaded)
+        self.assertIs(loaded, wg.dictionary)
+        self.assertIn(wg[1], ["apple", "banana"])
+
+    def tearDown(self):
+        for dict_file in glob.glob("*.dict") + glob.glob("*.dictc"):
+            os.remove(dict_file)
+
+
+class TestDictionaryReload(unittest.TestCase):
+    """Verifies watched dictionaries follow the edits made to their file"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "watched.dict")
+        self.edits = 0
+        self.edit(["apple", "avocado", "banana", "cherry"])
+
+    def edit(self, words):
+        """Replace the dictionary file, as an editor would"""
+        temporary = self.path + ".tmp"
+        write_dictionary(temporary, words)
+        self.edits += 1
+        os.utime(temporary, (1000000 + self.edits, 1000000 + self.edits))
+        os.rename(temporary, self.path)
+
+    def assert_same_words(self, expected, actual):
+        self.assertEqual(list(expected.keys()), list(actual.keys()))
+        for letter in expected.keys():
+            self.assertEqual(list(expected[letter]), list(actual[letter]))
+        if expected.weights is None:
+            self.assertIsNone(actual.weights)
+        else:
+            self.assertEqual(list(expected.weights), list(actual.weights))
+
+    def test_incremental_reload(self):
+        watcher = namealizer.DictionaryWatcher(self.path)
+        self.assertIsNone(watcher.check())
+        self.edit(["apple", "avocado", "banana", "date\t2", "dill"])
+        report = watcher.check()
+        self.assertEqual(["d"], report.parsed)
+        self.assertEqual(["c"], report.removed)
+        self.assertEqual(5, report.words)
+        self.assertIs(report, watcher.last_reload)
+        with namealizer.open_dictionary(self.path) as lines:
+            expected = namealizer.WordStore.from_lines(lines)
+        self.assert_same_words(expected, watcher.dictionary)
+
+    def test_reload_keeps_file_order(self):
+        watcher = namealizer.DictionaryWatcher(self.path)
+        letters = ["z", "a", "m", "q", "b", "x", "c", "k", "d", "j"]
+        self.edit([letter + "ord" for letter in letters])
+        watcher.check()
+        self.assertEqual(letters, list(watcher.dictionary.keys()))
+
+    def test_generator_follows_edits(self):
+        wg = namealizer.WordGenerator(self.path, watch=0)
+        shared = namealizer.WordGenerator(self.path, watch=3600)
+        self.assertIn(wg["c"], ["cherry"])
+        self.edit(["apple", "avocado", "banana", "cranberry"])
+        self.assertEqual("cranberry", wg["c"])
+        self.assertEqual(["c"], wg.last_reload.parsed)
+        self.assertEqual(["cranberry"] * 5,
+                         wg.generate_many(5, initials="c"))
+        # both watch the same file, the reload is shared
+        self.assertIsNotNone(shared.reload())
+        self.assertIs(wg.dictionary, shared.dictionary)
+        self.assertEqual("cranberry", wg.spawn(1)["c"])
+
+    def test_failed_reload_keeps_dictionary(self):
+        wg = namealizer.WordGenerator(self.path, watch=0,
+                                      filters={"min_length": 6})
+        watcher = namealizer.watch_dictionary(self.path)
+        self.edit(["apple\tlots", "avocado"])
+        self.assertEqual("avocado", wg["a"])
+        self.assertIsInstance(watcher.error, ValueError)
+        self.edit(["almond", "avocado"])
+        self.assertIn(wg["a"], ["almond", "avocado"])
+        self.assertIsNone(watcher.error)
+
+    def test_watch_needs_file(self):
+        loaded = namealizer.import_dictionary(self.path)
+        with self.assertRaises(ValueError):
+            namealizer.WordGenerator(loaded, watch=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestMetrics(unittest.TestCase):
+    """Verifies the opt-in instrumentation"""
+    dict_path = "metrics.dict"
+
+    def setUp(self):
+        write_dictionary(self.dict_path, ["apple", "avocado", "banana"])
+        self.metrics = namealizer.enable_metrics()
+
+    def test_disabled_by_default(self):
+        namealizer.disable_metrics()
+        self.assertIsNone(namealizer.get_metrics())
+        namealizer.WordGenerator(self.dict_path, seed=1)[2]
+        self.assertEqual({}, self.metrics.counters)
+
+    def test_single_names(self):
+        wg = namealizer.WordGenerator(self.dict_path, wordstyle="kebab",
+                                      seed=1)
+        wg["ab"]
+        wg["aa"]
+        self.assertEqual(3, self.metrics.counters["draws.a"])
+        self.assertEqual(1, self.metrics.counters["draws.b"])
+        self.assertEqual(2, self.metrics.counters["format.kebab"])
+        self.assertEqual(2, self.metrics.histograms["name"].count)
+
+    def test_bulk_names(self):
+        wg = namealizer.WordGenerator(self.dict_path, seed=1)
+        list(wg.iter_many(50, count=3, chunk_size=20))
+        counters = self.metrics.counters
+        self.assertEqual(50, counters["format.lowercase"])
+        self.assertEqual(150, counters["draws.a"] + counters["draws.b"])
+        self.assertEqual(3, self.metrics.histograms["sample"].count)
+        self.assertEqual(3, self.metrics.histograms["format"].count)
+
+    def test_errors(self):
+        wg = namealizer.WordGenerator(self.dict_path, seed=1)
+        self.assertRaises(namealizer.NoWordForLetter, wg.__getitem__, "z")
+        self.assertRaises(namealizer.NoWordForLetter, wg.generate_many, 5,
+                          initials="z")
+        self.assertEqual(2, self.metrics.counters["errors.NoWordForLetter"])
+
+    def test_loads(self):
+        namealizer.load_dictionary(self.dict_path)
+        namealizer.load_dictionary(self.dict_path)
+        self.assertEqual(2, self.metrics.counters["loads"])
+        self.assertEqual(1, self.metrics.counters["compiles"])
+        self.assertEqual(2, self.metrics.histograms["load"].count)
+
+    def test_exporters(self):
+        exported = list()
+        self.metrics.add_exporter(exported.append)
+        self.metrics.count("custom", 3)
+        self.metrics.observe("custom", 0.5)
+        snapshot = self.metrics.export()
+        self.assertEqual([snapshot], exported)
+        self.assertEqual(3, snapshot["counters"]["custom"])
+        self.assertEqual(0.5, snapshot["histograms"]["custom"]["max"])
+        self.assertIn("custom", self.metrics.summary())
+
+    def test_histogram_percentiles(self):
+        histogram = namealizer.Histogram()
+        for seconds in [0.001] * 98 + [0.5, 1.0]:
+            histogram.add(seconds)
+        self.assertEqual(100, histogram.count)
+        self.assertTrue(0.001 <= histogram.percentile(0.5) < 0.002)
+        self.assertTrue(0.5 <= histogram.percentile(0.99) <= 1.0)
+        self.assertEqual(1.0, histogram.percentile(1.0))
+
+    def tearDown(self):
+        namealizer.disable_metrics()
+        for dict_file in glob.glob("*.dict") + glob.glob("*.dictc"):
+            os.remove(dict_file)
+
+
 class TestStringFormatter(unittest.TestCase):
     """Verifies string formatting functionality
 
@@ -239,6 +1685,50 @@ class TestStringFormatter(unittest.TestCase):
         with self.assertRaises(namealizer.InvalidWordStyleError):
             namealizer.format_string("My big pizza", "copy")
 
+    def test_styles_with_separators(self):
+        expected = {"snake": "all_the_world", "kebab": "all-the-world",
+                    "constant": "ALL_THE_WORLD", "dot": "all.the.world"}
+        for wordstyle, standard in expected.items():
+            # these styles impose their own separator
+            test = namealizer.format_string("All the World", wordstyle, "*")
+            self.assertEqual(standard, test)
+
+    def test_formatter(self):
+        formatter = namealizer.get_formatter("mixedcase", "-")
+        self.assertIs(formatter, namealizer.get_formatter("mixedcase", "-"))
+        self.assertEqual("capitalize", formatter.case)
+        self.assertEqual("all-The-World", formatter(["All", "the", "WORLD"]))
+        self.assertEqual("all-The-World",
+                         formatter.join(["All", "The", "World"]))
+        self.assertEqual("", formatter([]))
+
+    def test_precased_generator(self):
+        for wordstyle in ("uppercase", "mixedcase", "kebab"):
+            plain = namealizer.WordGenerator(seed=6, wordstyle=wordstyle)
+            precased = namealizer.WordGenerator(seed=6, wordstyle=wordstyle,
+                                                precased=True)
+            self.assertEqual([plain[3] for _ in range(20)],
+                             [precased[3] for _ in range(20)])
+            self.assertEqual(plain.generate_many(50, initials="abc"),
+                             precased.generate_many(50, initials="abc"))
+
+    def test_cased_dictionary(self):
+        dictionary = namealizer.import_dictionary(["apple\n", "bean\n"])
+        cased = namealizer.cased_dictionary(dictionary, "upper")
+        self.assertIs(cased, namealizer.cased_dictionary(dictionary, "upper"))
+        self.assertEqual(["APPLE"], list(cased["a"]))
+
+    def test_cased_dictionary_keyed_by_live_source(self):
+        # freed dictionaries' ids get reused, a cached copy must never be
+        # handed to another dictionary
+        for number in range(50):
+            dictionary = namealizer.import_dictionary(
+                ["apple{}\n".format(number)])
+            wg = namealizer.WordGenerator(dictionary, wordstyle="uppercase",
+                                          precased=True)
+            self.assertEqual("APPLE{}".format(number), wg[1])
+            del dictionary, wg
+
 
 class TestCommandLineParameters(unittest.TestCase):
     """Verifies command line parameters are handled correctly
@@ -248,9 +1738,119 @@ class TestCommandLineParameters(unittest.TestCase):
         import argparse
         return_value = namealizer.create_parser()
         self.assertIsInstance(return_value, argparse.Namespace)
-        num_args = 6
+        num_args = 16
         self.assertEqual(len(return_value.__dict__), num_args)
 
+    def test_parse_given_arguments(self):
+        args = namealizer.create_parser(["-c", "3", "-s", "10"])
+        self.assertEqual(3, args.count)
+        self.assertEqual(10, args.seed)
+
+    def test_cli_single_name(self):
+        stream = StringIO()
+        self.assertEqual(0, namealizer.cli(["-icxm", "-s3008"], stream))
+        expected = namealizer.main(initials="cxm", seed=3008)
+        self.assertEqual(expected + "\n", stream.getvalue())
+
+    def test_cli_number(self):
+        stream = StringIO()
+        namealizer.cli(["-n", "5", "-c", "3", "-sep", "_"], stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(5, len(lines))
+        for line in lines:
+            self.assertEqual(3, len(line.split("_")))
+
+    def test_cli_initials_from(self):
+        path = os.path.join(tempfile.mkdtemp(), "initials.txt")
+        with open(path, "w") as initials_file:
+            initials_file.write("abc\nq1\n\nXY\n")
+        stream = StringIO()
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            status = namealizer.cli(["--initials-from", path, "-s", "7"],
+                                    stream)
+            report = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+            shutil.rmtree(os.path.dirname(path))
+
+        wg = namealizer.WordGenerator(seed=7)
+        expected = [wg["abc"]]
+        self.assertRaises(namealizer.NoWordForLetter, wg.__getitem__, "q1")
+        expected += ["", "", wg["XY"]]
+        self.assertEqual(1, status)
+        self.assertEqual(expected, stream.getvalue().split("\n")[:-1])
+        self.assertIn("line 2", report)
+
+    def test_cli_initials_from_stdin(self):
+        stream = StringIO()
+        stdin, sys.stdin = sys.stdin, StringIO("ab\ncd\n")
+        try:
+            status = namealizer.cli(["--initials-from", "-"], stream)
+        finally:
+            sys.stdin = stdin
+        self.assertEqual(0, status)
+        names = stream.getvalue().splitlines()
+        self.assertEqual(["a", "c"], [name[0] for name in names])
+
+    def test_cli_template(self):
+        path = os.path.join(tempfile.mkdtemp(), "colors.dict")
+        write_dictionary(path, ["red", "green"])
+        stream = StringIO()
+        try:
+            namealizer.cli(["--template", "{color:uppercase}_{num:3}",
+                            "--pool", "color=" + path, "-n", "10"], stream)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        for name in stream.getvalue().splitlines():
+            color, number = name.split("_")
+            self.assertIn(color, ["RED", "GREEN"])
+            self.assertEqual(3, len(number))
+
+    def test_cli_malformed_pool(self):
+        stderr = sys.stderr
+        for pool in ["color", "color=", "=colors.dict"]:
+            sys.stderr = open(os.devnull, "w")
+            try:
+                with self.assertRaises(SystemExit):
+                    namealizer.create_parser(["--template", "{color}",
+                                              "--pool", pool])
+            finally:
+                sys.stderr.close()
+                sys.stderr = stderr
+
+    def test_cli_blocklist(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "words.dict")
+        blocked = os.path.join(directory, "blocked.txt")
+        write_dictionary(path, ["red", "green", "blue"])
+        write_dictionary(blocked, ["REE", "lu"])
+        stream = StringIO()
+        try:
+            namealizer.cli(["-d", path, "-c", "1", "-n", "20",
+                            "--blocklist", blocked], stream)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(["red"] * 20, stream.getvalue().splitlines())
+
+    def test_cli_stats(self):
+        stream = StringIO()
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            namealizer.cli(["-n", "3", "--stats"], stream)
+            report = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertIn("format.lowercase", report)
+        self.assertIsNone(namealizer.get_metrics())
+
+    def test_default_dictionary_resolves_to_package(self):
+        path = namealizer.resolve_dictionary(namealizer.DEFAULT_DICTIONARY)
+        self.assertTrue(os.path.isabs(path))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual("words.dict",
+                         namealizer.resolve_dictionary("words.dict"))
+
 
 class TestActualUsage(unittest.TestCase):
     """Test expected program usage
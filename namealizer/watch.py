@@ -0,0 +1,253 @@
+"""Dictionaries that follow the edits made to their file
+
+A WordGenerator given `watch` draws from a DictionaryWatcher, which
+reloads the file when it changes, parsing only the letters whose lines
+did:
+
+    watcher = watch_dictionary("words.dict")
+    watcher.check()                     # ReloadReport, or None
+"""
+from __future__ import absolute_import
+
+import hashlib
+import os
+import re
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+
+from namealizer import namealizer as _core
+from namealizer.metrics import _format_seconds
+from namealizer.namealizer import (
+    DictionaryNotFoundError, WordStore, _clock, _parse_line,
+    dictionary_registry, open_dictionary)
+
+
+# a weight column in the lines of a dictionary, as _parse_line reads it
+_WEIGHT_COLUMN = re.compile(r"\t[^\S\n]*\S")
+
+
+def _stat_key(path):
+    """Size, mtime and inode of the file at `path`, which change on edits"""
+    source_stat = os.stat(path)
+    return source_stat.st_size, source_stat.st_mtime, source_stat.st_ino
+
+
+def _letter_groups(path):
+    """
+    Lines of the dictionary file at `path` by starting letter, the letters
+    in the order WordStore.from_lines would give them
+    """
+    groups = OrderedDict()
+    with open_dictionary(path) as dictionary_file:
+        for line in dictionary_file:
+            try:
+                groups[line[0].lower()].append(line)
+            except KeyError:
+                groups[line[0].lower()] = [line]
+    return groups
+
+
+def _digest_groups(groups):
+    """
+    sha1 digest of the lines of every letter in `groups`, paired with
+    whether any of them has a weight
+    """
+    digests = dict()
+    for letter, lines in groups.items():
+        text = "".join(lines)
+        weighted = _WEIGHT_COLUMN.search(text) is not None
+        if not isinstance(text, bytes):
+            text = text.encode("utf-8")
+        digests[letter] = (hashlib.sha1(text).digest(), weighted)
+    return digests
+
+
+def _patch_dictionary(dictionary, digests, groups):
+    """
+    Pack the lines of a dictionary file, grouped by _letter_groups, into a
+    WordStore equal to WordStore.from_lines', copying the packed words of
+    every letter whose lines are the same as when `dictionary` was loaded
+
+    :param digests _digest_groups of the lines `dictionary` was loaded
+           from, None to parse every letter
+    :return the WordStore, the _digest_groups of `groups` and the letters
+            that were parsed
+
+    :raises ValueError if a parsed line has an invalid weight
+    """
+    new_digests = _digest_groups(groups)
+    if digests is None or not hasattr(dictionary, "_letter_block"):
+        digests = dict()
+    weighted = any(has_weights for _, has_weights in new_digests.values())
+    source_weights = getattr(dictionary, "weights", None)
+
+    blob, offsets, letter_ranges = list(), array("I", [0]), list()
+    weights = array("d") if weighted else None
+    parsed, position = list(), 0
+    for letter, lines in groups.items():
+        start = len(offsets) - 1
+        if letter in dictionary and \
+                digests.get(letter) == new_digests[letter]:
+            data, block_offsets = dictionary._letter_block(letter)
+            shift = position - block_offsets[0]
+            if shift:
+                offsets.extend([offset + shift
+                                for offset in block_offsets[1:]])
+            else:
+                offsets.extend(block_offsets[1:])
+            if weighted:
+                words = dictionary[letter]
+                weights.extend(
+                    source_weights[words.start:words.stop]
+                    if source_weights is not None else [1.0] * len(words))
+        else:
+            parsed.append(letter)
+            data = bytearray()
+            for line in lines:
+                word, weight = _parse_line(line)
+                data += word.encode("utf-8")
+                offsets.append(position + len(data))
+                if weighted:
+                    weights.append(1.0 if weight is None else weight)
+            data = bytes(data)
+        position += len(data)
+        blob.append(data)
+        letter_ranges.append((letter, start, len(offsets) - 1))
+    return (WordStore(b"".join(blob), offsets, letter_ranges, weights),
+            new_digests, parsed)
+
+
+class ReloadReport(object):
+    """
+    What reloading a watched dictionary changed, and how long it took
+
+    `seconds` covers reading the file and rebuilding the dictionary,
+    `words` and `letters` count what the reloaded dictionary holds,
+    `parsed` lists the letters whose lines changed (or are new) and were
+    parsed again, and `removed` the letters no longer in the dictionary.
+    """
+    def __init__(self, path, seconds, words, letters, parsed, removed):
+        self.path = path
+        self.seconds = seconds
+        self.words = words
+        self.letters = letters
+        self.parsed = parsed
+        self.removed = removed
+
+    def __str__(self):
+        return "reloaded {}: {} words, {} of {} letters parsed in {}".format(
+            self.path, self.words, len(self.parsed), self.letters,
+            _format_seconds(self.seconds))
+
+
+class DictionaryWatcher(object):
+    """
+    Follows the edits made to a dictionary file, reloading it incrementally
+
+    `dictionary` starts out as the file loaded by the dictionary_registry.
+    Whenever `check` finds the file's size, mtime or inode changed, the
+    file is read again and its lines hashed letter by letter: only the
+    letters whose lines changed are parsed, the packed words of every
+    other letter are copied from the previous dictionary. The reloaded
+    WordStore replaces `dictionary` in a single assignment, so nothing
+    ever sees a half-updated dictionary, and whatever is still drawing
+    from the previous one keeps a complete copy of it.
+
+    Edits are best written to a new file renamed over the dictionary; a
+    reload catching the file half written is followed by another once the
+    write completes. A reload that fails, on an invalid weight say, keeps
+    the previous dictionary and leaves the exception in `error` until the
+    file changes again. Safe to use from multiple threads.
+
+    :raises DictionaryNotFoundError if `path` can't be loaded
+    """
+    def __init__(self, path):
+        self.path = path
+        self.error = None
+        self.last_reload = None
+        self._lock = threading.Lock()
+        try:
+            self._stat = _stat_key(path)
+        except OSError:
+            message = "Could not find the dictionary at {}".format(path)
+            raise DictionaryNotFoundError(message)
+        self.dictionary = dictionary_registry.get(path)
+
+        # the digests only describe the loaded dictionary if the file
+        # didn't change while it was loaded and read
+        self._digests = None
+        try:
+            groups = _letter_groups(path)
+            if _stat_key(path) == self._stat:
+                self._digests = _digest_groups(groups)
+        except (IOError, OSError):
+            pass
+
+    def check(self):
+        """
+        Reload the dictionary if the file changed since it was last read
+
+        :return the ReloadReport of the reload, None if the file didn't
+                change or couldn't be reloaded
+        """
+        try:
+            source_stat = _stat_key(self.path)
+        except OSError:
+            # being replaced, or gone; keep the words we have
+            return None
+        if source_stat == self._stat:
+            return None
+        with self._lock:
+            # another thread may have reloaded it while we waited
+            if source_stat == self._stat:
+                return None
+            return self._reload(source_stat)
+
+    def _reload(self, source_stat):
+        metrics = _core._metrics
+        start = _clock()
+        self._stat = source_stat
+        try:
+            groups = _letter_groups(self.path)
+            dictionary, digests, parsed = _patch_dictionary(
+                self.dictionary, self._digests, groups)
+        except (IOError, OSError, ValueError) as error:
+            self.error = error
+            if metrics is not None:
+                metrics.error(error)
+            return None
+
+        report = ReloadReport(
+            self.path, _clock() - start, dictionary.word_count, len(groups),
+            parsed, [letter for letter in self.dictionary
+                     if letter not in groups])
+        self._digests = digests
+        self.dictionary = dictionary
+        self.error = None
+        self.last_reload = report
+        if metrics is not None:
+            metrics.observe("reload", report.seconds)
+            metrics.count("reloads")
+        return report
+
+
+# DictionaryWatcher of each watched file, while anything uses it
+_watchers = weakref.WeakValueDictionary()
+_watchers_lock = threading.Lock()
+
+
+def watch_dictionary(path):
+    """
+    DictionaryWatcher of the dictionary file at `path`, shared by every
+    generator watching the same file so it is only reloaded once
+
+    :raises DictionaryNotFoundError if `path` can't be loaded
+    """
+    key = os.path.realpath(path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = DictionaryWatcher(path)
+    return watcher
@@ -1,57 +1,208 @@
-"""Removes duplicate entries from dictionaries"""
-import sys
+"""Removes duplicate entries from dictionaries
+
+Words are normalized the way namealizer loads them (stripped and
+lowercased), then sorted and deduplicated with an external merge sort: the
+dictionary is read `--chunk-size` words at a time, each chunk is sorted,
+deduplicated and spilled to a temporary run file, and the runs are merged
+with heapq.merge. Memory use is bounded by the chunk size rather than the
+size of the dictionary. The first occurrence of a repeated word is kept,
+along with its weight.
+
+The cleaned dictionary is written under a temporary name and renamed over
+the output, which is the input itself unless `--output` is given, so an
+interrupted run never leaves a truncated dictionary behind. Dictionaries
+ending in .gz, .bz2 or .xz are read and written compressed.
+"""
 import argparse
-sys.path.append('../')
-import namealizer
-
-
-def main(dict_path, stat_path):
-    dictionary = namealizer.import_dictionary(dict_path)
-    sorted_words = []
-    updated = {}
-    running_total = 0
-
-    statistics = {
-        "old": {},
-        "new": {}
-    }
-
-    print("Removing duplicates")
-    for key, item in dictionary.items():
-        statistics["old"][key] = len(item)
-        updated[key] = sorted(set(item))
-        statistics["new"][key] = len(updated[key])
-        running_total += len(item) - len(updated[key])
-        print(key, len(item), len(updated[key]))
-
-    for key, item in updated.items():
-        for word in item:
-            sorted_words.append(word)
-
-    print("Beginning sort")
-    sorted_words = sorted(sorted_words)
-    print("Done sorting")
-
-    # write out the dictionary
-    with open(dict_path, "w") as dict_file:
-        for word in sorted_words:
-            dict_file.write(str(word) + '\n')
-
-    # write out the statistics
-    if stat_path is not None:
+import heapq
+import json
+import os
+import sys
+import tempfile
+from operator import itemgetter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+import namealizer  # noqa: E402
+# parses lines exactly as dictionaries are loaded, and replaces the output
+# the way compiled dictionaries are written
+from namealizer.namealizer import (  # noqa: E402
+    _clock, _parse_line, _replacing)
+
+
+def _sorted_unique(entries):
+    """
+    Sort the (word, weight) list `entries` in place, yielding the first
+    entry of every word
+    """
+    # sorting is stable, so the first occurrence of a word stays first
+    entries.sort(key=itemgetter(0))
+    previous = None
+    for word, weight in entries:
+        if word != previous:
+            previous = word
+            yield word, weight
+
+
+def _format_entry(word, weight):
+    """Dictionary line of a word and its weight, without the newline"""
+    if weight is None:
+        return word
+    return "{}\t{}".format(word, weight)
+
+
+def _spill(entries, directory):
+    """Write the sorted, deduplicated `entries` to a run file"""
+    handle, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(handle, "w") as run_file:
+        for word, weight in _sorted_unique(entries):
+            run_file.write(_format_entry(word, weight) + "\n")
+    return path
+
+
+def _read_run(path, index):
+    """Yield the (word, run index, weight) entries of a run file"""
+    with open(path) as run_file:
+        for line in run_file:
+            word, weight = _parse_line(line)
+            yield word, index, weight
+
+
+def _tag(entries, index):
+    for word, weight in entries:
+        yield word, index, weight
+
+
+def _count(counts, word):
+    counts[word[0]] = counts.get(word[0], 0) + 1
+
+
+def clean(source, output=None, chunk_size=1000000, temp_dir=None):
+    """
+    Sort `source` and drop its duplicate words into `output`
+
+    :param source Path of the dictionary to clean
+    :param output Where to write the cleaned dictionary, defaults to
+           `source`
+    :param chunk_size Most words held in memory at once
+    :param temp_dir Where to keep the sorted runs, by default the system's
+           temporary directory
+    :return a dict of statistics: the number of input words, unique words,
+            duplicates, blank lines and runs, words per letter before
+            ("old") and after ("new"), and the time taken
+
+    :raises ValueError if a line has an invalid weight
+    """
+    start = _clock()
+    if output is None:
+        output = source
+    statistics = {"source": source, "output": output, "words": 0,
+                  "unique": 0, "duplicates": 0, "blank": 0, "runs": 0,
+                  "old": {}, "new": {}}
+
+    runs, entries = list(), list()
+    run_dir = tempfile.mkdtemp(dir=temp_dir)
+    try:
+        with namealizer.open_dictionary(source) as lines:
+            for line in lines:
+                word, weight = _parse_line(line)
+                if not word:
+                    statistics["blank"] += 1
+                    continue
+                _count(statistics["old"], word)
+                entries.append((word, weight))
+                if len(entries) >= chunk_size:
+                    runs.append(_spill(entries, run_dir))
+                    entries = list()
+                    sys.stderr.write("sorted run {}\n".format(len(runs)))
+
+        if runs:
+            if entries:
+                runs.append(_spill(entries, run_dir))
+                entries = list()
+            merged = heapq.merge(*[_read_run(path, index)
+                                   for index, path in enumerate(runs)])
+        else:
+            merged = _tag(_sorted_unique(entries), 0)
+        statistics["runs"] = len(runs)
+
+        with _replacing(output) as temporary:
+            with namealizer.open_dictionary(temporary, "w") as dict_file:
+                previous = None
+                for word, _, weight in merged:
+                    if word == previous:
+                        continue
+                    previous = word
+                    _count(statistics["new"], word)
+                    dict_file.write(_format_entry(word, weight) + "\n")
+    finally:
+        for path in runs:
+            os.remove(path)
+        os.rmdir(run_dir)
+
+    statistics["words"] = sum(statistics["old"].values())
+    statistics["unique"] = sum(statistics["new"].values())
+    statistics["duplicates"] = statistics["words"] - statistics["unique"]
+    statistics["seconds"] = _clock() - start
+    return statistics
+
+
+def main(dict_path, stat_path=None, output=None, chunk_size=1000000,
+         temp_dir=None, compiled=None):
+    """
+    Clean a dictionary, then write its statistics as JSON to `stat_path`
+    ("-" for stdout) and compile it when `compiled` is given ("" for the
+    default location next to the output)
+    """
+    statistics = clean(dict_path, output, chunk_size, temp_dir)
+    if compiled is not None:
+        statistics["compiled"] = namealizer.compile_dictionary(
+            statistics["output"], compiled or None)
+
+    if stat_path == "-":
+        json.dump(statistics, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    elif stat_path is not None:
         with open(stat_path, "w") as stat_file:
-            stat_file.write(str(statistics))
-    print("Removed a total of: {} words".format(running_total))
+            json.dump(statistics, stat_file, indent=2, sort_keys=True)
+    sys.stderr.write("Removed a total of: {} words\n".format(
+        statistics["duplicates"]))
+    return statistics
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("dictionary",
                         type=str,
-                        help="Dictionary to clean, will be overwritten")
+                        help="Dictionary to clean, overwritten unless "
+                        "--output is given")
     parser.add_argument("statistics",
                         type=str,
                         nargs="?",
                         default=None,
-                        help="Where to put the statistics log")
+                        help="Where to write the statistics as JSON, - for "
+                        "stdout")
+    parser.add_argument("-o", "--output",
+                        help="Write the cleaned dictionary here instead")
+    parser.add_argument("--chunk-size",
+                        type=int,
+                        default=1000000,
+                        help="Words sorted in memory at once")
+    parser.add_argument("--temp-dir",
+                        help="Where to keep sorted runs while merging")
+    parser.add_argument("--compile",
+                        nargs="?",
+                        const="",
+                        default=None,
+                        metavar="PATH",
+                        help="Also write the compiled dictionary, next to "
+                        "the output (<output>c) unless PATH is given")
     args = parser.parse_args()
-    main(args.dictionary, args.statistics)
+    try:
+        main(args.dictionary, args.statistics, output=args.output,
+             chunk_size=args.chunk_size, temp_dir=args.temp_dir,
+             compiled=args.compile)
+    except (IOError, OSError, ValueError,
+            namealizer.DictionaryNotFoundError) as error:
+        sys.stderr.write("duplicate_cleaner: {}\n".format(error))
+        sys.exit(1)